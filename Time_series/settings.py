@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.instrumentation.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,10 +77,22 @@ WSGI_APPLICATION = 'Time_series.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Opt-in SQLite tuning for concurrent traffic (app.db): WAL journal, relaxed
+# fsync, busy timeout, mmap and IMMEDIATE transactions on every connection,
+# persistent connections, and forecast writes committed in batches by one
+# writer thread per process. See app.db.DEFAULT_CONFIG for every key.
+SQLITE_TUNING = {
+    'ENABLED': False,
+    'BUSY_TIMEOUT': 5000,
+    'CONN_MAX_AGE': 60,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': SQLITE_TUNING['CONN_MAX_AGE'] if SQLITE_TUNING['ENABLED'] else 0,
+        'CONN_HEALTH_CHECKS': SQLITE_TUNING['ENABLED'],
     }
 }
 
@@ -125,4 +138,115 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-AUTH_USER_MODEL = 'app.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'app.User'
+
+# Shared by every worker on the host so the fragment versions bumped by
+# app.signals invalidate cached template fragments everywhere.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache',
+    }
+}
+
+# Forecast models
+# Prophet artifacts are loaded through app.model_registry, which keeps live
+# model objects per worker process in a bounded LRU.
+
+MODEL_DIR = BASE_DIR / 'app' / 'models'
+
+# Daily price CSVs (<SYMBOL>.csv) that `manage.py train_models` fits from.
+PRICE_DATA_DIR = BASE_DIR / 'data' / 'prices'
+
+# Backend for the server-rendered forecast plots; set once at startup
+# (app.apps) so matplotlib never probes for GUI toolkits.
+MATPLOTLIB_BACKEND = 'Agg'
+
+MODEL_REGISTRY = {
+    'MAX_ENTRIES': 8,
+    'MAX_BYTES': 256 * 1024 * 1024,
+    # True to load every artifact in MODEL_DIR at startup, or a list of symbols.
+    'WARMUP': False,
+}
+
+# Forecast results shared across worker processes via a local SQLite file.
+# Keys include the model artifact hash, so replacing an artifact invalidates them.
+FORECAST_CACHE = {
+    'ENABLED': True,
+    'PATH': BASE_DIR / 'forecast_cache.sqlite3',
+    'TTL': 6 * 3600,
+    'MAX_ENTRIES': 1000,
+    'MAX_BYTES': 64 * 1024 * 1024,
+}
+
+# MAX_WORKERS sizes the process pool used by the multi-symbol batch forecast
+# endpoint; INFERENCE_THREADS the thread pool the async forecast views (served
+# over ASGI) run model loading, prediction and plotting on.
+FORECAST_POOL = {
+    'MAX_WORKERS': 4,
+    'TIMEOUT': 120,
+    'INFERENCE_THREADS': 4,
+}
+
+# Public GET forecast API (app.views.forecast_api): how long browsers and
+# proxies may reuse a response before revalidating it with its ETag, and the
+# longest horizon (period x frequency, in days) an anonymous client may ask for.
+# Batch forecasts and forecast jobs are held to the same horizon.
+FORECAST_API = {
+    'MAX_AGE': 3600,
+    'MAX_HORIZON_DAYS': 730,
+}
+
+# Background forecast jobs (app.jobs), run by `manage.py run_forecast_worker`.
+# Failed attempts are retried after RETRY_BACKOFF seconds, doubling each time;
+# a job still running after LEASE seconds is assumed lost and is re-claimed.
+FORECAST_JOBS = {
+    'CONCURRENCY': 2,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF': 30,
+    'LEASE': 15 * 60,
+    'POLL_INTERVAL': 1.0,
+}
+
+# Stored forecasts (app.persistence), maintained by `manage.py prune_forecasts`:
+# runs older than COMPACT_AFTER_DAYS keep only yhat and its bounds as float32,
+# and user references older than RETENTION_DAYS are dropped along with the
+# runs nobody references any more.
+FORECAST_RUNS = {
+    'RETENTION_DAYS': 90,
+    'COMPACT_AFTER_DAYS': 30,
+}
+
+# Forecasting engines (app.engines). Each company picks one (Company.engine);
+# "fast" companies use the quickest engine whose holdout MAPE, recorded by
+# `manage.py train_models`, is at most FAST_MAX_MAPE.
+FORECAST_ENGINES = {
+    'TRAIN': ['prophet', 'ets', 'arima'],
+    'HOLDOUT_DAYS': 30,
+    'FAST_MAX_MAPE': 0.05,
+    'ARIMA_WINDOW_DAYS': 730,
+}
+
+# Rolling-origin backtests (`manage.py backtest`): the first cutoff keeps
+# INITIAL_DAYS of history, cutoffs follow every PERIOD_DAYS and each is scored
+# on the next HORIZON_DAYS. Fits are cached per cutoff in CACHE_DIR.
+BACKTEST = {
+    'CACHE_DIR': BASE_DIR / 'backtest_cache',
+    'INITIAL_DAYS': 730,
+    'PERIOD_DAYS': 90,
+    'HORIZON_DAYS': 30,
+}
+
+# NumPy evaluation of fitted Prophet parameters (app.fast_engine) used in
+# place of Prophet.predict for models it supports. INTERVALS is 'samples'
+# (offsets simulated once per model), 'analytical' or None (no intervals:
+# yhat_lower and yhat_upper equal yhat).
+FAST_FORECAST = {
+    'ENABLED': True,
+    'INTERVALS': 'samples',
+    'INTERVAL_SAMPLES': 1000,
+    'MAX_HORIZON_DAYS': 730,
+}
+
+# Per-symbol forecast tables written by `manage.py materialize_forecasts`.
+FORECAST_TABLE_DIR = BASE_DIR / 'forecast_tables'
@@ -1,8 +1,12 @@
 #app/admin.py
 from django.contrib import admin
-from .models import User, Company, Prediction
+from .models import User, Company, ForecastJob, ForecastRun, Prediction, PriceBar, UserForecast
 # Register your models here.
 
 admin.site.register(User)
 admin.site.register(Company)
-admin.site.register(Prediction)
\ No newline at end of file
+admin.site.register(Prediction)
+admin.site.register(ForecastJob)
+admin.site.register(PriceBar)
+admin.site.register(ForecastRun)
+admin.site.register(UserForecast)
\ No newline at end of file
@@ -1,7 +1,21 @@
-#app/apps.py
 from django.apps import AppConfig
 
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        import os
+        from django.conf import settings
+
+        # Server-side plots only ever render to PNG. Setting the backend here,
+        # before anything imports matplotlib, saves pyplot (which Prophet
+        # imports) from probing for GUI toolkits, and pool processes inherit it.
+        os.environ.setdefault('MPLBACKEND', getattr(settings, 'MATPLOTLIB_BACKEND', 'Agg'))
+        from . import model_registry, signals  # noqa: F401 (connects receivers)
+
+        warmup = getattr(settings, 'MODEL_REGISTRY', {}).get('WARMUP')
+        if warmup:
+            symbols = model_registry.available_symbols() if warmup is True else warmup
+            model_registry.registry.warm_up(symbols)
@@ -0,0 +1,157 @@
+#app/backtesting.py
+import glob
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from .models import Company
+from .training import ape_sum, quiet_cmdstanpy, save_model
+
+DEFAULT_CONFIG = {
+    'CACHE_DIR': None,
+    # Rolling origin, in Prophet's cross-validation terms: the first cutoff
+    # leaves INITIAL_DAYS of training data, later ones follow every
+    # PERIOD_DAYS, and each forecasts the next HORIZON_DAYS.
+    'INITIAL_DAYS': 730,
+    'PERIOD_DAYS': 90,
+    'HORIZON_DAYS': 30,
+}
+
+
+def backtest_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'BACKTEST', {}))
+    if not config['CACHE_DIR']:
+        config['CACHE_DIR'] = os.path.join(settings.BASE_DIR, 'backtest_cache')
+    return config
+
+
+def cutoffs(prices, initial, period, horizon):
+    """Cutoff dates, newest last, that leave `initial` days before and `horizon` days after them"""
+    first, last = prices['ds'].min(), prices['ds'].max()
+    cutoff = last - pd.Timedelta(days=horizon)
+    found = []
+    while cutoff - first >= pd.Timedelta(days=initial):
+        found.append(cutoff)
+        cutoff -= pd.Timedelta(days=period)
+    return found[::-1]
+
+
+def fit_digest(engine, train, config):
+    """Identifies a fit by engine, model configuration and the exact training rows"""
+    digest = hashlib.sha256(json.dumps([engine, config], sort_keys=True, default=str).encode('utf-8'))
+    digest.update(train['ds'].to_numpy(dtype='datetime64[s]').tobytes())
+    digest.update(train['y'].to_numpy(dtype='<f8').tobytes())
+    return digest.hexdigest()[:16]
+
+
+def fit_path(cache_dir, symbol, engine, cutoff, digest):
+    return os.path.join(cache_dir, symbol, f"{engine}-{cutoff:%Y%m%d}-{digest}.pkl")
+
+
+def fit_model(engine, train, config):
+    if engine == Company.PROPHET:
+        from prophet import Prophet
+
+        quiet_cmdstanpy()
+        return Prophet(**config).fit(train)
+    from .engines import FORECASTERS
+
+    return FORECASTERS[engine].fit(train)
+
+
+def predict_model(engine, model, future):
+    if engine == Company.PROPHET:
+        from .forecasting import predict
+
+        # What serving would run: the NumPy engine when it supports the model.
+        return predict(model, future)
+    return model.predict(future)
+
+
+def load_or_fit(engine, train, config, path):
+    """
+    The model fitted on `train`, from the per-cutoff cache when an identical
+    fit exists. Returns (model, fit_seconds, cached); a cached fit reports
+    the time its original fit took.
+    """
+    import joblib
+
+    if os.path.exists(path):
+        try:
+            entry = joblib.load(path)
+            return entry['model'], entry['fit_seconds'], True
+        except Exception as e:
+            print(f"Error loading cached fit {path}: {str(e)}")
+
+    start = time.perf_counter()
+    model = fit_model(engine, train, config)
+    fit_seconds = time.perf_counter() - start
+    # Fits for this cutoff on other data or settings are now stale.
+    prefix = os.path.basename(path).rsplit('-', 1)[0]
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f'{prefix}-*.pkl')):
+        if stale != path:
+            os.remove(stale)
+    save_model({'model': model, 'fit_seconds': fit_seconds}, path)
+    return model, fit_seconds, False
+
+
+def run_cutoff(symbol, engine, prices, cutoff, horizon, config, cache_dir):
+    """
+    Evaluate one rolling origin: fit on prices up to `cutoff` (or reuse the
+    cached fit) and forecast the observed days of the following `horizon`.
+    Runs in a pool process; returns error sums so results aggregate exactly.
+    """
+    train = prices[prices['ds'] <= cutoff].reset_index(drop=True)
+    test = prices[(prices['ds'] > cutoff) & (prices['ds'] <= cutoff + pd.Timedelta(days=horizon))]
+    path = fit_path(cache_dir, symbol, engine, cutoff, fit_digest(engine, train, config))
+    model, fit_seconds, cached = load_or_fit(engine, train, config, path)
+
+    future = test[['ds']].reset_index(drop=True)
+    # Time a second call: the first may build per-model caches (the NumPy
+    # engine's interval offsets) that serving pays once, not per request.
+    predict_model(engine, model, future)
+    start = time.perf_counter()
+    forecast = predict_model(engine, model, future)
+    predict_seconds = time.perf_counter() - start
+
+    y = test['y'].to_numpy()
+    errors, scored = ape_sum(y, forecast['yhat'].to_numpy())
+    return {
+        'symbol': symbol,
+        'engine': engine,
+        'cutoff': cutoff.strftime('%Y-%m-%d'),
+        'points': len(y),
+        'ape_points': scored,
+        'ape_sum': errors,
+        'covered': int(np.sum((forecast['yhat_lower'].to_numpy() <= y) & (y <= forecast['yhat_upper'].to_numpy()))),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+        'cached': cached,
+    }
+
+
+def summarize(rows):
+    """One report row per (symbol, engine) from run_cutoff results"""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['symbol'], row['engine']), []).append(row)
+    report = []
+    for (symbol, engine), group in sorted(groups.items()):
+        points = sum(row['points'] for row in group)
+        ape_points = sum(row['ape_points'] for row in group)
+        report.append({
+            'symbol': symbol,
+            'engine': engine,
+            'cutoffs': len(group),
+            'cached': sum(row['cached'] for row in group),
+            'points': points,
+            'mape': sum(row['ape_sum'] for row in group) / ape_points if ape_points else None,
+            'coverage': sum(row['covered'] for row in group) / points if points else None,
+            'fit_seconds_mean': float(np.mean([row['fit_seconds'] for row in group])),
+            'predict_ms_median': float(np.median([row['predict_seconds'] for row in group])) * 1000,
+        })
+    return report
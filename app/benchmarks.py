@@ -0,0 +1,147 @@
+#app/benchmarks.py
+import os
+import time
+import tempfile
+import statistics
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+
+def timeit(func, repeat=5, setup=None):
+    """Run `func` `repeat` times and return timing stats in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'repeat': repeat,
+    }
+
+
+@contextmanager
+def test_database(on_disk=False, verbosity=0):
+    """
+    Run the block against a throwaway test database, never the real one.
+
+    SQLite test databases live in memory by default; `on_disk` puts them in
+    a temporary file so commit and fsync costs show up in the timings.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    saved_name = test_settings.get('NAME')
+    tmpdir = None
+    if on_disk and connection.vendor == 'sqlite':
+        tmpdir = tempfile.TemporaryDirectory()
+        test_settings['NAME'] = os.path.join(tmpdir.name, 'benchmark.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings['NAME'] = saved_name
+        if tmpdir:
+            tmpdir.cleanup()
+
+
+@contextmanager
+def scratch_database(path, alias='scratch'):
+    """
+    Register a migrated SQLite database at `path` as connection `alias` for
+    the block, alongside the real (or test) default database. Threads that
+    use it must close their own connections.
+    """
+    databases = {DEFAULT_DB_ALIAS: {}, alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path)}}
+    connections.settings[alias] = connections.configure_settings(databases)[alias]
+    try:
+        call_command('migrate', database=alias, interactive=False, verbosity=0)
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+def synthetic_forecast(horizon, start='2024-01-01', seed=0):
+    """A forecast-shaped frame with the columns the views persist and serialize"""
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range(start=start, periods=horizon, freq='D')
+    yhat = 100 + np.cumsum(rng.normal(0, 1, horizon))
+    width = np.linspace(2, 10, horizon)
+    return pd.DataFrame({
+        'ds': ds,
+        'yhat': yhat,
+        'yhat_lower': yhat - width,
+        'yhat_upper': yhat + width,
+        'trend': yhat - 1,
+        'weekly': np.sin(np.arange(horizon) * 2 * np.pi / 7),
+        'yearly': np.sin(np.arange(horizon) * 2 * np.pi / 365.25),
+    })
+
+
+def synthetic_series(n_days=730, end=None, seed=0):
+    """Daily price-like series with trend, weekly and yearly structure ending at `end` (today by default)"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+    ds = pd.date_range(end=end, periods=n_days, freq='D')
+    t = np.arange(n_days)
+    y = (
+        100 + 0.05 * t
+        + 5 * np.sin(2 * np.pi * t / 365.25)
+        + 1.5 * np.sin(2 * np.pi * t / 7)
+        + np.cumsum(rng.normal(0, 0.5, n_days))
+    )
+    return pd.DataFrame({'ds': ds, 'y': y})
+
+
+def train_synthetic_models(directory, symbols, n_days=730, end=None):
+    """Fit small Prophet models on synthetic series and save them as prophet_model_{SYMBOL}.pkl"""
+    import joblib
+    import logging
+    from prophet import Prophet
+
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for seed, symbol in enumerate(symbols):
+        path = os.path.join(directory, f'prophet_model_{symbol}.pkl')
+        if not os.path.exists(path):
+            model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
+            model.fit(synthetic_series(n_days, end=end, seed=seed))
+            joblib.dump(model, path)
+        paths[symbol] = path
+    return paths
+
+
+def compare_to_baseline(results, baseline, tolerance=0.25):
+    """
+    Match results to a stored baseline by (stage, horizon, symbols) and flag
+    stages whose median got more than `tolerance` slower.
+    """
+    def key(row):
+        return (row['stage'], row.get('horizon'), row.get('symbols'))
+
+    previous = {key(row): row for row in baseline.get('results', [])}
+    comparisons = []
+    for row in results:
+        before = previous.get(key(row))
+        if before is None or not before['median_ms']:
+            continue
+        ratio = row['median_ms'] / before['median_ms']
+        comparisons.append({
+            'stage': row['stage'],
+            'horizon': row.get('horizon'),
+            'symbols': row.get('symbols'),
+            'baseline_ms': before['median_ms'],
+            'median_ms': row['median_ms'],
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + tolerance,
+        })
+    return comparisons
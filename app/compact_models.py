@@ -0,0 +1,158 @@
+#app/compact_models.py
+import os
+import json
+import struct
+import numpy as np
+from django.conf import settings
+from . import model_registry
+from .fast_engine import FastProphet, fast_config
+
+COMPACT_FILENAME = 'prophet_model_{symbol}.params'
+MAGIC = b'TSFPRM01'
+ALIGNMENT = 64
+
+
+def compact_path(company_symbol):
+    return os.path.join(model_registry.model_dir(), COMPACT_FILENAME.format(symbol=company_symbol))
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_compact(params, path, source_version):
+    """
+    Write FastProphet parameters as one flat file: magic, header length,
+    JSON header (scalars, seasonality layout, array offsets) and then the
+    64-byte aligned float64 arrays, so loaders can memory-map it as-is.
+    """
+    arrays = {
+        'delta': params['delta'],
+        'changepoints_t': params['changepoints_t'],
+    }
+    seasonalities = []
+    for seasonality in params['seasonalities']:
+        arrays[f"beta:{seasonality['name']}"] = seasonality['beta']
+        seasonalities.append({
+            'name': seasonality['name'],
+            'period': seasonality['period'],
+            'fourier_order': seasonality['fourier_order'],
+        })
+
+    header = {
+        'source_version': source_version,
+        'growth': params['growth'],
+        'start_ns': int(params['start_ns']),
+        't_scale_ns': int(params['t_scale_ns']),
+        'last_ds_ns': int(params['last_ds_ns']),
+        'y_scale': params['y_scale'],
+        'k': params['k'],
+        'm': params['m'],
+        'sigma_obs': params['sigma_obs'],
+        'interval_width': params['interval_width'],
+        'seasonalities': seasonalities,
+        'arrays': {},
+    }
+    # Offsets depend on the header size, which depends on the offsets; lay
+    # the arrays out relative to a generous fixed header block instead.
+    header_block = _align(len(MAGIC) + 8 + 4096 + 256 * len(arrays))
+    offset = header_block
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values, dtype='<f8')
+        header['arrays'][name] = {'offset': offset, 'shape': list(values.shape), 'dtype': '<f8'}
+        offset = _align(offset + values.nbytes)
+    header_bytes = json.dumps(header).encode('utf-8')
+    if len(MAGIC) + 8 + len(header_bytes) > header_block:
+        raise ValueError('Compact model header does not fit its block')
+
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(MAGIC)
+        fh.write(struct.pack('<Q', len(header_bytes)))
+        fh.write(header_bytes)
+        for name, values in arrays.items():
+            fh.seek(header['arrays'][name]['offset'])
+            fh.write(np.ascontiguousarray(values, dtype='<f8').tobytes())
+        fh.truncate(offset)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_compact(path):
+    """
+    Memory-map a compact artifact and return (header, params).
+
+    The parameter arrays are read-only views into the mapping, so every
+    worker process shares the same page-cache pages.
+    """
+    buf = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f'{path} is not a compact model file')
+    (header_len,) = struct.unpack('<Q', bytes(buf[len(MAGIC):len(MAGIC) + 8]))
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(buf[start:start + header_len]).decode('utf-8'))
+
+    def array(name):
+        spec = header['arrays'][name]
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+        end = spec['offset'] + count * dtype.itemsize
+        return buf[spec['offset']:end].view(dtype).reshape(spec['shape'])
+
+    params = {
+        key: header[key]
+        for key in ('growth', 'start_ns', 't_scale_ns', 'last_ds_ns', 'y_scale', 'k', 'm',
+                    'sigma_obs', 'interval_width')
+    }
+    params['start_ns'] = np.int64(params['start_ns'])
+    params['t_scale_ns'] = np.int64(params['t_scale_ns'])
+    params['last_ds_ns'] = np.int64(params['last_ds_ns'])
+    params['delta'] = array('delta')
+    params['changepoints_t'] = array('changepoints_t')
+    params['seasonalities'] = [
+        dict(seasonality, beta=array(f"beta:{seasonality['name']}"))
+        for seasonality in header['seasonalities']
+    ]
+    return header, params
+
+
+def _load_predictor(path):
+    header, params = load_compact(path)
+    config = fast_config()
+    predictor = FastProphet(
+        params,
+        intervals=config['INTERVALS'],
+        n_samples=config['INTERVAL_SAMPLES'],
+        max_horizon_days=config['MAX_HORIZON_DAYS'],
+        seed=config['SEED'],
+    )
+    predictor.source_version = header['source_version']
+    return predictor
+
+
+def _build_registry():
+    config = getattr(settings, 'MODEL_REGISTRY', {})
+    return model_registry.ModelRegistry(
+        max_entries=config.get('MAX_COMPACT_ENTRIES', 64),
+        path_for=compact_path,
+        loader=_load_predictor,
+    )
+
+
+registry = _build_registry()
+
+
+def get_predictor(company_symbol):
+    """
+    The memory-mapped FastProphet for a symbol, or None when the fast engine
+    is disabled or no compact artifact matches the current .pkl artifact.
+    """
+    if not fast_config()['ENABLED']:
+        return None
+    predictor = registry.get(company_symbol)
+    if predictor is None:
+        return None
+    if predictor.source_version != model_registry.artifact_version(company_symbol):
+        # Converted from an older .pkl; fall back until it is reconverted.
+        return None
+    return predictor
@@ -0,0 +1,156 @@
+#app/db.py
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+
+DEFAULT_CONFIG = {
+    'ENABLED': False,
+    # Readers no longer block the writer (nor it them), and a commit only
+    # appends to the log instead of rewriting pages in place.
+    'JOURNAL_MODE': 'WAL',
+    # In WAL mode NORMAL only fsyncs at checkpoints: a power loss may drop
+    # the last commits but cannot corrupt the database.
+    'SYNCHRONOUS': 'NORMAL',
+    # Milliseconds a connection waits for the write lock before "database is locked".
+    'BUSY_TIMEOUT': 5000,
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    # Take the write lock at BEGIN: a deferred transaction that reads, then
+    # writes after another connection committed fails at once, whatever
+    # the busy timeout.
+    'TRANSACTION_MODE': 'IMMEDIATE',
+    'CONN_MAX_AGE': 60,
+    # Forecast writes go through one writer thread per process (BatchWriter).
+    'BATCH_WRITES': True,
+    'BATCH_SIZE': 50,
+}
+
+
+def tuning_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'SQLITE_TUNING', {}))
+    return config
+
+
+def tune_connection(connection):
+    """Apply the SQLITE_TUNING pragmas to a new SQLite connection; other backends are left alone"""
+    config = tuning_config()
+    if not config['ENABLED'] or connection.vendor != 'sqlite':
+        return
+    if config['TRANSACTION_MODE'] and connection.transaction_mode is None:
+        connection.transaction_mode = config['TRANSACTION_MODE']
+    with connection.cursor() as cursor:
+        # busy_timeout first: switching to WAL needs a moment of exclusive access.
+        cursor.execute(f"PRAGMA busy_timeout = {int(config['BUSY_TIMEOUT'])}")
+        if not connection.is_in_memory_db():
+            cursor.execute(f"PRAGMA journal_mode = {config['JOURNAL_MODE']}")
+        cursor.execute(f"PRAGMA synchronous = {config['SYNCHRONOUS']}")
+        cursor.execute(f"PRAGMA mmap_size = {int(config['MMAP_SIZE'])}")
+
+
+class BatchWriter:
+    """
+    Runs database writes submitted from any thread on one writer thread,
+    committing whatever has queued up (at most `max_batch` writes) in a
+    single transaction.
+
+    SQLite allows one writer at a time, so concurrent request threads
+    writing directly mostly wait on each other's locks and each pays its
+    own commit. Here an idle writer commits a lone write immediately, and
+    under load every commit carries the writes that arrived during the
+    previous one. Each write runs in its own savepoint, so one that fails
+    only fails its own caller.
+    """
+
+    def __init__(self, max_batch=DEFAULT_CONFIG['BATCH_SIZE'], using=DEFAULT_DB_ALIAS):
+        self.max_batch = max_batch
+        self.using = using
+        self.batches = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs); returns a Future resolved once its transaction commits"""
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='batch-writer', daemon=True)
+                self._thread.start()
+        return future
+
+    def close(self, timeout=None):
+        """Write everything queued so far, then stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._write(batch)
+                        return
+                    batch.append(item)
+                self._write(batch)
+        finally:
+            connections[self.using].close()
+
+    def _write(self, batch):
+        batch = [entry for entry in batch if entry[0].set_running_or_notify_cancel()]
+        outcomes = []
+        try:
+            close_old_connections()
+            with transaction.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # The commit itself failed: none of the batch was written.
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def batch_writer(using=DEFAULT_DB_ALIAS):
+    """The process's BatchWriter for `using`, or None when SQLITE_TUNING does not batch writes"""
+    config = tuning_config()
+    if not (config['ENABLED'] and config['BATCH_WRITES']) or connections[using].vendor != 'sqlite':
+        return None
+    with _writers_lock:
+        if using not in _writers:
+            _writers[using] = BatchWriter(config['BATCH_SIZE'], using)
+        return _writers[using]
+
+
+@atexit.register
+def _close_writers():
+    for writer in list(_writers.values()):
+        writer.close(timeout=10)
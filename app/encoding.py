@@ -0,0 +1,158 @@
+#app/encoding.py
+import json
+import math
+import struct
+import numpy as np
+import pandas as pd
+
+COLUMNAR_VERSION = 2
+COLUMNAR_JSON = 'application/vnd.forecast.columnar+json'
+PACKED_F32 = 'application/vnd.forecast.f32'
+BINARY_MAGIC = b'TSF2'
+
+# Output series name -> forecast frame column
+SERIES = {
+    'yhat': 'yhat',
+    'lower': 'yhat_lower',
+    'upper': 'yhat_upper',
+    'trend': 'trend',
+    'weekly': 'weekly',
+    'yearly': 'yearly',
+}
+
+DEFAULT_PRECISION = 4
+MAX_PRECISION = 10
+
+
+def negotiate(request):
+    """
+    Pick the forecast_stock response encoding: 'f32', 'columnar' or the
+    legacy 'v1' JSON the forecast page consumes. An explicit `format`
+    parameter wins over the Accept header.
+    """
+    requested = (request.POST.get('format') or request.GET.get('format') or '').lower()
+    if requested in ('f32', 'binary'):
+        return 'f32'
+    if requested in ('columnar', 'v2'):
+        return 'columnar'
+    if requested in ('v1', 'json'):
+        return 'v1'
+    accept = request.META.get('HTTP_ACCEPT', '')
+    if PACKED_F32 in accept:
+        return 'f32'
+    if COLUMNAR_JSON in accept:
+        return 'columnar'
+    return 'v1'
+
+
+def parse_precision(value):
+    try:
+        precision = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PRECISION
+    return min(max(precision, 0), MAX_PRECISION)
+
+
+def encode_array(values, precision):
+    """JSON array text for a float array, rounded to `precision` decimals; NaN/inf become null"""
+    # Rounding in NumPy first lets float repr pick the short form (101.25,
+    # not 101.25000000000001), which is both smaller and faster to encode.
+    rounded = np.round(np.asarray(values, dtype=float), precision).tolist()
+    if not all(map(math.isfinite, rounded)):
+        rounded = [v if math.isfinite(v) else None for v in rounded]
+    return json.dumps(rounded, separators=(',', ':'))
+
+
+def columnar_json(forecast, meta, precision=DEFAULT_PRECISION):
+    """
+    Encode a forecast as version 2 columnar JSON: one shared `dates` axis and
+    one array per series. Each array is rounded in NumPy and encoded as a
+    block, and the document is assembled as text instead of one big dict.
+    """
+    dates = forecast['ds'].dt.strftime('%Y-%m-%d').tolist()
+    head = dict(meta, format='forecast.columnar', version=COLUMNAR_VERSION, precision=precision)
+    parts = [json.dumps(head, separators=(',', ':'))[:-1], ',"dates":', json.dumps(dates, separators=(',', ':')), ',"series":{']
+    parts.append(','.join(
+        f'"{name}":{encode_array(forecast[column].to_numpy(), precision)}'
+        for name, column in SERIES.items()
+    ))
+    parts.append('}}')
+    return ''.join(parts)
+
+
+def packed_f32(forecast, meta):
+    """
+    Binary encoding: b'TSF2', a little-endian uint32 header length, a JSON
+    header (metadata, row count, series order), then the dates as
+    little-endian int64 seconds since the epoch, followed by each series
+    as little-endian float32.
+    """
+    n = len(forecast)
+    header = dict(
+        meta,
+        format='forecast.f32',
+        version=COLUMNAR_VERSION,
+        rows=n,
+        dates='int64 seconds since 1970-01-01T00:00:00',
+        series=list(SERIES),
+    )
+    header_bytes = json.dumps(header).encode('utf-8')
+    seconds = forecast['ds'].to_numpy(dtype='datetime64[s]').astype('<i8')
+    columns = [forecast[column].to_numpy(dtype='<f4') for column in SERIES.values()]
+    return b''.join(
+        [BINARY_MAGIC, struct.pack('<I', len(header_bytes)), header_bytes, seconds.tobytes()]
+        + [column.tobytes() for column in columns]
+    )
+
+
+def decode_f32(payload):
+    """Inverse of packed_f32, returning (header, dates as datetime64[s], {series: float32 array})"""
+    if payload[:4] != BINARY_MAGIC:
+        raise ValueError('Not a packed forecast payload')
+    (header_len,) = struct.unpack('<I', payload[4:8])
+    header = json.loads(payload[8:8 + header_len])
+    offset = 8 + header_len
+    n = header['rows']
+    dates = np.frombuffer(payload, dtype='<i8', count=n, offset=offset).astype('datetime64[s]')
+    offset += 8 * n
+    series = {}
+    for name in header['series']:
+        series[name] = np.frombuffer(payload, dtype='<f4', count=n, offset=offset)
+        offset += 4 * n
+    return header, dates, series
+
+
+STORAGE_MAGIC = b'TSR1'
+
+
+def pack_frame(forecast, columns, dtype='<f8'):
+    """
+    Storage encoding for ForecastRun.series: b'TSR1', a uint32 header
+    length, a JSON header (rows, dtype, columns), int64 epoch seconds for
+    `ds`, then each column as a little-endian array of `dtype`.
+    """
+    header = json.dumps({'rows': len(forecast), 'dtype': dtype, 'columns': list(columns)}).encode('utf-8')
+    seconds = forecast['ds'].to_numpy(dtype='datetime64[s]').astype('<i8')
+    return b''.join(
+        [STORAGE_MAGIC, struct.pack('<I', len(header)), header, seconds.tobytes()]
+        + [forecast[column].to_numpy(dtype=dtype).tobytes() for column in columns]
+    )
+
+
+def unpack_frame(payload):
+    """Inverse of pack_frame, as a DataFrame with `ds` and the stored columns (float64)"""
+    payload = bytes(payload)
+    if payload[:4] != STORAGE_MAGIC:
+        raise ValueError('Not a stored forecast payload')
+    (header_len,) = struct.unpack('<I', payload[4:8])
+    header = json.loads(payload[8:8 + header_len])
+    offset = 8 + header_len
+    n = header['rows']
+    seconds = np.frombuffer(payload, dtype='<i8', count=n, offset=offset)
+    offset += 8 * n
+    frame = {'ds': pd.to_datetime(seconds, unit='s')}
+    width = np.dtype(header['dtype']).itemsize
+    for column in header['columns']:
+        frame[column] = np.frombuffer(payload, dtype=header['dtype'], count=n, offset=offset).astype(float)
+        offset += width * n
+    return pd.DataFrame(frame)
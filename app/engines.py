@@ -0,0 +1,243 @@
+#app/engines.py
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from . import model_registry
+from .models import Company
+
+ENGINES = Company.ENGINES
+
+ARTIFACT_FILENAME = '{engine}_model_{symbol}.pkl'
+SCORES_FILENAME = 'engine_scores_{symbol}.json'
+
+DEFAULT_CONFIG = {
+    # Engines train_models fits by default.
+    'TRAIN': list(ENGINES),
+    # Trailing days held out at training time to score each engine.
+    'HOLDOUT_DAYS': 30,
+    # "fast" companies use the quickest engine whose holdout MAPE is at most this.
+    'FAST_MAX_MAPE': 0.05,
+    # ARIMA order search is quadratic-ish in the series length; recent
+    # history is what an ARIMA forecast depends on anyway.
+    'ARIMA_WINDOW_DAYS': 730,
+}
+
+
+def engines_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'FORECAST_ENGINES', {}))
+    return config
+
+
+def daily_series(history):
+    """A ds/y frame as a calendar-daily series, carrying the last price over weekends and holidays"""
+    return history.set_index('ds')['y'].asfreq('D').ffill()
+
+
+class StatsForecaster:
+    """
+    Wraps a statsmodels/pmdarima fit in the slice of Prophet's interface the
+    forecasting code uses: `history`, `make_future_dataframe`, `predict`
+    (returning FORECAST_COLUMNS) and `plot`.
+
+    The model is fitted on calendar days, so a future date is simply a
+    number of days ahead of the last observation. There are no seasonal
+    components: `trend` is the point forecast and `weekly`/`yearly` are 0.
+    """
+    engine = None
+
+    def __init__(self, history, fitted, interval_width=0.8):
+        self.history = history
+        self.fitted = fitted
+        self.interval_width = interval_width
+
+    @classmethod
+    def fit(cls, prices, interval_width=0.8):
+        history = prices[['ds', 'y']].reset_index(drop=True)
+        return cls(history, cls.fit_series(daily_series(history)), interval_width)
+
+    @classmethod
+    def fit_series(cls, series):
+        raise NotImplementedError
+
+    def forecast(self, steps):
+        """(mean, lower, upper) arrays for 1..steps days after the last observation"""
+        raise NotImplementedError
+
+    def make_future_dataframe(self, periods, freq='D', include_history=True):
+        last_date = self.history['ds'].max()
+        dates = pd.date_range(start=last_date, periods=periods + 1, freq=freq)
+        dates = dates[dates > last_date][:periods]
+        if include_history:
+            dates = np.concatenate([self.history['ds'].to_numpy(), dates.to_numpy()])
+        return pd.DataFrame({'ds': dates})
+
+    def predict(self, future):
+        ds = pd.to_datetime(future['ds']).reset_index(drop=True)
+        steps = ((ds - self.history['ds'].max()) / pd.Timedelta(days=1)).round().astype(int).to_numpy()
+        # Dates up to the last observation get the one-day-ahead forecast;
+        # the forecasting code only ever asks for later dates.
+        steps = np.maximum(steps, 1)
+        mean, lower, upper = self.forecast(int(steps.max()) if len(steps) else 1)
+        yhat = mean[steps - 1]
+        return pd.DataFrame({
+            'ds': ds,
+            'yhat': yhat,
+            'yhat_lower': lower[steps - 1],
+            'yhat_upper': upper[steps - 1],
+            'trend': yhat,
+            'weekly': 0.0,
+            'yearly': 0.0,
+        })
+
+    def plot(self, forecast, ax):
+        ax.plot(self.history['ds'], self.history['y'], 'k.', markersize=2)
+        ax.plot(forecast['ds'], forecast['yhat'], ls='-', c='#0072B2')
+        ax.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], color='#0072B2', alpha=0.2)
+        ax.grid(True, which='major', c='gray', ls='-', lw=1, alpha=0.2)
+        return ax.figure
+
+
+class ETSForecaster(StatsForecaster):
+    """Damped additive-trend exponential smoothing (statsmodels ETSModel)"""
+    engine = Company.ETS
+
+    @classmethod
+    def fit_series(cls, series):
+        from statsmodels.tsa.exponential_smoothing.ets import ETSModel
+
+        return ETSModel(series, error='add', trend='add', damped_trend=True).fit(disp=False)
+
+    def forecast(self, steps):
+        start = self.fitted.nobs
+        frame = self.fitted.get_prediction(start=start, end=start + steps - 1).summary_frame(
+            alpha=1 - self.interval_width)
+        return frame['mean'].to_numpy(), frame['pi_lower'].to_numpy(), frame['pi_upper'].to_numpy()
+
+
+class ARIMAForecaster(StatsForecaster):
+    """Non-seasonal ARIMA with its order chosen by pmdarima's stepwise search"""
+    engine = Company.ARIMA
+
+    @classmethod
+    def fit_series(cls, series):
+        import pmdarima
+
+        window = engines_config()['ARIMA_WINDOW_DAYS']
+        return pmdarima.auto_arima(
+            series.to_numpy()[-window:], seasonal=False, stepwise=True, max_p=3, max_q=3,
+            suppress_warnings=True, error_action='ignore',
+        )
+
+    def forecast(self, steps):
+        mean, interval = self.fitted.predict(n_periods=steps, return_conf_int=True, alpha=1 - self.interval_width)
+        return np.asarray(mean), interval[:, 0], interval[:, 1]
+
+
+FORECASTERS = {
+    Company.ETS: ETSForecaster,
+    Company.ARIMA: ARIMAForecaster,
+}
+
+
+def engine_path(company_symbol, engine):
+    if engine == Company.PROPHET:
+        return model_registry.model_path(company_symbol)
+    return os.path.join(model_registry.model_dir(), ARTIFACT_FILENAME.format(engine=engine, symbol=company_symbol))
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def registry_for(engine):
+    """The model registry holding `engine` artifacts; Prophet's is app.model_registry's"""
+    if engine == Company.PROPHET:
+        return model_registry.registry
+    with _registries_lock:
+        if engine not in _registries:
+            config = getattr(settings, 'MODEL_REGISTRY', {})
+            _registries[engine] = model_registry.ModelRegistry(
+                max_entries=config.get('MAX_ENTRIES', 8),
+                max_bytes=config.get('MAX_BYTES'),
+                path_for=lambda symbol: engine_path(symbol, engine),
+            )
+        return _registries[engine]
+
+
+def get_model(company_symbol, engine=Company.PROPHET):
+    return registry_for(engine).get(company_symbol)
+
+
+def artifact_version(company_symbol, engine=Company.PROPHET):
+    return registry_for(engine).artifact_version(company_symbol)
+
+
+def artifact_mtime(company_symbol, engine=Company.PROPHET):
+    """When the engine's artifact was last written, as whole epoch seconds (HTTP dates have no fractions), or None"""
+    try:
+        return int(os.stat(engine_path(company_symbol, engine)).st_mtime)
+    except FileNotFoundError:
+        return None
+
+
+def scores_path(company_symbol):
+    return os.path.join(model_registry.model_dir(), SCORES_FILENAME.format(symbol=company_symbol))
+
+
+_scores = {}
+
+
+def read_scores(company_symbol):
+    """{engine: holdout score} recorded by train_models, re-read only when the file changes"""
+    path = scores_path(company_symbol)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _scores.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path) as fh:
+        scores = json.load(fh)
+    _scores[path] = (mtime, scores)
+    return scores
+
+
+def record_scores(company_symbol, scores):
+    """Merge {engine: score} into the symbol's scores file, replacing it atomically"""
+    merged = dict(read_scores(company_symbol), **scores)
+    path = scores_path(company_symbol)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    with open(tmp_path, 'w') as fh:
+        json.dump(merged, fh, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return merged
+
+
+def select_fast(company_symbol, max_mape=None):
+    """
+    The engine with the lowest recorded predict time among those whose
+    holdout MAPE is within `max_mape` and whose artifact exists, falling
+    back to Prophet when none qualifies.
+    """
+    max_mape = engines_config()['FAST_MAX_MAPE'] if max_mape is None else max_mape
+    candidates = [
+        (score['predict_ms'], engine)
+        for engine, score in read_scores(company_symbol).items()
+        if engine in ENGINES and score.get('mape') is not None and score['mape'] <= max_mape
+        and os.path.exists(engine_path(company_symbol, engine))
+    ]
+    return min(candidates)[1] if candidates else Company.PROPHET
+
+
+def resolve_engine(company):
+    """The engine that forecasts `company`: its configured engine, or the fast pick"""
+    engine = getattr(company, 'engine', Company.PROPHET)
+    if engine == Company.FAST:
+        return select_fast(company.symbol)
+    return engine if engine in ENGINES else Company.PROPHET
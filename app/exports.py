@@ -0,0 +1,185 @@
+#app/exports.py
+import csv
+import importlib.util
+import io
+import numpy as np
+from asgiref.sync import sync_to_async
+from .models import UserForecast
+from .persistence import run_frame
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+COLUMNS = ['symbol', 'run_at', 'engine', 'model_version', 'forecast_date', 'predicted_price', 'lower_bound', 'upper_bound']
+
+# References fetched from the database per round trip.
+ITERATOR_CHUNK = 100
+# CSV text is sent in chunks of about this many bytes.
+CSV_CHUNK_BYTES = 64 * 1024
+# Rows per Parquet row group; a row group is what the writer buffers.
+PARQUET_ROW_GROUP = 64 * 1024
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def export_references(user, company=None, start=None, end=None):
+    """The user's forecast references to export, newest first, limited to runs overlapping [start, end]"""
+    references = (
+        UserForecast.objects.filter(user=user)
+        .select_related('run__company')
+        .only('created_at', 'run__engine', 'run__model_version', 'run__series', 'run__company__symbol')
+        .order_by('-created_at', '-run')
+    )
+    if company is not None:
+        references = references.filter(run__company=company)
+    if start is not None:
+        references = references.filter(run__last_date__gte=start)
+    if end is not None:
+        references = references.filter(run__first_date__lte=end)
+    return references
+
+
+def export_batches(references, start=None, end=None):
+    """
+    One dict of columns per referenced run, its days clipped to [start, end].
+
+    References are read with .iterator(), so rows are never all in memory:
+    only one database chunk of references and one decoded run at a time.
+    """
+    for reference in references.iterator(chunk_size=ITERATOR_CHUNK):
+        run = reference.run
+        frame = run_frame(run)
+        days = frame['ds'].to_numpy(dtype='datetime64[D]')
+        keep = np.ones(len(days), dtype=bool)
+        if start is not None:
+            keep &= days >= np.datetime64(start, 'D')
+        if end is not None:
+            keep &= days <= np.datetime64(end, 'D')
+        if not keep.any():
+            continue
+        # Cents, as Prediction rows stored them, without a Decimal per value.
+        yield {
+            'symbol': run.company.symbol,
+            'run_at': reference.created_at,
+            'engine': run.engine,
+            'model_version': run.model_version,
+            'forecast_date': days[keep],
+            'predicted_price': np.round(frame['yhat'].to_numpy()[keep], 2),
+            'lower_bound': np.round(frame['yhat_lower'].to_numpy()[keep], 2),
+            'upper_bound': np.round(frame['yhat_upper'].to_numpy()[keep], 2),
+        }
+
+
+def csv_chunks(batches, chunk_bytes=CSV_CHUNK_BYTES):
+    """CSV text for export_batches, a header row first, in chunks of about `chunk_bytes`"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for batch in batches:
+        run_at = batch['run_at'].isoformat()
+        writer.writerows(
+            (batch['symbol'], run_at, batch['engine'], batch['model_version'], day, predicted, lower, upper)
+            for day, predicted, lower, upper in zip(
+                batch['forecast_date'].astype(str).tolist(), batch['predicted_price'].tolist(),
+                batch['lower_bound'].tolist(), batch['upper_bound'].tolist(),
+            )
+        )
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class ChunkSink:
+    """A write-only file object that hands out what was written since the last drain()"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(batches, row_group=PARQUET_ROW_GROUP):
+    """
+    A Parquet file for export_batches, sent as each row group is written.
+    Needs pyarrow; check parquet_available() first.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('symbol', pa.string()),
+        ('run_at', pa.timestamp('us', tz='UTC')),
+        ('engine', pa.string()),
+        ('model_version', pa.string()),
+        ('forecast_date', pa.date32()),
+        ('predicted_price', pa.float64()),
+        ('lower_bound', pa.float64()),
+        ('upper_bound', pa.float64()),
+    ])
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    pending, rows = [], 0
+
+    def write_group():
+        n = [len(batch['forecast_date']) for batch in pending]
+        columns = {
+            name: np.concatenate([batch[name] for batch in pending])
+            for name in ('forecast_date', 'predicted_price', 'lower_bound', 'upper_bound')
+        }
+        for name in ('symbol', 'run_at', 'engine', 'model_version'):
+            columns[name] = [batch[name] for batch, count in zip(pending, n) for _ in range(count)]
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+    for batch in batches:
+        pending.append(batch)
+        rows += len(batch['forecast_date'])
+        if rows >= row_group:
+            write_group()
+            pending, rows = [], 0
+            yield sink.drain()
+    if pending:
+        write_group()
+    writer.close()
+    yield sink.drain()
+
+
+async def aiterate(chunks):
+    """
+    Serve a sync chunk iterator to an ASGI server one chunk at a time.
+    StreamingHttpResponse would otherwise read a sync iterator to the end
+    before sending anything. Each step runs on the thread the request's
+    other sync work uses, so the database cursor stays on its connection.
+    """
+    chunks = iter(chunks)
+    done = object()
+    while True:
+        chunk = await sync_to_async(next)(chunks, done)
+        if chunk is done:
+            return
+        yield chunk
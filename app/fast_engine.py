@@ -0,0 +1,285 @@
+#app/fast_engine.py
+import weakref
+import threading
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+NANOSECONDS_TO_SECONDS = 1000 * 1000 * 1000
+DAY_NS = 24 * 3600 * NANOSECONDS_TO_SECONDS
+
+DEFAULT_CONFIG = {
+    'ENABLED': True,
+    # 'samples' caches simulated interval offsets per horizon day,
+    # 'analytical' uses a closed-form variance, None skips intervals
+    # (both bounds equal yhat).
+    'INTERVALS': 'samples',
+    'INTERVAL_SAMPLES': 1000,
+    'MAX_HORIZON_DAYS': 730,
+    'SEED': 0,
+}
+
+
+def fast_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'FAST_FORECAST', {}))
+    return config
+
+
+def supports(model):
+    """True if the fitted model only uses features FastProphet evaluates"""
+    return (
+        getattr(model, 'history', None) is not None
+        and model.growth in ('linear', 'flat')
+        and not model.logistic_floor
+        and model.holidays is None
+        and not model.country_holidays
+        and not model.extra_regressors
+        and all(props['condition_name'] is None for props in model.seasonalities.values())
+        and not any(model.train_component_cols['multiplicative_terms'])
+        and model.params['k'].shape[0] == 1  # MAP fit, not MCMC
+    )
+
+
+def extract_params(model):
+    """Pull everything FastProphet needs out of a fitted Prophet model as plain arrays"""
+    component_cols = model.train_component_cols
+    beta = np.asarray(model.params['beta'][0], dtype=float)
+    seasonalities = []
+    offset = 0
+    # Feature columns follow make_all_seasonality_features: one block of
+    # (sin, cos) pairs per seasonality, in declaration order.
+    for name, props in model.seasonalities.items():
+        width = 2 * props['fourier_order']
+        seasonalities.append({
+            'name': name,
+            'period': float(props['period']),
+            'fourier_order': int(props['fourier_order']),
+            'beta': beta[offset:offset + width] * component_cols[name].values[offset:offset + width],
+        })
+        offset += width
+    return {
+        'growth': model.growth,
+        'start_ns': np.int64(model.start.value),
+        't_scale_ns': np.int64(model.t_scale.value),
+        'y_scale': float(model.y_scale),
+        'k': float(model.params['k'][0][0]),
+        'm': float(model.params['m'][0][0]),
+        'delta': np.asarray(model.params['delta'][0], dtype=float),
+        'changepoints_t': np.asarray(model.changepoints_t, dtype=float),
+        'sigma_obs': float(model.params['sigma_obs'][0][0]),
+        'interval_width': float(model.interval_width),
+        'last_ds_ns': np.int64(pd.Timestamp(model.history['ds'].max()).value),
+        'seasonalities': seasonalities,
+    }
+
+
+class FastProphet:
+    """
+    Vectorized evaluation of a fitted (MAP, additive) Prophet model.
+
+    Produces the same trend, seasonal components and yhat as Prophet.predict
+    without building seasonality feature frames or drawing Monte Carlo
+    samples per request. Intervals come either from offsets simulated once
+    per model with Prophet's own generative trend model ('samples') or from
+    a closed-form approximation of that model's variance ('analytical').
+    """
+
+    def __init__(self, params, intervals='samples', n_samples=1000, max_horizon_days=730, seed=0):
+        self.params = params
+        self.intervals = intervals
+        self.n_samples = n_samples
+        self.max_horizon_days = max_horizon_days
+        self.seed = seed
+        self.last_ds = pd.Timestamp(int(params['last_ds_ns']))
+        # Mimic the bits of the Prophet API the views touch.
+        self.history = pd.DataFrame({'ds': [self.last_ds]})
+        self.growth = params['growth']
+
+        delta = params['delta']
+        cps = params['changepoints_t']
+        self._cum_delta = np.concatenate(([0.0], np.cumsum(delta)))
+        self._cum_delta_cp = np.concatenate(([0.0], np.cumsum(delta * cps)))
+        self._tables = {}
+        self._offsets = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_model(cls, model, **kwargs):
+        return cls(extract_params(model), **kwargs)
+
+    def make_future_dataframe(self, periods, freq='D', include_history=False):
+        dates = pd.date_range(start=self.last_ds, periods=periods + 1, freq=freq)
+        dates = dates[dates > self.last_ds][:periods]
+        return pd.DataFrame({'ds': dates})
+
+    def scaled_time(self, ds_ns):
+        return (ds_ns - self.params['start_ns']) / self.params['t_scale_ns']
+
+    def trend(self, t):
+        p = self.params
+        if p['growth'] == 'flat':
+            return np.full_like(t, p['m']) * p['y_scale']
+        # Piecewise linear via cumulative sums instead of a (n x S) mask.
+        idx = np.searchsorted(p['changepoints_t'], t, side='right')
+        k_t = p['k'] + self._cum_delta[idx]
+        m_t = p['m'] - self._cum_delta_cp[idx]
+        return (k_t * t + m_t) * p['y_scale']
+
+    def _table(self, seasonality):
+        # On whole-day timestamps a period p repeats exactly every
+        # cycle = p * q days for the smallest small q making that integral,
+        # so the component is a lookup into `cycle` precomputed values.
+        name = seasonality['name']
+        if name not in self._tables:
+            cycle = None
+            for q in (1, 2, 4, 8):
+                days = seasonality['period'] * q
+                if abs(days - round(days)) < 1e-9 and round(days) <= 4096:
+                    cycle = int(round(days))
+                    break
+            table = None
+            if cycle:
+                table = self._fourier(np.arange(cycle, dtype=float), seasonality)
+            self._tables[name] = (cycle, table)
+        return self._tables[name]
+
+    def _fourier(self, t_days, seasonality):
+        x = t_days * (2 * np.pi / seasonality['period'])
+        orders = np.arange(1, seasonality['fourier_order'] + 1)
+        c = np.outer(x, orders)
+        features = np.empty((len(t_days), 2 * len(orders)))
+        features[:, 0::2] = np.sin(c)
+        features[:, 1::2] = np.cos(c)
+        return features @ seasonality['beta'] * self.params['y_scale']
+
+    def seasonal(self, ds_ns, seasonality):
+        seconds = ds_ns // NANOSECONDS_TO_SECONDS
+        cycle, table = self._table(seasonality)
+        if table is not None and not (ds_ns % DAY_NS).any():
+            return table[(ds_ns // DAY_NS) % cycle]
+        return self._fourier(seconds / (3600 * 24.), seasonality)
+
+    def _interval_offsets(self):
+        """Lower/upper offsets from yhat per day after the last training date"""
+        with self._lock:
+            if self._offsets is None:
+                p = self.params
+                rng = np.random.default_rng(self.seed)
+                days = np.arange(self.max_horizon_days + 1)
+                t = self.scaled_time(p['last_ds_ns'] + days * DAY_NS)
+                t0 = t[0]
+                S = len(p['changepoints_t'])
+                lambda_ = np.mean(np.abs(p['delta'])) + 1e-8
+                dev = np.zeros((self.n_samples, len(t)))
+                if p['growth'] == 'linear':
+                    # Same generative model as Prophet.sample_predictive_trend:
+                    # Poisson(S) changepoints per unit time past the history,
+                    # Laplace(0, mean|delta|) rate changes.
+                    T = t[-1]
+                    for i in range(self.n_samples):
+                        n_changes = rng.poisson(S * (T - t0))
+                        if not n_changes:
+                            continue
+                        cps = t0 + rng.random(n_changes) * (T - t0)
+                        deltas = rng.laplace(0, lambda_, n_changes)
+                        order = np.argsort(cps)
+                        cps, deltas = cps[order], deltas[order]
+                        idx = np.searchsorted(cps, t, side='right')
+                        cum_d = np.concatenate(([0.0], np.cumsum(deltas)))
+                        cum_dc = np.concatenate(([0.0], np.cumsum(deltas * cps)))
+                        dev[i] = cum_d[idx] * t - cum_dc[idx]
+                noise = rng.normal(0, p['sigma_obs'], dev.shape)
+                sims = (dev + noise) * p['y_scale']
+                lower_p = 100 * (1.0 - p['interval_width']) / 2
+                upper_p = 100 * (1.0 + p['interval_width']) / 2
+                self._offsets = (
+                    np.percentile(sims, lower_p, axis=0),
+                    np.percentile(sims, upper_p, axis=0),
+                )
+        return self._offsets
+
+    def _analytical_halfwidth(self, t):
+        # Variance of the compound-Poisson trend deviation at horizon h:
+        # S * E[delta^2] * h^3 / 3 with E[delta^2] = 2 lambda^2, plus noise.
+        from scipy.stats import norm
+        p = self.params
+        t0 = self.scaled_time(p['last_ds_ns'])
+        h = np.clip(t - t0, 0, None)
+        S = len(p['changepoints_t'])
+        lambda_ = np.mean(np.abs(p['delta'])) + 1e-8
+        var = p['sigma_obs'] ** 2
+        if p['growth'] == 'linear':
+            var = var + S * 2 * lambda_ ** 2 * h ** 3 / 3
+        z = norm.ppf(0.5 + p['interval_width'] / 2)
+        return z * np.sqrt(var) * p['y_scale']
+
+    def predict(self, df):
+        """Forecast frame with ds, trend, per-seasonality, additive/multiplicative terms, intervals and yhat"""
+        ds = pd.to_datetime(df['ds']).reset_index(drop=True)
+        ds_ns = ds.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        t = self.scaled_time(ds_ns)
+
+        out = {'ds': ds, 'trend': self.trend(t)}
+        additive = np.zeros(len(ds))
+        for seasonality in self.params['seasonalities']:
+            component = self.seasonal(ds_ns, seasonality)
+            out[seasonality['name']] = component
+            additive = additive + component
+        out['additive_terms'] = additive
+        out['multiplicative_terms'] = np.zeros(len(ds))
+        yhat = out['trend'] + additive
+
+        if self.intervals == 'samples':
+            lower, upper = self._interval_offsets()
+            day = np.clip((ds_ns - self.params['last_ds_ns']) // DAY_NS, 0, None)
+            inside = day <= self.max_horizon_days
+            idx = np.minimum(day, self.max_horizon_days)
+            out['yhat_lower'] = yhat + lower[idx]
+            out['yhat_upper'] = yhat + upper[idx]
+            if not inside.all():
+                halfwidth = self._analytical_halfwidth(t)
+                out['yhat_lower'] = np.where(inside, out['yhat_lower'], yhat - halfwidth)
+                out['yhat_upper'] = np.where(inside, out['yhat_upper'], yhat + halfwidth)
+        elif self.intervals == 'analytical':
+            halfwidth = self._analytical_halfwidth(t)
+            out['yhat_lower'] = yhat - halfwidth
+            out['yhat_upper'] = yhat + halfwidth
+        else:
+            # Callers select the bound columns, so they are always present.
+            out['yhat_lower'] = yhat
+            out['yhat_upper'] = yhat
+        out['yhat'] = yhat
+        return pd.DataFrame(out)
+
+
+_predictors = weakref.WeakKeyDictionary()
+_predictors_lock = threading.Lock()
+
+
+def predictor_for(model):
+    """
+    Return the FastProphet for a live Prophet model, built once per model
+    object, or None if the fast engine is disabled or the model uses
+    features it does not evaluate.
+    """
+    config = fast_config()
+    if not config['ENABLED']:
+        return None
+    if isinstance(model, FastProphet):
+        return model
+    with _predictors_lock:
+        predictor = _predictors.get(model)
+    if predictor is None:
+        if not supports(model):
+            return None
+        predictor = FastProphet.from_model(
+            model,
+            intervals=config['INTERVALS'],
+            n_samples=config['INTERVAL_SAMPLES'],
+            max_horizon_days=config['MAX_HORIZON_DAYS'],
+            seed=config['SEED'],
+        )
+        with _predictors_lock:
+            _predictors[model] = predictor
+    return predictor
@@ -0,0 +1,187 @@
+#app/forecast_cache.py
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from django.conf import settings
+
+DEFAULT_CONFIG = {
+    'ENABLED': True,
+    'TTL': 6 * 3600,
+    'MAX_ENTRIES': 1000,
+    'MAX_BYTES': 64 * 1024 * 1024,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast_cache (
+    key TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS forecast_cache_symbol ON forecast_cache (symbol, version);
+CREATE INDEX IF NOT EXISTS forecast_cache_accessed ON forecast_cache (accessed_at);
+"""
+
+
+def forecast_key(symbol, version, *params):
+    """Build a stable cache key from a symbol, its artifact version and request parameters"""
+    raw = '|'.join([symbol, version or ''] + [str(p) for p in params])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def scope(symbol, engine=None):
+    """What the symbol column holds: an artifact version is only superseded within one engine"""
+    return symbol if engine is None else f'{symbol}:{engine}'
+
+
+class ForecastCache:
+    """
+    SQLite-backed forecast result store shared by every worker on the host.
+
+    Keys embed the model artifact version, so a replaced artifact can never
+    serve stale results; entries for superseded versions of a symbol's
+    artifact for an engine are dropped the next time that symbol and engine
+    are written. Each engine has its own artifact, so writing one never
+    drops another's entries.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_CONFIG['TTL'],
+                 max_entries=DEFAULT_CONFIG['MAX_ENTRIES'],
+                 max_bytes=DEFAULT_CONFIG['MAX_BYTES']):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 connections must not cross threads or survive a fork.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value FROM forecast_cache WHERE key = ? AND expires_at > ?',
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE forecast_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            self.delete(key)
+            return None
+
+    def set(self, key, symbol, version, value, ttl=None, engine=None):
+        symbol = scope(symbol, engine)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'DELETE FROM forecast_cache WHERE symbol = ? AND version != ?',
+                (symbol, version or ''),
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO forecast_cache '
+                '(key, symbol, version, value, size, created_at, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, symbol, version or '', blob, len(blob), now, expires_at, now),
+            )
+            self._evict(conn, now)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM forecast_cache WHERE expires_at <= ?', (now,))
+        if self.max_entries:
+            conn.execute(
+                'DELETE FROM forecast_cache WHERE key IN ('
+                ' SELECT key FROM forecast_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+        if self.max_bytes:
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM forecast_cache').fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute(
+                    'SELECT key, size FROM forecast_cache ORDER BY accessed_at ASC'
+                ).fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                conn.executemany('DELETE FROM forecast_cache WHERE key = ?', stale)
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM forecast_cache WHERE key = ?', (key,))
+
+    def invalidate(self, symbol, keep_version=None, engine=None):
+        """
+        Drop every entry for a symbol, or only its `engine` entries,
+        optionally keeping one artifact version
+        """
+        conn = self._connection()
+        if engine is None:
+            prefix = scope(symbol, '')
+            where, params = 'symbol = ? OR substr(symbol, 1, ?) = ?', [symbol, len(prefix), prefix]
+        else:
+            where, params = 'symbol = ?', [scope(symbol, engine)]
+        if keep_version is not None:
+            where, params = f'({where}) AND version != ?', params + [keep_version]
+        conn.execute(f'DELETE FROM forecast_cache WHERE {where}', params)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM forecast_cache')
+
+    def stats(self):
+        count, size = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM forecast_cache'
+        ).fetchone()
+        return {'entries': count, 'size_bytes': size}
+
+
+_cache = None
+_cache_config = None
+
+
+def get_forecast_cache():
+    """Return the process-wide ForecastCache configured by settings.FORECAST_CACHE, or None if disabled"""
+    global _cache, _cache_config
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'FORECAST_CACHE', {}))
+    config.setdefault('PATH', os.path.join(settings.BASE_DIR, 'forecast_cache.sqlite3'))
+    if not config['ENABLED']:
+        return None
+    if _cache is None or config != _cache_config:
+        _cache = ForecastCache(
+            config['PATH'],
+            ttl=config['TTL'],
+            max_entries=config['MAX_ENTRIES'],
+            max_bytes=config['MAX_BYTES'],
+        )
+        _cache_config = config
+    return _cache
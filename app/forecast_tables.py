@@ -0,0 +1,119 @@
+#app/forecast_tables.py
+import os
+import glob
+import threading
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from . import model_registry
+
+TABLE_COLUMNS = ['yhat', 'yhat_lower', 'yhat_upper', 'trend', 'weekly', 'yearly']
+DAY = pd.Timedelta(days=1)
+
+
+def table_dir():
+    return str(getattr(settings, 'FORECAST_TABLE_DIR', os.path.join(settings.BASE_DIR, 'forecast_tables')))
+
+
+def table_path(symbol, version):
+    return os.path.join(table_dir(), f'{symbol}-{version[:16]}.npz')
+
+
+def write_table(symbol, version, forecast, last_training_date, engine):
+    """Atomically write a precomputed daily forecast for one model version and drop older ones"""
+    os.makedirs(table_dir(), exist_ok=True)
+    path = table_path(symbol, version)
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    with open(tmp_path, 'wb') as fh:
+        np.savez(
+            fh,
+            ds=forecast['ds'].to_numpy(dtype='datetime64[ns]').astype(np.int64),
+            last_training_date=np.int64(pd.Timestamp(last_training_date).value),
+            version=np.array(version),
+            engine=np.array(engine),
+            **{column: forecast[column].to_numpy(dtype=np.float64) for column in TABLE_COLUMNS}
+        )
+    os.replace(tmp_path, path)
+    for stale in glob.glob(os.path.join(table_dir(), f'{symbol}-*.npz')):
+        if stale != path:
+            os.remove(stale)
+    return path
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def load_table(symbol, version):
+    """
+    The materialized table for a model version, or None if there is none.
+    Tables are kept per process and keyed on the file's mtime and size, as
+    ModelRegistry keys artifacts, so a table rewritten at the same version
+    (say for another engine) is picked up.
+    """
+    path = table_path(symbol, version)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    signature = (st.st_mtime_ns, st.st_size)
+    with _tables_lock:
+        cached = _tables.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with np.load(path) as data:
+        table = {name: data[name] for name in data.files}
+    if str(table['version']) != version:
+        return None
+    table['last_training_date'] = pd.Timestamp(int(table['last_training_date']))
+    with _tables_lock:
+        # Only the current version of each symbol is worth keeping around.
+        for stale in [p for p in _tables if os.path.basename(p).startswith(f'{symbol}-')]:
+            del _tables[stale]
+        _tables[path] = (signature, table)
+    return table
+
+
+def slice_forecast(symbol, version, start_date, period, freq, engine):
+    """
+    Answer a forecast request from the materialized table.
+
+    Mirrors forecasting.future_frame for daily requests: a start date before
+    the last training date is moved to the day after it. Returns None when
+    the request is not daily, or falls outside the table, so the caller can
+    predict live.
+    """
+    if freq != 'D' or start_date != start_date.normalize():
+        return None
+    table = load_table(symbol, version)
+    if table is None or str(table['engine']) != engine:
+        return None
+
+    last_training_date = table['last_training_date']
+    adjusted = start_date < last_training_date
+    first = max(start_date, last_training_date + DAY)
+    offset = (first - (last_training_date + DAY)).days
+    if offset + period > len(table['ds']):
+        return None
+
+    rows = slice(offset, offset + period)
+    forecast = pd.DataFrame({'ds': pd.to_datetime(table['ds'][rows])})
+    for column in TABLE_COLUMNS:
+        forecast[column] = table[column][rows]
+    return {
+        'forecast': forecast,
+        'last_training_date': last_training_date,
+        'adjusted': adjusted,
+    }
+
+
+def materialize(symbol, max_horizon, engine, predict):
+    """Precompute `max_horizon` days for the symbol's current artifact using `predict(model, future)`"""
+    version = model_registry.artifact_version(symbol)
+    model = model_registry.get_model(symbol)
+    if version is None or model is None:
+        raise ValueError(f"No model found for {symbol}")
+    future = model.make_future_dataframe(periods=max_horizon, freq='D', include_history=False)
+    forecast = predict(model, future)
+    last_training_date = pd.to_datetime(model.history['ds'].max()).tz_localize(None)
+    return write_table(symbol, version, forecast, last_training_date, engine)
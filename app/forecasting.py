@@ -0,0 +1,331 @@
+#app/forecasting.py
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlencode
+import django
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import reverse
+from . import compact_models, engines, model_registry
+from .fast_engine import fast_config, predictor_for
+from .forecast_cache import forecast_key, get_forecast_cache
+from .forecast_tables import slice_forecast
+from .instrumentation import inc, stage
+from .models import Company
+
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend', 'weekly', 'yearly']
+
+
+def future_frame(model, start_date, period, freq='D'):
+    """
+    Build the future dataframe covering `period` steps from `start_date`.
+
+    Returns (future, last_training_date, adjusted) where `adjusted` is True
+    if start_date was moved forward to the model's last training date.
+    """
+    # Get the last training date from the model
+    last_training_date = pd.to_datetime(model.history['ds'].max()).tz_localize(None)
+
+    # Calculate days needed to reach start_date from last training date
+    days_needed = (start_date - last_training_date).days
+
+    # If start_date is before last training date, use last training date as start
+    adjusted = days_needed < 0
+    if adjusted:
+        start_date = last_training_date
+        days_needed = 0
+
+    # Generate future dataframe
+    future = model.make_future_dataframe(
+        periods=days_needed + period,  # Enough to cover from last training to end of period
+        freq=freq,
+        include_history=False
+    )
+
+    # Filter to only include dates from start_date onward
+    future = future[future['ds'] >= start_date]
+
+    # Make sure we have enough data
+    if len(future) < period:
+        # If not enough, generate more periods
+        additional_periods = period - len(future)
+        more_future = model.make_future_dataframe(
+            periods=additional_periods,
+            freq=freq,
+            include_history=False
+        )
+        future = pd.concat([future, more_future])
+
+    # Limit to the requested period
+    return future.head(period), last_training_date, adjusted
+
+
+def predict(model, future):
+    """Predict with the NumPy engine when it supports the model, else with the model itself"""
+    predictor = predictor_for(model) or model
+    return predictor.predict(future)
+
+
+def render_plot(model, forecast, title, xlabel=None, ylabel=None):
+    """Render the model's default forecast plot (Prophet's, for Prophet models) and return the PNG bytes"""
+    # Imported here so forecasting code paths that never plot (workers,
+    # management commands) do not load matplotlib.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+    from matplotlib.figure import Figure
+
+    # A bare Figure rather than pyplot, which keeps global state and is not
+    # safe to drive from the inference threads.
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    model.plot(forecast, ax=ax)
+    ax.set_title(title)
+    if xlabel:
+        ax.set_xlabel(xlabel)
+    if ylabel:
+        ax.set_ylabel(ylabel)
+
+    buf = io.BytesIO()
+    canvas = FigureCanvas(fig)
+    canvas.print_png(buf)
+    return buf.getvalue()
+
+
+# Frequencies a forecast request may ask for, with the days one step spans.
+FREQUENCY_DAYS = {'D': 1, 'W': 7, 'M': 31}
+
+
+def horizon_allowed(period, freq):
+    """Whether `period` steps of `freq` stay within FORECAST_API['MAX_HORIZON_DAYS']"""
+    max_days = getattr(settings, 'FORECAST_API', {}).get('MAX_HORIZON_DAYS', 730)
+    return freq in FREQUENCY_DAYS and 1 <= period and period * FREQUENCY_DAYS[freq] <= max_days
+
+
+def engine_tag(engine=Company.PROPHET):
+    """Identifies the predictor configuration so cached results never mix engines"""
+    if engine != Company.PROPHET:
+        return engine
+    config = fast_config()
+    return f"fast:{config['INTERVALS']}" if config['ENABLED'] else 'prophet'
+
+
+def forecast_hash(symbol, start_date, period, freq='D', engine=Company.PROPHET):
+    """Key identifying a forecast for the current model artifact, or None if no model exists"""
+    version = engines.artifact_version(symbol, engine)
+    if version is None:
+        return None
+    return forecast_key(symbol, version, start_date.strftime('%Y-%m-%d'), period, freq, engine_tag(engine))
+
+
+def plot_url(symbol, start_date, period, freq='D', engine=Company.PROPHET):
+    query = urlencode({
+        'symbol': symbol,
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'period': period,
+        'freq': freq,
+        'engine': engine,
+    })
+    return f"{reverse('forecast_plot')}?{query}"
+
+
+def stock_forecast(company, start_date, period, freq='D', engine=None):
+    """
+    Forecast `period` steps of `company` from `start_date` with `engine`
+    (by default the company's, see engines.resolve_engine), using the shared
+    forecast cache when an identical request was already answered for the
+    current model artifact, then the materialized forecast table, and only
+    then predicting live.
+
+    Returns a dict with the forecast hash, the engine and artifact version,
+    the trimmed forecast frame, the model's last training date and the
+    start-date adjustment flag, or None if no model exists for the company.
+    """
+    symbol = company.symbol
+    engine = engine or engines.resolve_engine(company)
+    cache = get_forecast_cache()
+    version = engines.artifact_version(symbol, engine)
+    if version is None:
+        return None
+
+    tag = engine_tag(engine)
+    key = forecast_key(symbol, version, start_date.strftime('%Y-%m-%d'), period, freq, tag)
+    if cache is not None:
+        with stage('cache_lookup'):
+            result = cache.get(key)
+        if result is not None:
+            inc('forecast_cache_hits_total')
+            result.update(key=key, engine=engine, model_version=version)
+            return result
+        inc('forecast_cache_misses_total')
+
+    # Precomputed tables answer most daily requests without touching the model.
+    result = None
+    if engine == Company.PROPHET:
+        with stage('table_slice'):
+            result = slice_forecast(symbol, version, start_date, period, freq, tag)
+    if result is not None:
+        inc('forecast_table_hits_total')
+    else:
+        with stage('model_load'):
+            if engine == Company.PROPHET:
+                # A memory-mapped compact artifact predicts without unpickling Prophet.
+                model = compact_models.get_predictor(symbol) or model_registry.get_model(symbol)
+            else:
+                model = engines.get_model(symbol, engine)
+        if model is None:
+            return None
+
+        with stage('future_frame'):
+            future, last_training_date, adjusted = future_frame(model, start_date, period, freq)
+        with stage('predict'):
+            forecast = predict(model, future) if engine == Company.PROPHET else model.predict(future)
+        result = {
+            'forecast': forecast[FORECAST_COLUMNS].reset_index(drop=True),
+            'last_training_date': last_training_date,
+            'adjusted': adjusted,
+        }
+    result.update(key=key, engine=engine, model_version=version)
+    if cache is not None:
+        with stage('cache_store'):
+            cache.set(key, symbol, version, result, engine=engine)
+    return result
+
+
+def plot_png(company, start_date, period, freq='D', engine=None):
+    """
+    Return (key, png_bytes) for the plot of a forecast, rendering it only
+    if it is not already in the shared cache. Returns None if no model
+    exists for the company.
+    """
+    result = stock_forecast(company, start_date, period, freq, engine)
+    if result is None:
+        return None
+
+    cache = get_forecast_cache()
+    plot_key = f"plot:{result['key']}"
+    if cache is not None:
+        png = cache.get(plot_key)
+        if png is not None:
+            return result['key'], png
+
+    with stage('model_load'):
+        model = engines.get_model(company.symbol, result['engine'])
+    if model is None:
+        return None
+    with stage('plot'):
+        png = render_plot(model, result['forecast'], f"{company.name} Forecast", "Date", "Price ($)")
+    if cache is not None:
+        cache.set(plot_key, company.symbol, result['model_version'], png, engine=result['engine'])
+    return result['key'], png
+
+
+def forecast_payload(result):
+    """JSON-ready arrays for a stock_forecast result"""
+    forecast = result['forecast']
+    return {
+        'x': forecast['ds'].dt.strftime('%Y-%m-%d').tolist(),
+        'y': forecast['yhat'].tolist(),
+        'upper': forecast['yhat_upper'].tolist(),
+        'lower': forecast['yhat_lower'].tolist(),
+        'trend': forecast['trend'].tolist(),
+        'weekly': forecast['weekly'].tolist(),
+        'yearly': forecast['yearly'].tolist(),
+        'engine': result['engine'],
+        'last_training_date': result['last_training_date'].strftime('%Y-%m-%d'),
+        'start_date_adjusted': result['adjusted'],
+    }
+
+
+def _batch_worker(company, start_date, period, freq):
+    # Runs in a pool process; exceptions are reported per symbol by the caller.
+    result = stock_forecast(company, start_date, period, freq)
+    if result is None:
+        raise ValueError(f"Model for {company.symbol} not found.")
+    return forecast_payload(result)
+
+
+_pool = None
+_pool_workers = None
+
+
+def get_forecast_pool():
+    """Process pool shared by batch forecasts, sized by settings.FORECAST_POOL['MAX_WORKERS']"""
+    global _pool, _pool_workers
+    workers = getattr(settings, 'FORECAST_POOL', {}).get('MAX_WORKERS') or min(4, os.cpu_count() or 1)
+    if _pool is None or workers != _pool_workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        # Spawned, not forked: the pool starts inside a threaded server, and a
+        # forked child would inherit locks (the registry's, the cache
+        # connection's, logging's) that other threads held at that moment.
+        # A spawned worker has the settings module but must load the apps
+        # before it can unpickle a task.
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+        )
+        _pool_workers = workers
+    return _pool
+
+
+_inference_executor = None
+_inference_threads = None
+
+
+def get_inference_executor():
+    """Thread pool the async views run model loading, prediction and plotting on, sized by settings.FORECAST_POOL['INFERENCE_THREADS']"""
+    global _inference_executor, _inference_threads
+    threads = getattr(settings, 'FORECAST_POOL', {}).get('INFERENCE_THREADS') or min(4, os.cpu_count() or 1)
+    if _inference_executor is None or threads != _inference_threads:
+        if _inference_executor is not None:
+            _inference_executor.shutdown(wait=False)
+        _inference_executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='forecast')
+        _inference_threads = threads
+    return _inference_executor
+
+
+async def run_inference(func, *args, **kwargs):
+    """
+    Await func(*args, **kwargs) on the inference pool, so slow forecasts
+    queue for a bounded number of threads instead of blocking the event
+    loop. Context variables (the request's stage timings) carry over.
+    """
+    return await sync_to_async(func, thread_sensitive=False, executor=get_inference_executor())(*args, **kwargs)
+
+
+def batch_forecast(companies, start_date, period, freq='D', executor=None, timeout=None):
+    """
+    Forecast several companies concurrently on a process pool.
+
+    Returns {symbol: {'status': 'ok', 'forecast': payload}} or
+    {symbol: {'status': 'error', 'error': message}} per company, so a bad
+    model or a slow symbol only fails its own entry.
+    """
+    global _pool
+    if timeout is None:
+        timeout = getattr(settings, 'FORECAST_POOL', {}).get('TIMEOUT', 120)
+    executor = executor or get_forecast_pool()
+    futures = {
+        company.symbol: executor.submit(_batch_worker, company, start_date, period, freq)
+        for company in companies
+    }
+
+    results = {}
+    deadline = time.monotonic() + timeout
+    for symbol, future in futures.items():
+        try:
+            payload = future.result(timeout=max(0, deadline - time.monotonic()))
+            results[symbol] = {'status': 'ok', 'forecast': payload}
+        except FuturesTimeout:
+            future.cancel()
+            results[symbol] = {'status': 'error', 'error': 'Forecast timed out.'}
+        except BrokenProcessPool:
+            # A crashed worker poisons the pool; start a fresh one next time.
+            _pool = None
+            results[symbol] = {'status': 'error', 'error': 'Forecast worker crashed.'}
+        except Exception as e:
+            results[symbol] = {'status': 'error', 'error': str(e)}
+    return results
@@ -0,0 +1,33 @@
+#app/fragments.py
+import time
+from django.core.cache import cache
+
+# Template fragments are cached under keys that include a version number per
+# data source. Signals bump the version on writes, so stale fragments are
+# never looked up again and simply age out of the cache.
+VERSION_KEY = 'fragment-version:{}'
+
+
+def _key(name, *parts):
+    return VERSION_KEY.format(':'.join(str(p) for p in (name,) + parts))
+
+
+def versions(*names):
+    """Current version for each name (a string or a (name, *parts) tuple), in one cache round trip"""
+    keys = [_key(*name) if isinstance(name, tuple) else _key(name) for name in names]
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        # A fresh timestamp rather than 1, so a version key that was evicted
+        # can never line up with fragments rendered under an older value.
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def version(name, *parts):
+    return versions((name,) + parts)[0]
+
+
+def bump(name, *parts):
+    cache.set(_key(name, *parts), time.time_ns(), timeout=None)
@@ -0,0 +1,210 @@
+#app/jobs.py
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+import pandas as pd
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, OperationalError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .forecasting import forecast_payload, horizon_allowed, stock_forecast
+from .models import Company, ForecastJob
+from .persistence import record_forecast
+
+DEFAULT_CONFIG = {
+    'CONCURRENCY': 2,
+    'MAX_ATTEMPTS': 3,
+    # Seconds before the first retry; doubles on each further attempt.
+    'RETRY_BACKOFF': 30,
+    # A running job whose worker has not finished it within LEASE seconds is
+    # assumed to have died with it and can be claimed again.
+    'LEASE': 15 * 60,
+    'POLL_INTERVAL': 1.0,
+}
+
+
+def jobs_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'FORECAST_JOBS', {}))
+    return config
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def dedup_key(user, symbols, start_date, period, freq):
+    payload = json.dumps([user.pk, sorted(set(symbols)), str(start_date), period, freq])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def submit(user, symbols, start_date, period, freq='D'):
+    """
+    Queue a forecast for `symbols` (empty means every company), or return
+    the user's identical job that is still pending or running.
+
+    Returns (job, created). Raises ValueError if the horizon is longer than
+    FORECAST_API['MAX_HORIZON_DAYS'] allows.
+    """
+    if not horizon_allowed(period, freq):
+        raise ValueError(f"Horizon of {period} {freq} is not allowed.")
+    start_date = pd.Timestamp(start_date).date()
+    key = dedup_key(user, symbols, start_date, period, freq)
+    existing = ForecastJob.objects.filter(dedup_key=key, status__in=ForecastJob.ACTIVE).first()
+    if existing:
+        return existing, False
+    try:
+        with transaction.atomic():
+            job = ForecastJob.objects.create(
+                user=user,
+                symbols=sorted(set(symbols)),
+                start_date=start_date,
+                period=period,
+                frequency=freq,
+                dedup_key=key,
+                max_attempts=jobs_config()['MAX_ATTEMPTS'],
+            )
+        return job, True
+    except IntegrityError:
+        # Lost a race with an identical submission; the partial unique
+        # constraint guarantees that job is now active.
+        return ForecastJob.objects.get(dedup_key=key, status__in=ForecastJob.ACTIVE), False
+
+
+def claim(worker=None, now=None):
+    """
+    Claim the oldest runnable job for `worker`, or return None.
+
+    Uses a conditional UPDATE rather than row locks so that several worker
+    processes can poll the same SQLite database: only one of them sees its
+    update match the row.
+    """
+    config = jobs_config()
+    worker = worker or worker_name()
+    now = now or timezone.now()
+    runnable = (
+        ForecastJob.objects.filter(status=ForecastJob.PENDING, run_after__lte=now)
+        | ForecastJob.objects.filter(status=ForecastJob.RUNNING, locked_until__lt=now)
+    )
+    candidates = runnable.order_by('run_after', 'pk').values('pk', 'status', 'locked_until', 'attempts', 'max_attempts')
+    for candidate in candidates[:10]:
+        current = ForecastJob.objects.filter(
+            pk=candidate['pk'], status=candidate['status'], locked_until=candidate['locked_until'],
+        )
+        if candidate['attempts'] >= candidate['max_attempts']:
+            # Its last attempt died with a worker: give up instead of retrying forever.
+            current.update(
+                status=ForecastJob.FAILED, error='Worker stopped while running the job.',
+                finished_at=now, locked_until=None,
+            )
+            continue
+        claimed = current.update(
+            status=ForecastJob.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=config['LEASE']),
+            started_at=now,
+        )
+        if claimed:
+            return ForecastJob.objects.get(pk=candidate['pk'])
+    return None
+
+
+def execute(job):
+    """Forecast every symbol of a job, saving predictions for its user; errors are reported per symbol"""
+    start_date = pd.Timestamp(job.start_date)
+    companies = Company.objects.all()
+    if job.symbols:
+        companies = companies.filter(symbol__in=job.symbols)
+    companies = list(companies)
+
+    results = {}
+    for company in companies:
+        result = stock_forecast(company, start_date, job.period, job.frequency)
+        if result is None:
+            results[company.symbol] = {'status': 'error', 'error': f"Model for {company.symbol} not found."}
+            continue
+        record_forecast(company, job.user, result, start_date, job.period, job.frequency)
+        results[company.symbol] = {'status': 'ok', 'forecast': forecast_payload(result)}
+    for symbol in set(job.symbols) - {company.symbol for company in companies}:
+        results[symbol] = {'status': 'error', 'error': f"Company {symbol} not found."}
+    return {
+        'results': results,
+        'errors': sum(1 for r in results.values() if r['status'] == 'error'),
+    }
+
+
+def _record(queryset, retries=5, **fields):
+    # SQLite reports "database is locked" when other workers hold the write
+    # lock for longer than its timeout; an outcome is worth waiting for.
+    for attempt in range(retries):
+        try:
+            return queryset.update(**fields)
+        except OperationalError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+def run(job):
+    """
+    Execute a claimed job and record the outcome. An exception schedules a
+    retry with exponential backoff until the job has used max_attempts
+    (claims count as attempts, so a job that kills its worker also runs out).
+    """
+    config = jobs_config()
+    owned = ForecastJob.objects.filter(pk=job.pk, status=ForecastJob.RUNNING, locked_by=job.locked_by)
+    try:
+        result = execute(job)
+    except Exception as e:
+        if job.attempts < job.max_attempts:
+            delay = config['RETRY_BACKOFF'] * 2 ** (job.attempts - 1)
+            _record(
+                owned, status=ForecastJob.PENDING, error=str(e),
+                run_after=timezone.now() + timedelta(seconds=delay), locked_by='', locked_until=None,
+            )
+        else:
+            _record(
+                owned, status=ForecastJob.FAILED, error=str(e),
+                finished_at=timezone.now(), locked_until=None,
+            )
+    else:
+        _record(
+            owned, status=ForecastJob.SUCCEEDED, result=result, error='',
+            finished_at=timezone.now(), locked_until=None,
+        )
+    job.refresh_from_db()
+    return job
+
+
+def work(stop=None, max_jobs=None, drain=False, poll_interval=None, on_job=None):
+    """
+    Claim and run jobs in the current thread until `stop` is set, `max_jobs`
+    have run, or (with `drain`) no runnable job is left.
+    """
+    poll_interval = jobs_config()['POLL_INTERVAL'] if poll_interval is None else poll_interval
+    stop = stop or threading.Event()
+    worker = worker_name()
+    done = 0
+    while not stop.is_set() and (max_jobs is None or done < max_jobs):
+        close_old_connections()
+        try:
+            job = claim(worker)
+        except DatabaseError as e:
+            print(f"Error claiming forecast job: {str(e)}")
+            stop.wait(poll_interval)
+            continue
+        if job is None:
+            if drain:
+                break
+            stop.wait(poll_interval)
+            continue
+        job = run(job)
+        done += 1
+        if on_job:
+            on_job(job)
+    return done
@@ -0,0 +1,154 @@
+#app/loadtest.py
+import http.client
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date
+from urllib.parse import urlencode, urlsplit
+import numpy as np
+from django.middleware.csrf import CSRF_ALLOWED_CHARS, CSRF_SECRET_LENGTH
+from django.test import Client
+from django.utils.crypto import get_random_string
+
+DEFAULT_MIX = {'forecast_stock': 5, 'predict_stock': 3, 'dashboard': 2}
+
+
+def forecast_stock(rng, symbols, horizons):
+    return 'POST', '/forecast/', {
+        'company': rng.choice(symbols), 'start_date': date.today().isoformat(),
+        'period': rng.choice(horizons), 'frequency': 'D',
+    }
+
+
+def predict_stock(rng, symbols, horizons):
+    return 'POST', f'/predict/{rng.choice(symbols)}/', {'days': rng.choice(horizons)}
+
+
+def dashboard(rng, symbols, horizons):
+    return 'GET', '/dashboard/', None
+
+
+# Every view answers 200 when it worked: predict_stock reports failures by
+# redirecting to the dashboard, login_required by redirecting to the login.
+ENDPOINTS = {
+    'forecast_stock': forecast_stock,
+    'predict_stock': predict_stock,
+    'dashboard': dashboard,
+}
+
+
+def parse_mix(entries):
+    """{'endpoint': weight} from NAME=WEIGHT strings; a bare NAME weighs 1"""
+    mix = {}
+    for entry in entries:
+        name, _, weight = entry.partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f'Invalid weight in {entry!r}')
+    return mix
+
+
+def login_sessions(users):
+    """A Cookie header per user: a logged-in session plus a CSRF secret, which also serves as its token"""
+    sessions = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        csrf = get_random_string(CSRF_SECRET_LENGTH, CSRF_ALLOWED_CHARS)
+        sessions.append({
+            'Cookie': f"sessionid={client.cookies['sessionid'].value}; csrftoken={csrf}",
+            'X-CSRFToken': csrf,
+        })
+    return sessions
+
+
+def send(base_url, method, path, data, headers, timeout=60):
+    """Issue one request on a fresh connection; returns the status code once the body is read"""
+    url = urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+    try:
+        headers = dict(headers)
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def drive(base_url, sessions, symbols, horizons, mix=None, duration=None, requests=None, think=0.0, seed=0):
+    """
+    Run one thread per session, each a user picking endpoints at random by
+    the weights in `mix` until `duration` seconds have passed or it has
+    sent `requests` requests. Returns ([(endpoint, status, seconds)], elapsed);
+    a request that could not complete has status 0.
+    """
+    mix = mix or DEFAULT_MIX
+    names, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + duration if duration else None
+    barrier = threading.Barrier(len(sessions) + 1)
+    samples, lock = [], threading.Lock()
+
+    def user(n, headers):
+        rng = random.Random(seed + n)
+        barrier.wait()
+        sent = 0
+        while (requests is None or sent < requests) and (deadline is None or time.monotonic() < deadline):
+            name = rng.choices(names, weights)[0]
+            method, path, data = ENDPOINTS[name](rng, symbols, horizons)
+            start = time.perf_counter()
+            try:
+                status = send(base_url, method, path, data, headers)
+            except (OSError, http.client.HTTPException):
+                status = 0
+            with lock:
+                samples.append((name, status, time.perf_counter() - start))
+            sent += 1
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+
+    threads = [threading.Thread(target=user, args=(n, headers), daemon=True) for n, headers in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def latency_stats(samples, elapsed):
+    latencies = np.array([seconds for _, _, seconds in samples]) * 1000
+    errors = sum(1 for _, status, _ in samples if status != 200)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (None,) * 3
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else None,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'p50_ms': None if p50 is None else round(float(p50), 2),
+        'p95_ms': None if p95 is None else round(float(p95), 2),
+        'p99_ms': None if p99 is None else round(float(p99), 2),
+        'mean_ms': round(float(latencies.mean()), 2) if len(latencies) else None,
+        'max_ms': round(float(latencies.max()), 2) if len(latencies) else None,
+        'statuses': {str(status): count for status, count in sorted(Counter(s for _, s, _ in samples).items())},
+    }
+
+
+def summarize(samples, elapsed):
+    """Per-endpoint and overall throughput, latency percentiles and error rates of drive() samples"""
+    endpoints = {}
+    for sample in samples:
+        endpoints.setdefault(sample[0], []).append(sample)
+    return {
+        'endpoints': {name: latency_stats(group, elapsed) for name, group in sorted(endpoints.items())},
+        'total': latency_stats(samples, elapsed),
+    }
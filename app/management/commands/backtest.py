@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from app import engines
+from app.backtesting import backtest_config, cutoffs, run_cutoff, summarize
+from app.models import Company
+from app.training import model_args, price_dir, price_path, read_prices
+
+
+def percent(value, spec):
+    """`value` formatted by `spec`, or n/a when there was nothing to score"""
+    return 'n/a' if value is None else format(value, spec)
+
+
+class Command(BaseCommand):
+    help = (
+        'Rolling-origin backtest of every company\'s models on a process pool: fits per cutoff are cached, '
+        'so re-runs only fit new cutoffs; reports MAPE, interval coverage and fit/predict times per symbol'
+    )
+
+    def add_arguments(self, parser):
+        config = backtest_config()
+        parser.add_argument('--symbols', nargs='+', help='Only backtest these symbols')
+        parser.add_argument('--engines', nargs='+', choices=engines.ENGINES, default=[Company.PROPHET])
+        parser.add_argument('--data-dir', help='Directory of <SYMBOL>.csv price files; without one, a model\'s own history is used')
+        parser.add_argument('--initial', type=int, default=config['INITIAL_DAYS'], help='Days of training data before the first cutoff')
+        parser.add_argument('--period', type=int, default=config['PERIOD_DAYS'], help='Days between cutoffs')
+        parser.add_argument('--horizon', type=int, default=config['HORIZON_DAYS'], help='Days forecast after each cutoff')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+        parser.add_argument('--cache-dir', default=config['CACHE_DIR'], help='Where per-cutoff fits are cached')
+        parser.add_argument('--output', help='Write the report as JSON to this file')
+
+    def prices_for(self, symbol, data_dir):
+        csv_path = price_path(symbol, data_dir)
+        if os.path.exists(csv_path):
+            return read_prices(csv_path)
+        for engine in engines.ENGINES:
+            model = engines.get_model(symbol, engine)
+            if model is not None:
+                return model.history[['ds', 'y']].reset_index(drop=True)
+        return None
+
+    def model_config(self, symbol, engine):
+        if engine == Company.PROPHET:
+            # Refit with the configuration of the artifact being evaluated.
+            return model_args(engines.get_model(symbol, engine))
+        if engine == Company.ARIMA:
+            return {'window': engines.engines_config()['ARIMA_WINDOW_DAYS']}
+        return {}
+
+    def handle(self, *args, **options):
+        data_dir = options['data_dir'] or price_dir()
+        companies = Company.objects.all()
+        if options['symbols']:
+            companies = companies.filter(symbol__in=options['symbols'])
+
+        tasks = []
+        for company in companies:
+            prices = self.prices_for(company.symbol, data_dir)
+            if prices is None:
+                self.stdout.write(f'No price data or model for {company.symbol}, skipped')
+                continue
+            points = cutoffs(prices, options['initial'], options['period'], options['horizon'])
+            if not points:
+                self.stdout.write(f'{company.symbol}: {len(prices)} rows is too short for --initial {options["initial"]}, skipped')
+                continue
+            for engine in options['engines']:
+                config = self.model_config(company.symbol, engine)
+                tasks.extend(
+                    (company.symbol, engine, prices, cutoff, options['horizon'], config, options['cache_dir'])
+                    for cutoff in points
+                )
+        if not tasks:
+            raise CommandError('Nothing to backtest')
+
+        start = time.perf_counter()
+        rows, failed = [], []
+        with ProcessPoolExecutor(max_workers=max(1, min(options['workers'], len(tasks)))) as pool:
+            futures = {pool.submit(run_cutoff, *task): task for task in tasks}
+            for future in as_completed(futures):
+                symbol, engine, _, cutoff = futures[future][:4]
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    failed.append(f'{symbol} {engine} {cutoff:%Y-%m-%d}')
+                    self.stdout.write(self.style.ERROR(f'{symbol} {engine} cutoff {cutoff:%Y-%m-%d}: {str(e)}'))
+        report = summarize(rows)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'summary': report, 'cutoffs': sorted(rows, key=lambda r: (r['symbol'], r['engine'], r['cutoff']))}, fh, indent=2)
+
+        self.stdout.write(
+            f"{'symbol':<8} {'engine':<8} {'cutoffs':>7} {'cached':>6} {'MAPE':>7} {'coverage':>8} {'fit s':>7} {'predict ms':>10}"
+        )
+        for row in report:
+            self.stdout.write(
+                f"{row['symbol']:<8} {row['engine']:<8} {row['cutoffs']:>7} {row['cached']:>6} {percent(row['mape'], '.2%'):>7} "
+                f"{percent(row['coverage'], '.1%'):>8} {row['fit_seconds_mean']:>7.2f} {row['predict_ms_median']:>10.1f}"
+            )
+        self.stdout.write(f'{len(rows)} cutoffs in {time.perf_counter() - start:.1f}s')
+        if failed:
+            raise CommandError(f"Backtest failed for {', '.join(failed)}")
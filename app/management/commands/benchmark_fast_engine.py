@@ -0,0 +1,69 @@
+import json
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from app import model_registry
+from app.benchmarks import timeit
+from app.fast_engine import FastProphet, supports
+
+COMPONENTS = ['trend', 'weekly', 'yearly', 'yhat']
+
+
+class Command(BaseCommand):
+    help = 'Validates the NumPy forecast engine against Prophet.predict and benchmarks the speedup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', nargs='+', help='Symbols to benchmark (default: every artifact)')
+        parser.add_argument('--horizons', type=int, nargs='+', default=[30, 90, 365, 730])
+        parser.add_argument('--intervals', choices=['samples', 'analytical'], default='samples')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--json', action='store_true', help='Emit results as JSON')
+
+    def handle(self, *args, **options):
+        symbols = options['symbols'] or model_registry.available_symbols()
+        results = []
+        for symbol in symbols:
+            model = model_registry.get_model(symbol)
+            if model is None:
+                raise CommandError(f"No model found for {symbol}")
+            if not supports(model):
+                self.stderr.write(f"{symbol}: model uses features the fast engine does not evaluate, skipped")
+                continue
+            fast = FastProphet.from_model(model, intervals=options['intervals'])
+            for horizon in options['horizons']:
+                future = model.make_future_dataframe(periods=horizon, include_history=False)
+                expected = model.predict(future)
+                actual = fast.predict(future)
+                halfwidth = (expected['yhat_upper'] - expected['yhat_lower']).to_numpy() / 2
+                results.append({
+                    'symbol': symbol,
+                    'horizon': horizon,
+                    'prophet': timeit(lambda: model.predict(future), repeat=options['repeat']),
+                    'fast': timeit(lambda: fast.predict(future), repeat=options['repeat']),
+                    'max_abs_error': {
+                        c: float(np.max(np.abs(expected[c] - actual[c]))) for c in COMPONENTS
+                    },
+                    # Prophet's own intervals are Monte Carlo estimates, so
+                    # these are compared relative to the interval half-width.
+                    'interval_rel_error': {
+                        bound: float(np.median(np.abs(expected[bound] - actual[bound]) / halfwidth))
+                        for bound in ('yhat_lower', 'yhat_upper')
+                    },
+                })
+                row = results[-1]
+                row['speedup'] = round(row['prophet']['median_ms'] / row['fast']['median_ms'], 1)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'symbol':>8} {'horizon':>8} {'prophet ms':>11} {'fast ms':>8} {'speedup':>8} "
+            f"{'max |dyhat|':>12} {'interval err':>13}"
+        )
+        for row in results:
+            interval_err = max(row['interval_rel_error'].values())
+            self.stdout.write(
+                f"{row['symbol']:>8} {row['horizon']:>8} {row['prophet']['median_ms']:>11.1f} "
+                f"{row['fast']['median_ms']:>8.2f} {row['speedup']:>7}x "
+                f"{row['max_abs_error']['yhat']:>12.2e} {interval_err:>12.1%}"
+            )
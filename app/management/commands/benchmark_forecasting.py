@@ -0,0 +1,159 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+from unittest import mock
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from app import model_registry, utils
+from app.benchmarks import compare_to_baseline, test_database, timeit, train_synthetic_models
+from app.fast_engine import FastProphet
+from app.forecasting import FORECAST_COLUMNS, future_frame, render_plot
+from app.models import Company, User
+from app.persistence import save_forecast
+from app.views import encode_forecast
+
+
+class Command(BaseCommand):
+    help = (
+        'Times each stage of forecast_stock, predict_stock and utils.make_prediction against '
+        'synthetic Prophet models trained offline, emitting JSON comparable to a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizons', type=int, nargs='+', default=[30, 90, 365])
+        parser.add_argument('--symbol-counts', type=int, nargs='+', default=[1, 4])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--models-dir', help='Reuse (or create) synthetic models here instead of a temp dir')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+        parser.add_argument('--baseline', help='Compare against a previous JSON results file')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown vs. the baseline before a stage is flagged (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        symbols = [f'SYN{i}' for i in range(max(options['symbol_counts']))]
+        with tempfile.TemporaryDirectory() as tmp:
+            models_dir = options['models_dir'] or os.path.join(tmp, 'models')
+            self.stderr.write(f'Training synthetic models for {len(symbols)} symbols in {models_dir}')
+            train_synthetic_models(models_dir, symbols)
+
+            overrides = override_settings(
+                MODEL_DIR=models_dir,
+                FORECAST_CACHE={'ENABLED': False},
+                FORECAST_TABLE_DIR=os.path.join(tmp, 'tables'),
+            )
+            with overrides, test_database():
+                setup_test_environment()
+                try:
+                    results = self.run_suite(symbols, options)
+                finally:
+                    teardown_test_environment()
+                    model_registry.registry.clear()
+
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                report['comparison'] = compare_to_baseline(results, json.load(fh), options['tolerance'])
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output)
+        self.stdout.write(output)
+
+        regressions = [row for row in report.get('comparison', []) if row['regression']]
+        if regressions:
+            raise CommandError(f'{len(regressions)} stage(s) regressed beyond the tolerance')
+
+    def run_suite(self, symbols, options):
+        import joblib
+
+        repeat = options['repeat']
+        results = []
+
+        def record(stage, timing, **labels):
+            results.append(dict(stage=stage, **labels, **timing))
+
+        user = User.objects.create_user('bench', 'bench@example.com', 'Bench-pass1!')
+        companies = [Company.objects.create(symbol=s, name=f'Synthetic {s}') for s in symbols]
+        company = companies[0]
+        path = model_registry.model_path(company.symbol)
+
+        record('model_load.joblib', timeit(lambda: joblib.load(path), repeat=repeat))
+        model_registry.get_model(company.symbol)
+        record('model_load.registry', timeit(lambda: model_registry.get_model(company.symbol), repeat=repeat))
+
+        model = model_registry.get_model(company.symbol)
+        fast = FastProphet.from_model(model)
+        last_training_date = pd.to_datetime(model.history['ds'].max())
+        start_date = last_training_date + pd.Timedelta(days=1)
+        request = RequestFactory().post('/forecast/')
+
+        for horizon in options['horizons']:
+            labels = {'horizon': horizon}
+            future = future_frame(model, start_date, horizon)[0]
+            forecast = model.predict(future)[FORECAST_COLUMNS]
+            record('future_frame', timeit(lambda: future_frame(model, start_date, horizon), repeat=repeat), **labels)
+            record('predict.prophet', timeit(lambda: model.predict(future), repeat=repeat), **labels)
+            fast.predict(future)
+            record('predict.fast', timeit(lambda: fast.predict(future), repeat=repeat), **labels)
+            record('plot.render', timeit(
+                lambda: render_plot(model, forecast, 'Benchmark', 'Date', 'Price ($)'), repeat=repeat), **labels)
+            # What forecast_stock serializes, through the view's own encoder.
+            meta = {
+                'company_name': company.name,
+                'company_symbol': company.symbol,
+                'prophet_default': None,
+                'engine': Company.PROPHET,
+                'last_training_date': last_training_date.strftime('%Y-%m-%d'),
+            }
+            for name, encoding in (('json', 'v1'), ('columnar', 'columnar'), ('f32', 'f32')):
+                record(f'serialize.{name}', timeit(
+                    lambda: encode_forecast(request, forecast, meta, encoding), repeat=repeat), **labels)
+            result = {'key': f'benchmark-{company.symbol}-{horizon}', 'forecast': forecast}
+            record('persist.save_forecast', timeit(
+                lambda: save_forecast(company, user, result, start_date, horizon), repeat=repeat), **labels)
+
+        client = Client()
+        client.force_login(user)
+        today = pd.Timestamp.today().strftime('%Y-%m-%d')
+        for count in options['symbol_counts']:
+            batch = companies[:count]
+            for horizon in options['horizons']:
+                labels = {'horizon': horizon, 'symbols': count}
+
+                def forecast_requests():
+                    for c in batch:
+                        response = client.post('/forecast/', {
+                            'company': c.symbol, 'start_date': today, 'period': horizon, 'frequency': 'D',
+                        })
+                        if response.status_code != 200:
+                            raise CommandError(f'forecast_stock failed: {response.content[:200]}')
+
+                def predict_requests():
+                    for c in batch:
+                        client.post(f'/predict/{c.symbol}/', {'days': horizon, 'plot': 'none'})
+
+                def make_predictions():
+                    for c in batch:
+                        utils.make_prediction(c.symbol, days=horizon, user=user)
+
+                record('forecast_stock.request', timeit(forecast_requests, repeat=repeat), **labels)
+                record('predict_stock.request', timeit(predict_requests, repeat=repeat), **labels)
+                # utils only serves the symbols listed in COMPANY_MODELS.
+                with mock.patch.dict(utils.COMPANY_MODELS, {c.symbol: model_registry.model_path(c.symbol) for c in batch}):
+                    record('utils.make_prediction', timeit(make_predictions, repeat=repeat), **labels)
+        return results
@@ -0,0 +1,87 @@
+import json
+from itertools import count
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app.benchmarks import synthetic_forecast, test_database, timeit
+from app.models import Company, Prediction, User
+from app.persistence import save_forecast
+
+
+def per_row_insert(company, user, forecast):
+    # The original view loop, kept as the comparison baseline.
+    Prediction.objects.filter(company=company, user=user).delete()
+    for _, row in forecast.iterrows():
+        Prediction.objects.create(
+            company=company,
+            user=user,
+            forecast_date=row['ds'].date(),
+            predicted_price=row['yhat'],
+            lower_bound=row['yhat_lower'],
+            upper_bound=row['yhat_upper']
+        )
+
+
+def batched_replace(company, user, forecast, batch_size=500):
+    # Per-user Prediction rows written with one delete and batched inserts.
+    rows = [
+        Prediction(
+            company=company, user=user, forecast_date=ds.date(),
+            predicted_price=round(yhat, 2), lower_bound=round(lower, 2), upper_bound=round(upper, 2),
+        )
+        for ds, yhat, lower, upper in zip(
+            forecast['ds'], forecast['yhat'], forecast['yhat_lower'], forecast['yhat_upper'])
+    ]
+    with transaction.atomic():
+        Prediction.objects.filter(company=company, user=user).delete()
+        Prediction.objects.bulk_create(rows, batch_size=batch_size)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks forecast persistence against horizon length: per-user Prediction rows '
+        '(per-row create, batched replace) vs. a new shared ForecastRun and a reference to an existing one'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizons', type=int, nargs='+', default=[30, 90, 180, 365, 730])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--on-disk', action='store_true', help='Use a file-backed SQLite test database')
+        parser.add_argument('--json', action='store_true', help='Emit results as JSON')
+
+    def handle(self, *args, **options):
+        results = []
+        keys = count()
+        with test_database(on_disk=options['on_disk']):
+            company = Company.objects.create(symbol='BENCH', name='Benchmark Co.')
+            user = User.objects.create_user('bench', 'bench@example.com', 'bench')
+            for horizon in options['horizons']:
+                forecast = synthetic_forecast(horizon)
+                start = forecast['ds'][0]
+
+                def new_run():
+                    result = {'key': f'bench-{next(keys)}', 'forecast': forecast}
+                    save_forecast(company, user, result, start, horizon, engine='bench')
+
+                shared = {'key': f'bench-shared-{horizon}', 'forecast': forecast}
+                save_forecast(company, user, shared, start, horizon, engine='bench')
+                results.append({
+                    'horizon': horizon,
+                    'per_row': timeit(lambda: per_row_insert(company, user, forecast), repeat=options['repeat']),
+                    'bulk': timeit(lambda: batched_replace(company, user, forecast), repeat=options['repeat']),
+                    'run_new': timeit(new_run, repeat=options['repeat']),
+                    'run_shared': timeit(
+                        lambda: save_forecast(company, user, shared, start, horizon, engine='bench'),
+                        repeat=options['repeat'],
+                    ),
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'horizon':>8} {'per-row ms':>12} {'bulk ms':>10} {'new run ms':>11} {'shared ms':>10}")
+        for row in results:
+            self.stdout.write(
+                f"{row['horizon']:>8} {row['per_row']['median_ms']:>12.1f} {row['bulk']['median_ms']:>10.1f} "
+                f"{row['run_new']['median_ms']:>11.1f} {row['run_shared']['median_ms']:>10.1f}"
+            )
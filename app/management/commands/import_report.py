@@ -0,0 +1,95 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Packages that should only be imported by the code paths that need them.
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'prophet', 'cmdstanpy', 'plotly', 'joblib', 'scipy')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+STARTUP_SCRIPT = '''
+import importlib, sys
+import django
+django.setup()
+importlib.import_module({urlconf!r})
+sys.stderr.write('import time: startup done\\n')
+for name in {modules!r}:
+    importlib.import_module(name)
+'''
+
+
+def parse_importtime(output):
+    """(self us, cumulative us, depth, module) per line of `python -X importtime` output"""
+    rows = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            rows.append((int(own), int(cumulative), len(indent) // 2, name))
+    return rows
+
+
+def summarize(rows, top):
+    # Only top-level imports: nested ones are already in their parent's cumulative time.
+    roots = [(cumulative, name) for _, cumulative, depth, name in rows if depth == 0]
+    loaded = {name.split('.')[0] for *_, name in rows}
+    return {
+        'total_ms': round(sum(cumulative for cumulative, _ in roots) / 1000, 1),
+        'modules': len(rows),
+        'heavy': [name for name in HEAVY_MODULES if name in loaded],
+        'top': [
+            {'module': name, 'cumulative_ms': round(cumulative / 1000, 1)}
+            for cumulative, name in sorted(roots, reverse=True)[:top]
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Reports the import time of a fresh process running django.setup() and loading the URLconf, '
+        'i.e. what every worker boot and manage.py command pays, and which heavy packages it pulls in'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', action='append', default=[], dest='modules',
+                            help='Also report the extra cost of importing this module after startup (repeatable)')
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--budget-ms', type=float, help='Fail if startup imports take longer than this')
+        parser.add_argument('--allow-heavy', action='store_true',
+                            help='Do not fail when startup imports a heavy package')
+        parser.add_argument('--json', action='store_true', help='Emit results as JSON')
+
+    def handle(self, *args, **options):
+        script = STARTUP_SCRIPT.format(urlconf=settings.ROOT_URLCONF, modules=options['modules'])
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'Time_series.settings'))
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(f'Import failed:\n{process.stderr[-2000:]}')
+        startup, _, extra = process.stderr.partition('import time: startup done\n')
+        report = {'startup': summarize(parse_importtime(startup), options['top'])}
+        if options['modules']:
+            report['modules'] = summarize(parse_importtime(extra), options['top'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            for section, summary in report.items():
+                self.stdout.write(
+                    f"{section}: {summary['total_ms']:.1f} ms, {summary['modules']} modules, "
+                    f"heavy: {', '.join(summary['heavy']) or 'none'}"
+                )
+                for row in summary['top']:
+                    self.stdout.write(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+
+        startup = report['startup']
+        if startup['heavy'] and not options['allow_heavy']:
+            raise CommandError(f"Startup imports heavy packages: {', '.join(startup['heavy'])}")
+        if options['budget_ms'] is not None and startup['total_ms'] > options['budget_ms']:
+            raise CommandError(f"Startup imports took {startup['total_ms']:.1f} ms, over the {options['budget_ms']:.0f} ms budget")
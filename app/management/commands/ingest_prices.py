@@ -0,0 +1,43 @@
+import glob
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from app.models import Company
+from app.prices import CHUNK_SIZE, ingest_csv
+from app.training import price_dir
+
+
+class Command(BaseCommand):
+    help = 'Streams daily price CSVs (<SYMBOL>.csv) into PriceBar rows in chunks; re-runs only write changed dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='CSV files or directories of them (default PRICE_DATA_DIR)')
+        parser.add_argument('--symbol', help='Company symbol for a single CSV not named <SYMBOL>.csv')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--no-update', action='store_true', help='Only add missing dates, never change stored ones')
+
+    def handle(self, *args, **options):
+        files = []
+        for path in options['paths'] or [price_dir()]:
+            if os.path.isdir(path):
+                files.extend(sorted(glob.glob(os.path.join(path, '*.csv'))))
+            elif os.path.exists(path):
+                files.append(path)
+            else:
+                raise CommandError(f'{path} does not exist')
+        if options['symbol'] and len(files) != 1:
+            raise CommandError('--symbol needs exactly one CSV file')
+
+        companies = {company.symbol: company for company in Company.objects.all()}
+        for path in files:
+            symbol = options['symbol'] or os.path.splitext(os.path.basename(path))[0]
+            company = companies.get(symbol)
+            if company is None:
+                self.stdout.write(f'No company {symbol}, skipped {path}')
+                continue
+            start = time.perf_counter()
+            stats = ingest_csv(path, company, options['chunk_size'], update=not options['no_update'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{symbol}: {stats['rows']} rows, {stats['created']} created, {stats['updated']} updated, "
+                f"{stats['unchanged']} unchanged, {stats['skipped']} skipped in {time.perf_counter() - start:.2f}s"
+            ))
@@ -0,0 +1,114 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.test.testcases import LiveServerThread
+from app import loadtest, model_registry
+from app.benchmarks import test_database, train_synthetic_models
+from app.db import tuning_config
+from app.models import Company, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests the forecast views: serves the app on a local threaded test server backed by a throwaway '
+        'on-disk database and synthetic models, drives it with concurrent logged-in users, and reports '
+        'throughput, p50/p95/p99 latency and error rates per endpoint as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Concurrent users, each with its own session')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run for')
+        parser.add_argument('--requests', type=int, help='Stop each user after this many requests instead')
+        parser.add_argument('--mix', nargs='+', metavar='ENDPOINT=WEIGHT',
+                            default=[f'{name}={weight}' for name, weight in loadtest.DEFAULT_MIX.items()])
+        parser.add_argument('--symbols', type=int, default=4, help='Synthetic companies (and models) to forecast')
+        parser.add_argument('--horizons', type=int, nargs='+', default=[30, 90])
+        parser.add_argument('--think-ms', type=float, default=0.0, help='Mean pause between a user\'s requests')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--models-dir', help='Reuse (or create) synthetic models here instead of a temp dir')
+        parser.add_argument('--no-cache', action='store_true', help='Disable the forecast result cache')
+        parser.add_argument('--sqlite-tuning', action='store_true', help='Run with SQLITE_TUNING enabled')
+        parser.add_argument('--max-error-rate', type=float, help='Fail if more than this fraction of requests failed')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        symbols = [f'SYN{i}' for i in range(options['symbols'])]
+        with tempfile.TemporaryDirectory() as tmp:
+            models_dir = options['models_dir'] or os.path.join(tmp, 'models')
+            self.stderr.write(f'Training synthetic models for {len(symbols)} symbols in {models_dir}')
+            train_synthetic_models(models_dir, symbols)
+
+            overrides = override_settings(
+                MODEL_DIR=models_dir,
+                FORECAST_CACHE={'ENABLED': not options['no_cache'], 'PATH': os.path.join(tmp, 'forecast_cache.sqlite3')},
+                FORECAST_TABLE_DIR=os.path.join(tmp, 'tables'),
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                SQLITE_TUNING=dict(tuning_config(), ENABLED=options['sqlite_tuning']),
+                ALLOWED_HOSTS=['127.0.0.1', 'localhost'],
+            )
+            # On disk, so the server's request threads each use their own
+            # connection and commits cost what they cost in production.
+            with overrides, test_database(on_disk=True):
+                try:
+                    samples, elapsed = self.run_load(symbols, mix, options)
+                finally:
+                    model_registry.registry.clear()
+
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'users': options['users'],
+                'elapsed_s': round(elapsed, 3),
+                'mix': mix,
+                'symbols': len(symbols),
+                'horizons': options['horizons'],
+                'forecast_cache': not options['no_cache'],
+                'sqlite_tuning': options['sqlite_tuning'],
+            },
+            **loadtest.summarize(samples, elapsed),
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output)
+        self.stdout.write(output)
+
+        error_rate = report['total']['error_rate'] or 0
+        if options['max_error_rate'] is not None and error_rate > options['max_error_rate']:
+            raise CommandError(f"Error rate {error_rate:.2%} is over {options['max_error_rate']:.2%}")
+
+    def run_load(self, symbols, mix, options):
+        Company.objects.bulk_create([Company(symbol=s, name=f'Synthetic {s}') for s in symbols])
+        users = User.objects.bulk_create([
+            User(username=f'load{n}', email=f'load{n}@example.com') for n in range(options['users'])
+        ])
+        sessions = loadtest.login_sessions(users)
+
+        server = LiveServerThread('127.0.0.1', lambda handler: handler)
+        server.daemon = True
+        server.start()
+        server.is_ready.wait()
+        if server.error:
+            raise CommandError(f'Test server failed to start: {server.error}')
+        base_url = f'http://127.0.0.1:{server.port}'
+        self.stderr.write(f'Driving {base_url} with {len(sessions)} users')
+        try:
+            return loadtest.drive(
+                base_url, sessions, symbols, options['horizons'], mix,
+                duration=None if options['requests'] else options['duration'],
+                requests=options['requests'], think=options['think_ms'] / 1000, seed=options['seed'],
+            )
+        finally:
+            server.terminate()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from app import model_registry
+from app.forecast_tables import materialize
+from app.forecasting import engine_tag, predict
+from app.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Precomputes daily forecasts per company and model version for forecast_stock/predict_stock to slice (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-horizon', type=int, default=730, help='Days to precompute past the last training date')
+        parser.add_argument('--symbols', nargs='+', help='Only materialize these symbols')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.all()
+        if options['symbols']:
+            companies = companies.filter(symbol__in=options['symbols'])
+
+        engine = engine_tag()
+        for company in companies:
+            if model_registry.artifact_version(company.symbol) is None:
+                self.stdout.write(f'No model for {company.symbol}, skipped')
+                continue
+            path = materialize(company.symbol, options['max_horizon'], engine, predict)
+            self.stdout.write(self.style.SUCCESS(f'Materialized {company.symbol}: {path}'))
+
+        self.stdout.write(self.style.SUCCESS('Successfully materialized forecasts'))
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from app.models import ForecastRun, Prediction, UserForecast
+from app.persistence import compact_forecasts, prune_forecasts, runs_config
+
+
+class Command(BaseCommand):
+    help = 'Drops stored forecasts past their retention and compacts older runs to float32 yhat and bounds'
+
+    def add_arguments(self, parser):
+        config = runs_config()
+        parser.add_argument('--retention-days', type=int, default=config['RETENTION_DAYS'])
+        parser.add_argument('--compact-after', type=int, default=config['COMPACT_AFTER_DAYS'],
+                            help='Compact runs older than this many days')
+        parser.add_argument('--legacy-predictions', action='store_true',
+                            help='Also delete the per-user Prediction rows written before ForecastRun (migration 0007 copied them into runs)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options['dry_run']:
+            cutoff = now - timedelta(days=options['retention_days'])
+            kept = UserForecast.objects.filter(run=OuterRef('pk'), created_at__gte=cutoff)
+            references = UserForecast.objects.filter(created_at__lt=cutoff).count()
+            runs = ForecastRun.objects.filter(created_at__lt=cutoff).exclude(Exists(kept)).count()
+            compact = ForecastRun.objects.filter(
+                created_at__lt=now - timedelta(days=options['compact_after']), compacted=False,
+            ).count()
+            legacy = Prediction.objects.count() if options['legacy_predictions'] else 0
+            self.stdout.write(
+                f'Would delete {references} references and {runs} runs, compact {compact} runs'
+                + (f', delete {legacy} legacy predictions' if options['legacy_predictions'] else '')
+            )
+            return
+
+        references, runs = prune_forecasts(options['retention_days'], now)
+        compacted = compact_forecasts(options['compact_after'], now)
+        message = f'Deleted {references} references and {runs} runs, compacted {compacted} runs'
+        if options['legacy_predictions']:
+            legacy, _ = Prediction.objects.all().delete()
+            message += f', deleted {legacy} legacy predictions'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,50 @@
+import signal
+import threading
+from django.core.management.base import BaseCommand
+from django.db import connections
+from app import jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued forecast jobs from the database with a bounded number of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Worker threads (default FORECAST_JOBS["CONCURRENCY"])')
+        parser.add_argument('--max-jobs', type=int, help='Exit after each thread has run this many jobs')
+        parser.add_argument('--drain', action='store_true', help='Exit once no runnable job is left')
+        parser.add_argument('--poll-interval', type=float, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or jobs.jobs_config()['CONCURRENCY']
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+
+        lock = threading.Lock()
+        counts = {'ran': 0}
+
+        def report(job):
+            with lock:
+                counts['ran'] += 1
+            self.stdout.write(f'Job {job.pk} ({", ".join(job.symbols) or "all"}): {job.status}')
+
+        def worker():
+            try:
+                jobs.work(
+                    stop=stop, max_jobs=options['max_jobs'], drain=options['drain'],
+                    poll_interval=options['poll_interval'], on_job=report,
+                )
+            finally:
+                connections.close_all()
+
+        self.stdout.write(f'Starting {concurrency} forecast worker thread(s)')
+        threads = [threading.Thread(target=worker, name=f'forecast-worker-{i}') for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            # Join in short slices so the main thread keeps handling signals.
+            while thread.is_alive():
+                thread.join(0.5)
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {counts["ran"]} job(s)'))
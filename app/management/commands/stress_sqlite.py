@@ -0,0 +1,128 @@
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test.utils import override_settings
+from app.benchmarks import scratch_database, synthetic_forecast
+from app.db import BatchWriter, tuning_config
+from app.models import Company, ForecastRun, User, UserForecast
+from app.persistence import save_forecast
+
+# default: Django's stock SQLite connection; tuned: SQLITE_TUNING pragmas and
+# IMMEDIATE transactions; batched: tuned, with writes through a BatchWriter.
+MODES = ('default', 'tuned', 'batched')
+
+
+def stress(alias, mode, writers, writes, horizon, shared):
+    """
+    Run `writers` threads that each save `writes` forecasts to `alias` at the
+    same time; one in `shared` saves reference a run every writer shares, the
+    rest create their own. Returns the mode's report row.
+    """
+    company = Company.objects.using(alias).create(symbol='STRESS', name='Stress Co.')
+    users = User.objects.using(alias).bulk_create(
+        [User(username=f'stress{n}', email=f'stress{n}@example.com') for n in range(writers)])
+    forecast = synthetic_forecast(horizon)
+    start = forecast['ds'][0]
+    writer = BatchWriter(tuning_config()['BATCH_SIZE'], using=alias) if mode == 'batched' else None
+    barrier = threading.Barrier(writers)
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def write(n):
+        try:
+            barrier.wait()
+            for i in range(writes):
+                key = f'stress-shared-{i}' if i % shared == 0 else f'stress-{n}-{i}'
+                args = (company, users[n], {'key': key, 'forecast': forecast}, start, horizon, 'D', 'stress')
+                began = time.perf_counter()
+                try:
+                    if writer:
+                        writer.submit(save_forecast, *args, using=alias).result()
+                    else:
+                        save_forecast(*args, using=alias)
+                except Exception as e:
+                    with lock:
+                        failures.append(e)
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - began)
+        finally:
+            connections[alias].close()
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - began
+    if writer:
+        writer.close()
+
+    locked = [e for e in failures if isinstance(e, OperationalError) and 'locked' in str(e)]
+    errors = [e for e in failures if e not in locked]
+    return {
+        'mode': mode,
+        'writers': writers,
+        'writes': writers * writes,
+        'locked': len(locked),
+        'errors': len(errors),
+        'first_error': str(errors[0]) if errors else None,
+        'seconds': round(seconds, 3),
+        'writes_per_s': round(len(latencies) / seconds, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p95_ms': round(statistics.quantiles(latencies, n=20)[-1] * 1000, 2) if len(latencies) > 1 else None,
+        'batches': writer.batches if writer else None,
+        'runs': ForecastRun.objects.using(alias).count(),
+        'references': UserForecast.objects.using(alias).count(),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress-tests forecast writes from concurrent threads on a scratch SQLite file, with the stock '
+        'connection, with SQLITE_TUNING applied and with batched writes; reports lock errors and throughput'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--writes', type=int, default=25, help='Forecasts saved per writer')
+        parser.add_argument('--horizon', type=int, default=90)
+        parser.add_argument('--shared', type=int, default=4, help='Every n-th save references a run all writers share')
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if a tuned or batched mode hit any lock or other error')
+        parser.add_argument('--json', action='store_true', help='Emit results as JSON')
+
+    def handle(self, *args, **options):
+        results = []
+        for mode in options['modes']:
+            tuning = dict(tuning_config(), ENABLED=mode != 'default')
+            # Each mode gets a fresh file: WAL mode persists in the database.
+            with tempfile.TemporaryDirectory() as tmpdir, override_settings(SQLITE_TUNING=tuning), \
+                    scratch_database(os.path.join(tmpdir, 'stress.sqlite3'), alias='stress') as alias:
+                results.append(stress(
+                    alias, mode, options['writers'], options['writes'], options['horizon'], options['shared']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(
+                f"{'mode':<8} {'writes':>6} {'locked':>6} {'errors':>6} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+            for row in results:
+                self.stdout.write(
+                    f"{row['mode']:<8} {row['writes']:>6} {row['locked']:>6} {row['errors']:>6} "
+                    f"{row['writes_per_s']:>9.1f} {row['p50_ms'] or 0:>8.1f} {row['p95_ms'] or 0:>8.1f}"
+                )
+                if row['first_error']:
+                    self.stdout.write(f"  first error: {row['first_error']}")
+
+        if options['check']:
+            failed = [row['mode'] for row in results if row['mode'] != 'default' and (row['locked'] or row['errors'])]
+            if failed:
+                raise CommandError(f"Write errors under {', '.join(failed)}")
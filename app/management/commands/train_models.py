@@ -0,0 +1,82 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from app import engines
+from app.models import Company
+from app.training import fit_symbol, price_dir, price_path
+
+
+class Command(BaseCommand):
+    help = (
+        'Fits each engine\'s model per company from <PRICE_DATA_DIR>/<SYMBOL>.csv on a process pool, '
+        'atomically replacing <engine>_model_<SYMBOL>.pkl (Prophet warm-starts from the previous artifact), '
+        'and records each engine\'s holdout accuracy and predict time for the "fast" engine choice'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-dir', help='Directory of <SYMBOL>.csv price files (default PRICE_DATA_DIR)')
+        parser.add_argument('--symbols', nargs='+', help='Only train these symbols')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+        parser.add_argument('--cold', action='store_true', help='Ignore previous artifacts and fit from scratch')
+        parser.add_argument('--engines', nargs='+', choices=engines.ENGINES, help='Engines to fit (default FORECAST_ENGINES["TRAIN"])')
+        parser.add_argument('--holdout', type=int, help='Days held out to score each engine, 0 to skip (default FORECAST_ENGINES["HOLDOUT_DAYS"])')
+        parser.add_argument('--output', help='Write the fit report as JSON to this file')
+
+    def handle(self, *args, **options):
+        config = engines.engines_config()
+        data_dir = options['data_dir'] or price_dir()
+        engine_names = options['engines'] or config['TRAIN']
+        holdout = config['HOLDOUT_DAYS'] if options['holdout'] is None else options['holdout']
+        companies = Company.objects.all()
+        if options['symbols']:
+            companies = companies.filter(symbol__in=options['symbols'])
+
+        jobs = {}
+        for company in companies:
+            csv_path = price_path(company.symbol, data_dir)
+            if not os.path.exists(csv_path):
+                self.stdout.write(f'No price data for {company.symbol} ({csv_path}), skipped')
+                continue
+            for engine in engine_names:
+                jobs[company.symbol, engine] = (csv_path, engines.engine_path(company.symbol, engine))
+        if not jobs:
+            raise CommandError(f'No price CSVs found in {data_dir}')
+
+        report = []
+        with ProcessPoolExecutor(max_workers=max(1, min(options['workers'], len(jobs)))) as pool:
+            futures = [
+                pool.submit(fit_symbol, symbol, csv_path, artifact_path, not options['cold'], engine, holdout)
+                for (symbol, engine), (csv_path, artifact_path) in jobs.items()
+            ]
+            for future in as_completed(futures):
+                row = future.result()
+                report.append(row)
+                if row['status'] == 'ok':
+                    start = 'warm' if row['warm_start'] else 'cold'
+                    score = row.get('score')
+                    mape = 'n/a' if score is None or score['mape'] is None else f"{score['mape']:.2%}"
+                    accuracy = f", holdout MAPE {mape}, predict {score['predict_ms']:.1f}ms" if score else ''
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{row['symbol']} {row['engine']}: {row['rows']} rows, {start} fit in {row['fit_seconds']:.2f}s{accuracy}"
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f"{row['symbol']} {row['engine']}: {row['error']}"))
+
+        report.sort(key=lambda row: (row['symbol'], row['engine']))
+        scores = {}
+        for row in report:
+            if row['status'] == 'ok' and row.get('score'):
+                scores.setdefault(row['symbol'], {})[row['engine']] = dict(row['score'], last_date=row['last_date'])
+        for symbol, symbol_scores in scores.items():
+            engines.record_scores(symbol, symbol_scores)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+        failed = [f"{row['symbol']} ({row['engine']})" for row in report if row['status'] != 'ok']
+        if failed:
+            raise CommandError(f"Training failed for {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained {len(report)} model(s); rerun convert_models and materialize_forecasts to refresh derived artifacts'
+        ))
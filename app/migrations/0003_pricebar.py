@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_forecastjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('open', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('high', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('low', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('adj_close', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('volume', models.BigIntegerField(blank=True, null=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_bars', to='app.company')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('company', 'date'), name='unique_price_bar')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_pricebar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model_version', models.CharField(max_length=64)),
+                ('engine', models.CharField(max_length=32)),
+                ('start_date', models.DateField()),
+                ('period', models.PositiveIntegerField()),
+                ('frequency', models.CharField(default='D', max_length=10)),
+                ('first_date', models.DateField(null=True)),
+                ('last_date', models.DateField(null=True)),
+                ('series', models.BinaryField()),
+                ('compacted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecast_runs', to='app.company')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='users', to='app.forecastrun')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='forecastrun',
+            index=models.Index(fields=['created_at'], name='forecastrun_created'),
+        ),
+        migrations.AddIndex(
+            model_name='userforecast',
+            index=models.Index(fields=['user', '-created_at', 'run'], name='userforecast_recent'),
+        ),
+        migrations.AddConstraint(
+            model_name='userforecast',
+            constraint=models.UniqueConstraint(fields=('user', 'run'), name='unique_user_forecast'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Review = apps.get_model('app', 'Review')
+    CompanyRating = apps.get_model('app', 'CompanyRating')
+    alias = schema_editor.connection.alias
+    totals = Review.objects.using(alias).values('company_id').annotate(
+        count=Count('id'),
+        total=Sum('rating'),
+        **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    ).order_by()
+    CompanyRating.objects.using(alias).bulk_create([CompanyRating(**row) for row in totals])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_forecastrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyRating',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating', serialize=False, to='app.company')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['company', '-created_at', '-id'], name='review_company_recent'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
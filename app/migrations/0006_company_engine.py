@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_companyrating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='engine',
+            field=models.CharField(choices=[('prophet', 'Prophet'), ('ets', 'Exponential smoothing (ETS)'), ('arima', 'ARIMA'), ('fast', 'Fastest engine within the accuracy threshold')], default='prophet', max_length=10),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:30
+
+import hashlib
+import pandas as pd
+from django.db import migrations
+
+from app.encoding import pack_frame
+
+LEGACY = 'legacy'
+
+
+def frequency(dates):
+    if len(dates) < 2:
+        return 'D'
+    step = (dates[1] - dates[0]).days
+    return 'W' if step == 7 else 'M' if step >= 28 else 'D'
+
+
+def migrate_predictions(apps, schema_editor):
+    """
+    Turn each user's legacy Prediction rows into a ForecastRun and a
+    reference to it. Views replaced a user's rows for a company on every
+    forecast, so those rows are exactly one forecast.
+    """
+    Prediction = apps.get_model('app', 'Prediction')
+    ForecastRun = apps.get_model('app', 'ForecastRun')
+    UserForecast = apps.get_model('app', 'UserForecast')
+    alias = schema_editor.connection.alias
+    pairs = Prediction.objects.using(alias).values_list('user_id', 'company_id').distinct().order_by('user_id', 'company_id')
+    for user_id, company_id in pairs:
+        rows = list(
+            Prediction.objects.using(alias).filter(user_id=user_id, company_id=company_id)
+            .order_by('forecast_date')
+            .values_list('forecast_date', 'predicted_price', 'lower_bound', 'upper_bound', 'created_at')
+        )
+        dates = [row[0] for row in rows]
+        forecast = pd.DataFrame({
+            'ds': pd.to_datetime(dates),
+            'yhat': [float(row[1]) for row in rows],
+            'yhat_lower': [float(row[2]) for row in rows],
+            'yhat_upper': [float(row[3]) for row in rows],
+        })
+        created_at = max(row[4] for row in rows)
+        key = hashlib.sha256(f'{LEGACY}|{user_id}|{company_id}|{dates[0]}|{dates[-1]}'.encode('utf-8')).hexdigest()
+        run = ForecastRun.objects.using(alias).create(
+            key=key,
+            company_id=company_id,
+            model_version=LEGACY,
+            engine=LEGACY,
+            start_date=dates[0],
+            period=len(rows),
+            frequency=frequency(dates),
+            first_date=dates[0],
+            last_date=dates[-1],
+            series=pack_frame(forecast, ['yhat', 'yhat_lower', 'yhat_upper']),
+        )
+        # auto_now_add stamped the run with today; retention counts from the forecast.
+        ForecastRun.objects.using(alias).filter(pk=run.pk).update(created_at=created_at)
+        UserForecast.objects.using(alias).create(user_id=user_id, run=run, created_at=created_at)
+
+
+def remove_migrated_runs(apps, schema_editor):
+    ForecastRun = apps.get_model('app', 'ForecastRun')
+    ForecastRun.objects.using(schema_editor.connection.alias).filter(engine=LEGACY).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_company_engine'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate_predictions, remove_migrated_runs),
+    ]
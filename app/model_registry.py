@@ -0,0 +1,234 @@
+#app/model_registry.py
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+MODEL_FILENAME = 'prophet_model_{symbol}.pkl'
+
+
+def model_dir():
+    return str(getattr(settings, 'MODEL_DIR', os.path.join(settings.BASE_DIR, 'app', 'models')))
+
+
+def model_path(company_symbol):
+    return os.path.join(model_dir(), MODEL_FILENAME.format(symbol=company_symbol))
+
+
+def _joblib_load(path):
+    import joblib
+    return joblib.load(path)
+
+
+def _file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Per-process LRU of live models loaded from per-symbol artifacts
+    (unpickled Prophet models by default; see `path_for` and `loader`).
+
+    Entries are keyed by company symbol and remember the artifact's
+    (mtime, size) signature and content hash. Every lookup stats the file:
+    an unchanged signature is a hit, a changed signature triggers a re-hash
+    and the model is only reloaded if the content actually changed.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=None, path_for=None, loader=None):
+        self.path_for = path_for or model_path
+        self.loader = loader or _joblib_load
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._digests = {}
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    def _signature(self, path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def artifact_version(self, company_symbol):
+        """Return the content hash of the symbol's artifact, or None if missing.
+
+        Hashes are memoised on the file signature, so this is a single stat()
+        call unless the artifact was touched or replaced.
+        """
+        path = self.path_for(company_symbol)
+        try:
+            signature = self._signature(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._digests.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+        digest = _file_digest(path)
+        with self._lock:
+            self._digests[path] = (signature, digest)
+        return digest
+
+    def get(self, company_symbol):
+        """Return the live model for a symbol, loading it on first use.
+
+        Returns None when no artifact exists for the symbol.
+        """
+        path = self.path_for(company_symbol)
+        try:
+            signature = self._signature(path)
+        except FileNotFoundError:
+            self.discard(company_symbol)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(company_symbol)
+            if entry and entry['signature'] == signature:
+                self._entries.move_to_end(company_symbol)
+                self.hits += 1
+                return entry['model']
+            load_lock = self._load_locks.setdefault(company_symbol, threading.Lock())
+
+        # Load outside the registry lock so one slow unpickle does not block
+        # lookups for other symbols; the per-symbol lock stops a stampede.
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(company_symbol)
+                if entry and entry['signature'] == signature:
+                    self._entries.move_to_end(company_symbol)
+                    self.hits += 1
+                    return entry['model']
+
+            digest = self.artifact_version(company_symbol)
+            if entry and entry['digest'] == digest:
+                # Touched but not modified: keep the live object.
+                with self._lock:
+                    entry['signature'] = signature
+                    self._entries.move_to_end(company_symbol)
+                    self.hits += 1
+                    return entry['model']
+
+            with self._lock:
+                self.misses += 1
+                if entry:
+                    self.invalidations += 1
+
+            model = self._load(path)
+            with self._lock:
+                self._entries[company_symbol] = {
+                    'model': model,
+                    'signature': signature,
+                    'digest': digest,
+                    'size': signature[1],
+                }
+                self._entries.move_to_end(company_symbol)
+                self._evict()
+            return model
+
+    def _load(self, path):
+        start = time.perf_counter()
+        model = self.loader(path)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.loads += 1
+            self.load_time += elapsed
+        return model
+
+    def _evict(self):
+        # Artifact size on disk is used as the memory estimate for an entry.
+        while len(self._entries) > 1 and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self.total_bytes() > self.max_bytes)
+        ):
+            symbol, _ = self._entries.popitem(last=False)
+            self._forget(symbol)
+            self.evictions += 1
+
+    def _forget(self, company_symbol):
+        # Without this the per-symbol dicts would grow with every symbol ever requested.
+        self._load_locks.pop(company_symbol, None)
+        self._digests.pop(self.path_for(company_symbol), None)
+
+    def total_bytes(self):
+        return sum(entry['size'] for entry in self._entries.values())
+
+    def discard(self, company_symbol):
+        with self._lock:
+            self._entries.pop(company_symbol, None)
+            self._forget(company_symbol)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+            self._load_locks.clear()
+
+    def warm_up(self, symbols):
+        loaded = []
+        for symbol in symbols:
+            try:
+                if self.get(symbol) is not None:
+                    loaded.append(symbol)
+            except Exception as e:
+                print(f"Error warming model for {symbol}: {str(e)}")
+        return loaded
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': list(self._entries),
+                'size_bytes': self.total_bytes(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'loads': self.loads,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'load_time': self.load_time,
+                'avg_load_time': self.load_time / self.loads if self.loads else 0.0,
+            }
+
+
+def _build_registry():
+    config = getattr(settings, 'MODEL_REGISTRY', {})
+    return ModelRegistry(
+        max_entries=config.get('MAX_ENTRIES', 8),
+        max_bytes=config.get('MAX_BYTES'),
+    )
+
+
+registry = _build_registry()
+
+
+def get_model(company_symbol):
+    return registry.get(company_symbol)
+
+
+def artifact_version(company_symbol):
+    return registry.artifact_version(company_symbol)
+
+
+def available_symbols():
+    prefix, suffix = MODEL_FILENAME.split('{symbol}')
+    try:
+        names = os.listdir(model_dir())
+    except FileNotFoundError:
+        return []
+    return sorted(
+        name[len(prefix):-len(suffix)]
+        for name in names
+        if name.startswith(prefix) and name.endswith(suffix)
+    )
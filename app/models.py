@@ -1,5 +1,6 @@
 #app/models.py
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 
 class UserManager(BaseUserManager):
@@ -42,14 +43,50 @@ class User(AbstractBaseUser):
         return self.is_superuser
 
 class Company(models.Model):
+    PROPHET = 'prophet'
+    ETS = 'ets'
+    ARIMA = 'arima'
+    FAST = 'fast'
+    ENGINE_CHOICES = [
+        (PROPHET, 'Prophet'),
+        (ETS, 'Exponential smoothing (ETS)'),
+        (ARIMA, 'ARIMA'),
+        (FAST, 'Fastest engine within the accuracy threshold'),
+    ]
+    # Engines with their own artifacts; FAST picks one of them.
+    ENGINES = (PROPHET, ETS, ARIMA)
+
     symbol = models.CharField(max_length=10, unique=True)
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    # Forecasting engine (see app.engines).
+    engine = models.CharField(max_length=10, choices=ENGINE_CHOICES, default=PROPHET)
     
     def __str__(self):
         return f"{self.name} ({self.symbol})"
 
+class PriceBar(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='price_bars')
+    date = models.DateField()
+    open = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    high = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    low = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    close = models.DecimalField(max_digits=12, decimal_places=4)
+    adj_close = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    volume = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['date']
+        # Also the (company, date) index that range queries and upserts use.
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'date'], name='unique_price_bar'),
+        ]
+
+    def __str__(self):
+        return f"{self.company.symbol} {self.date}: {self.close}"
+
 class Prediction(models.Model):
+    # Legacy per-user rows; forecasts are now stored once as ForecastRun.
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     forecast_date = models.DateField()
@@ -64,6 +101,52 @@ class Prediction(models.Model):
     def __str__(self):
         return f"{self.company.symbol} prediction for {self.forecast_date}"
 
+class ForecastRun(models.Model):
+    """
+    One forecast of a company for a model artifact version, engine and
+    horizon, shared by every user who asked for it. The series are stored
+    once as packed arrays (see app.encoding.pack_frame) rather than as a
+    row per day.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='forecast_runs')
+    # Forecast hash of (symbol, model version, start date, period, frequency, engine).
+    key = models.CharField(max_length=64, unique=True)
+    model_version = models.CharField(max_length=64)
+    engine = models.CharField(max_length=32)
+    start_date = models.DateField()
+    period = models.PositiveIntegerField()
+    frequency = models.CharField(max_length=10, default='D')
+    first_date = models.DateField(null=True)
+    last_date = models.DateField(null=True)
+    series = models.BinaryField()
+    # Compacted runs keep only yhat and its bounds, as float32.
+    compacted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['created_at'], name='forecastrun_created')]
+
+    def __str__(self):
+        return f"{self.company.symbol} forecast from {self.first_date} ({self.period} {self.frequency})"
+
+
+class UserForecast(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='forecasts')
+    run = models.ForeignKey(ForecastRun, on_delete=models.CASCADE, related_name='users')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'run'], name='unique_user_forecast'),
+        ]
+        # Covers the dashboard's "recent predictions" lookup (user, newest
+        # first, run id) without touching the table.
+        indexes = [models.Index(fields=['user', '-created_at', 'run'], name='userforecast_recent')]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.run}"
+
 class Review(models.Model):
     RATING_CHOICES = [
         (1, '1 - Poor'),
@@ -81,8 +164,87 @@ class Review(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         unique_together = ['company', 'user']
+        # Keyset pagination of a company's reviews, newest first.
+        indexes = [models.Index(fields=['company', '-created_at', '-id'], name='review_company_recent')]
     
     def __str__(self):
-        return f"{self.user.username}'s review for {self.company.symbol}"
\ No newline at end of file
+        return f"{self.user.username}'s review for {self.company.symbol}"
+
+class CompanyRating(models.Model):
+    """
+    Running totals of a company's review ratings, adjusted as reviews are
+    added, changed and deleted (see app.reviews) instead of aggregated on
+    every page view.
+    """
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='rating')
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    # Number of reviews with each rating.
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    @property
+    def average_rating(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def histogram(self):
+        """(rating, count, percent of reviews) from 5 stars down"""
+        return [
+            (stars, getattr(self, f'stars_{stars}'), 100 * getattr(self, f'stars_{stars}') / self.count if self.count else 0)
+            for stars in range(5, 0, -1)
+        ]
+
+    def __str__(self):
+        return f"{self.company.symbol} rating ({self.count} reviews)"
+
+class ForecastJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE = (PENDING, RUNNING)
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='forecast_jobs')
+    symbols = models.JSONField(default=list)
+    start_date = models.DateField()
+    period = models.PositiveIntegerField()
+    frequency = models.CharField(max_length=10, default='D')
+    # Identical requests from the same user share one job while it is active.
+    dedup_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_forecast_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Forecast job {self.pk} ({', '.join(self.symbols)}) {self.status}"
@@ -0,0 +1,131 @@
+#app/persistence.py
+import asyncio
+from collections import namedtuple
+from datetime import timedelta
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from . import db, model_registry
+from .encoding import pack_frame, unpack_frame
+from .forecasting import engine_tag
+from .models import Company, ForecastRun, UserForecast
+
+DEFAULT_CONFIG = {
+    'RETENTION_DAYS': 90,
+    'COMPACT_AFTER_DAYS': 30,
+}
+
+STORED_COLUMNS = ['yhat', 'yhat_lower', 'yhat_upper', 'trend', 'weekly', 'yearly']
+COMPACT_COLUMNS = ['yhat', 'yhat_lower', 'yhat_upper']
+
+# What templates used to read off Prediction rows.
+PredictionRow = namedtuple('PredictionRow', 'forecast_date predicted_price lower_bound upper_bound')
+
+
+def runs_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'FORECAST_RUNS', {}))
+    return config
+
+
+def prediction_rows(forecast):
+    """Per-day rows of a forecast frame with prices rounded to cents, as Prediction rows had them"""
+    dates = forecast['ds'].dt.date.tolist()
+    predicted = np.round(forecast['yhat'].to_numpy(dtype=float), 2).tolist()
+    lower = np.round(forecast['yhat_lower'].to_numpy(dtype=float), 2).tolist()
+    upper = np.round(forecast['yhat_upper'].to_numpy(dtype=float), 2).tolist()
+    return [PredictionRow(*row) for row in zip(dates, predicted, lower, upper)]
+
+
+def run_frame(run):
+    """The stored forecast of a ForecastRun as a frame with ds and its series"""
+    return unpack_frame(run.series)
+
+
+def save_forecast(company, user, result, start_date, period, freq='D', engine=None, using=None):
+    """
+    Record that `user` ran the forecast in `result` (a stock_forecast result).
+
+    The ForecastRun is written once per forecast key and shared by every user
+    who asks for the same company, model version, engine and horizon; a user
+    only adds (or refreshes) a reference to it. Returns the ForecastRun.
+    """
+    forecast = result['forecast']
+    run, _ = ForecastRun.objects.db_manager(using).defer('series').get_or_create(
+        key=result['key'],
+        defaults={
+            'company': company,
+            'model_version': result.get('model_version') or model_registry.artifact_version(company.symbol) or '',
+            'engine': engine or engine_tag(result.get('engine', Company.PROPHET)),
+            'start_date': start_date,
+            'period': period,
+            'frequency': freq,
+            'first_date': forecast['ds'].iloc[0].date() if len(forecast) else None,
+            'last_date': forecast['ds'].iloc[-1].date() if len(forecast) else None,
+            'series': pack_frame(forecast, STORED_COLUMNS),
+        },
+    )
+    if user is not None:
+        UserForecast.objects.db_manager(using).bulk_create(
+            [UserForecast(user=user, run=run)],
+            update_conflicts=True, unique_fields=['user', 'run'], update_fields=['created_at'],
+        )
+    return run
+
+
+def record_forecast(company, user, result, start_date, period, freq='D', engine=None):
+    """save_forecast through the process's batch writer when SQLITE_TUNING enables one"""
+    writer = db.batch_writer()
+    # Inside a transaction the write must be part of it (and the writer
+    # thread would wait on this connection's lock).
+    if writer is None or transaction.get_connection().in_atomic_block:
+        return save_forecast(company, user, result, start_date, period, freq, engine)
+    return writer.submit(save_forecast, company, user, result, start_date, period, freq, engine).result()
+
+
+async def asave_forecast(company, user, result, start_date, period, freq='D', engine=None):
+    """Async save_forecast for async views"""
+    writer = await sync_to_async(db.batch_writer)()
+    if writer is not None:
+        return await asyncio.wrap_future(
+            writer.submit(save_forecast, company, user, result, start_date, period, freq, engine))
+    # get_or_create needs a transaction, which the async ORM does not offer,
+    # so this runs on the thread Django keeps for sync database work.
+    return await sync_to_async(save_forecast)(company, user, result, start_date, period, freq, engine)
+
+
+def prune_forecasts(retention_days, now=None):
+    """
+    Drop user references older than `retention_days`, then every run no
+    user references any more. Returns (references, runs) deleted.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    references, _ = UserForecast.objects.filter(created_at__lt=cutoff).delete()
+    orphaned = ForecastRun.objects.filter(created_at__lt=cutoff).exclude(
+        Exists(UserForecast.objects.filter(run=OuterRef('pk')))
+    )
+    runs, _ = orphaned.delete()
+    return references, runs
+
+
+def compact_forecasts(older_than_days, now=None, batch_size=100):
+    """
+    Rewrite runs older than `older_than_days` to keep only yhat and its
+    bounds as float32, about a third of the full series' size. Returns the
+    number of runs compacted.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=older_than_days)
+    pending = ForecastRun.objects.filter(created_at__lt=cutoff, compacted=False)
+    compacted = 0
+    while True:
+        runs = list(pending.only('pk', 'series')[:batch_size])
+        if not runs:
+            return compacted
+        for run in runs:
+            run.series = pack_frame(run_frame(run), COMPACT_COLUMNS, dtype='<f4')
+            run.compacted = True
+        ForecastRun.objects.bulk_update(runs, ['series', 'compacted'])
+        compacted += len(runs)
@@ -0,0 +1,104 @@
+#app/prices.py
+from decimal import Decimal
+import pandas as pd
+from django.db import transaction
+from .models import PriceBar
+from .training import DATE_COLUMNS
+
+CHUNK_SIZE = 10000
+
+# PriceBar field -> CSV column names accepted for it, in order of preference.
+COLUMN_ALIASES = {
+    'date': DATE_COLUMNS,
+    'open': ('open', 'Open'),
+    'high': ('high', 'High'),
+    'low': ('low', 'Low'),
+    'close': ('close', 'Close', 'y'),
+    'adj_close': ('adj_close', 'Adj Close', 'adjclose'),
+    'volume': ('volume', 'Volume'),
+}
+DECIMAL_FIELDS = ('open', 'high', 'low', 'close', 'adj_close')
+VALUE_FIELDS = DECIMAL_FIELDS + ('volume',)
+
+
+def csv_columns(path):
+    """Map PriceBar fields to the columns present in a CSV, reading only its header"""
+    header = pd.read_csv(path, nrows=0).columns
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        column = next((c for c in aliases if c in header), None)
+        if column is not None:
+            columns[field] = column
+    missing = {'date', 'close'} - set(columns)
+    if missing:
+        raise ValueError(f"{path} has no {' or '.join(sorted(missing))} column")
+    return columns
+
+
+def _decimal(value):
+    return None if pd.isna(value) else Decimal(f'{value:.4f}')
+
+
+def chunk_rows(chunk, columns):
+    """(date, values) per valid row of a CSV chunk, values in VALUE_FIELDS order; later duplicates win"""
+    frame = pd.DataFrame({'date': pd.to_datetime(chunk[columns['date']], errors='coerce').dt.date})
+    for field in VALUE_FIELDS:
+        frame[field] = pd.to_numeric(chunk[columns[field]], errors='coerce') if field in columns else float('nan')
+    frame = frame.dropna(subset=['date', 'close']).drop_duplicates('date', keep='last')
+    decimals = [[_decimal(v) for v in frame[field].tolist()] for field in DECIMAL_FIELDS]
+    volumes = [None if pd.isna(v) else int(v) for v in frame['volume'].tolist()]
+    return list(zip(frame['date'].tolist(), zip(*decimals, volumes)))
+
+
+def ingest_chunk(company, rows, update=True):
+    """
+    Upsert one chunk of (date, values) rows for a company.
+
+    Rows identical to what is stored are skipped, so re-ingesting an
+    overlapping range only writes what changed. With update=False, existing
+    dates are left alone. Returns (created, updated, unchanged).
+    """
+    if not rows:
+        return 0, 0, 0
+    dates = [date for date, _ in rows]
+    existing = {
+        row[0]: row[1:]
+        for row in PriceBar.objects.filter(company=company, date__range=(min(dates), max(dates)))
+        .order_by().values_list('date', *VALUE_FIELDS)
+    }
+    created, updated, unchanged = [], [], 0
+    for date, values in rows:
+        stored = existing.get(date)
+        if stored is None:
+            created.append(PriceBar(company=company, date=date, **dict(zip(VALUE_FIELDS, values))))
+        elif update and stored != values:
+            updated.append(PriceBar(company=company, date=date, **dict(zip(VALUE_FIELDS, values))))
+        else:
+            unchanged += 1
+    if not (created or updated):
+        return 0, 0, unchanged
+
+    with transaction.atomic():
+        if created:
+            # A concurrent ingest may have inserted the same dates since the read.
+            PriceBar.objects.bulk_create(created, ignore_conflicts=True)
+        if updated:
+            PriceBar.objects.bulk_create(
+                updated, update_conflicts=True, unique_fields=['company', 'date'], update_fields=list(VALUE_FIELDS),
+            )
+    return len(created), len(updated), unchanged
+
+
+def ingest_csv(path, company, chunk_size=CHUNK_SIZE, update=True):
+    """Stream a price CSV into PriceBar rows `chunk_size` lines at a time; memory does not grow with the file"""
+    columns = csv_columns(path)
+    stats = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    for chunk in pd.read_csv(path, usecols=list(columns.values()), chunksize=chunk_size):
+        rows = chunk_rows(chunk, columns)
+        created, updated, unchanged = ingest_chunk(company, rows, update)
+        stats['rows'] += len(chunk)
+        stats['skipped'] += len(chunk) - len(rows)
+        stats['created'] += created
+        stats['updated'] += updated
+        stats['unchanged'] += unchanged
+    return stats
@@ -0,0 +1,85 @@
+#app/reviews.py
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import Count, F, Q, Sum
+from .models import CompanyRating, Review
+
+PAGE_SIZE = 20
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def rebuild_rating(company_id):
+    """Recompute a company's rating totals from its reviews (backfill, or when the row is missing)"""
+    totals = Review.objects.filter(company_id=company_id).aggregate(
+        count=Count('id'),
+        total=Sum('rating', default=0),
+        **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    )
+    CompanyRating.objects.bulk_create(
+        [CompanyRating(company_id=company_id, **totals)],
+        update_conflicts=True, unique_fields=['company'], update_fields=list(totals),
+    )
+
+
+def record_rating(company_id, added=None, removed=None):
+    """
+    Adjust a company's rating totals after a review with rating `added` was
+    saved and/or one with rating `removed` was deleted or replaced. Call it
+    in the transaction that changed the review; the UPDATE is relative, so
+    concurrent reviews do not overwrite each other's counts.
+    """
+    changes = {}
+    if added:
+        changes[f'stars_{added}'] = F(f'stars_{added}') + 1
+    if removed:
+        key = f'stars_{removed}'
+        changes[key] = (changes[key] if key in changes else F(key)) - 1
+    if added and removed:
+        changes['total'] = F('total') + (added - removed)
+    elif added:
+        changes.update(count=F('count') + 1, total=F('total') + added)
+    elif removed:
+        changes.update(count=F('count') - 1, total=F('total') - removed)
+    else:
+        return
+    if not CompanyRating.objects.filter(company_id=company_id).update(**changes):
+        # First review for the company: the reviews already include it.
+        rebuild_rating(company_id)
+
+
+def company_rating(company):
+    return CompanyRating.objects.filter(company=company).first() or CompanyRating(company=company)
+
+
+def encode_cursor(review):
+    micros = (review.created_at - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}.{review.pk}'
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor, or None if it is missing or malformed"""
+    try:
+        micros, pk = cursor.split('.')
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def review_page(company, cursor=None, size=PAGE_SIZE):
+    """
+    One page of a company's reviews, newest first, and the cursor of the
+    next page (None on the last one).
+
+    Pages are selected by keyset on (created_at, id) rather than OFFSET, so
+    a deep page costs the same index range scan as the first one and
+    reviews added meanwhile do not shift the pages.
+    """
+    reviews = Review.objects.filter(company=company).select_related('user').order_by('-created_at', '-id')
+    position = decode_cursor(cursor)
+    if position:
+        created_at, pk = position
+        reviews = reviews.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    page = list(reviews[:size + 1])
+    if len(page) > size:
+        return page[:size], encode_cursor(page[size - 1])
+    return page, None
@@ -0,0 +1,28 @@
+#app/signals.py
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import db, fragments
+from .models import Company, Review
+
+
+@receiver([post_save, post_delete], sender=Company)
+def company_changed(sender, instance, **kwargs):
+    # After commit: a render between the write and the commit would read
+    # the old rows and cache them under the new version.
+    transaction.on_commit(lambda: fragments.bump('companies'))
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # The rating totals (reviews.record_rating) are updated later in the
+    # same transaction, so the summary is only current once it commits.
+    company_id = instance.company_id
+    transaction.on_commit(lambda: fragments.bump('reviews', company_id))
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    db.tune_connection(connection)
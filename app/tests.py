@@ -1,3 +1,1198 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import joblib
+import numpy as np
+import pandas as pd
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import encoding, engines, exports, forecasting, fragments, jobs, loadtest, training
+from .backtesting import summarize
+from .benchmarks import compare_to_baseline, scratch_database, synthetic_forecast, synthetic_series
+from .compact_models import compact_path, load_compact, save_compact
+from .db import BatchWriter
+from .fast_engine import FastProphet, extract_params, predictor_for, supports
+from .forecast_cache import ForecastCache, forecast_key, get_forecast_cache
+from .forecast_tables import materialize, slice_forecast
+from .instrumentation import metrics, server_timing
+from .model_registry import ModelRegistry, model_path
+from .models import Company, CompanyRating, ForecastJob, ForecastRun, Prediction, PriceBar, Review, User, UserForecast
+from .persistence import compact_forecasts, prediction_rows, prune_forecasts, run_frame, save_forecast
+from .reviews import rebuild_rating, record_rating, review_page
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def setUpModule():
+    # Signals, fragments and views all use the default cache; keep it in
+    # memory instead of the project's django_cache directory.
+    override = override_settings(CACHES=LOCMEM_CACHES)
+    override.enable()
+    unittest.addModuleCleanup(override.disable)
+
+
+class TempSettingsMixin:
+    """
+    Gives each test a temporary directory (self.tmp) and enables the
+    settings tmp_settings() returns for it; by default a forecast cache of
+    the test's own. Classes override tmp_settings to change what they need.
+    """
+
+    def tmp_settings(self, tmp):
+        return {'FORECAST_CACHE': {'PATH': os.path.join(tmp, 'cache.sqlite3')}}
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(**self.tmp_settings(self.tmp.name))
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class ModelRegistryTests(TempSettingsMixin, TestCase):
+    def tmp_settings(self, tmp):
+        return {'MODEL_DIR': tmp}
+
+    def write_model(self, symbol, value, mtime=None):
+        path = model_path(symbol)
+        joblib.dump({'value': value}, path)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_hit_after_first_load(self):
+        self.write_model('AAPL', 1)
+        registry = ModelRegistry()
+        first = registry.get('AAPL')
+        self.assertIs(registry.get('AAPL'), first)
+        stats = registry.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['loads']), (1, 1, 1))
+
+    def test_missing_artifact_returns_none(self):
+        self.assertIsNone(ModelRegistry().get('NOPE'))
+
+    def test_replaced_artifact_is_reloaded(self):
+        self.write_model('AAPL', 1, mtime=1_000_000_000)
+        registry = ModelRegistry()
+        self.assertEqual(registry.get('AAPL')['value'], 1)
+        self.write_model('AAPL', 2, mtime=2_000_000_000)
+        self.assertEqual(registry.get('AAPL')['value'], 2)
+        self.assertEqual(registry.stats()['invalidations'], 1)
+
+    def test_touched_artifact_keeps_live_model(self):
+        path = self.write_model('AAPL', 1, mtime=1_000_000_000)
+        registry = ModelRegistry()
+        first = registry.get('AAPL')
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        self.assertIs(registry.get('AAPL'), first)
+        self.assertEqual(registry.stats()['loads'], 1)
+
+    def test_lru_bound(self):
+        for symbol in ('AAPL', 'AMD', 'FB'):
+            self.write_model(symbol, symbol)
+        registry = ModelRegistry(max_entries=2)
+        registry.get('AAPL')
+        registry.get('AMD')
+        registry.get('AAPL')
+        registry.get('FB')
+        self.assertEqual(registry.stats()['entries'], ['AAPL', 'FB'])
+        self.assertEqual(registry.stats()['evictions'], 1)
+        # The evicted symbol's load lock and memoised hash go with it.
+        self.assertEqual(sorted(registry._load_locks), ['AAPL', 'FB'])
+        self.assertEqual(sorted(registry._digests), sorted([model_path('AAPL'), model_path('FB')]))
+
+
+class ForecastCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'cache.sqlite3')
+
+    def test_roundtrip_and_version_invalidation(self):
+        cache = ForecastCache(self.path)
+        old = forecast_key('AAPL', 'v1', '2024-01-01', 30, 'D')
+        new = forecast_key('AAPL', 'v2', '2024-01-01', 30, 'D')
+        self.assertNotEqual(old, new)
+        cache.set(old, 'AAPL', 'v1', {'value': 1})
+        self.assertEqual(cache.get(old), {'value': 1})
+        cache.set(new, 'AAPL', 'v2', {'value': 2})
+        self.assertIsNone(cache.get(old))
+        self.assertEqual(cache.get(new), {'value': 2})
+
+    def test_engines_of_a_symbol_do_not_invalidate_each_other(self):
+        cache = ForecastCache(self.path)
+        prophet = forecast_key('AAPL', 'p1', '2024-01-01', 30, 'D', 'prophet')
+        ets = forecast_key('AAPL', 'e1', '2024-01-01', 30, 'D', 'ets')
+        cache.set(prophet, 'AAPL', 'p1', 'prophet', engine='prophet')
+        cache.set(ets, 'AAPL', 'e1', 'ets', engine='ets')
+        self.assertEqual(cache.get(prophet), 'prophet')
+        self.assertEqual(cache.get(ets), 'ets')
+
+        cache.set('ets-new', 'AAPL', 'e2', 'ets', engine='ets')
+        self.assertIsNone(cache.get(ets))
+        self.assertEqual(cache.get(prophet), 'prophet')
+        cache.invalidate('AAPL')
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_ttl_expiry(self):
+        cache = ForecastCache(self.path)
+        cache.set('k', 'AAPL', 'v1', 1, ttl=-1)
+        self.assertIsNone(cache.get('k'))
+
+    def test_size_eviction_drops_least_recently_used(self):
+        cache = ForecastCache(self.path, max_entries=2)
+        for symbol in ('AAPL', 'AMD', 'FB'):
+            cache.set(symbol, symbol, 'v1', symbol)
+        self.assertIsNone(cache.get('AAPL'))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_shared_between_instances(self):
+        ForecastCache(self.path).set('k', 'AAPL', 'v1', [1, 2, 3])
+        self.assertEqual(ForecastCache(self.path).get('k'), [1, 2, 3])
+
+
+class StockForecastTests(TempSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.company = Company.objects.create(symbol='AAPL', name='Apple Inc.')
+
+    def test_repeat_request_served_from_cache(self):
+        start = pd.Timestamp('2018-03-01')
+        first = forecasting.stock_forecast(self.company, start, 10, 'D')
+        self.assertEqual(len(first['forecast']), 10)
+        self.assertEqual(get_forecast_cache().stats()['entries'], 1)
+        with mock.patch.object(forecasting.model_registry, 'get_model') as get_model:
+            second = forecasting.stock_forecast(self.company, start, 10, 'D')
+        get_model.assert_not_called()
+        pd.testing.assert_frame_equal(first['forecast'], second['forecast'])
+
+
+class PersistenceTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+
+    def save(self, user, key='run-1', forecast=None):
+        forecast = synthetic_forecast(30) if forecast is None else forecast
+        result = {'key': key, 'forecast': forecast}
+        return save_forecast(self.company, user, result, forecast['ds'][0], len(forecast), engine='test')
+
+    def test_identical_forecasts_share_one_run(self):
+        forecast = synthetic_forecast(365, start='2025-01-01')
+        run = self.save(self.user, forecast=forecast)
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!')
+        with self.assertNumQueries(2):
+            # look up the run, upsert the reference
+            self.assertEqual(self.save(other, forecast=forecast).pk, run.pk)
+        self.save(self.user, forecast=forecast)
+        self.assertEqual(ForecastRun.objects.count(), 1)
+        self.assertEqual(run.users.count(), 2)
+        self.assertEqual((run.first_date, run.last_date), (forecast['ds'][0].date(), forecast['ds'][364].date()))
+
+        stored = run_frame(ForecastRun.objects.get(pk=run.pk))
+        pd.testing.assert_frame_equal(stored, forecast[['ds'] + list(stored.columns[1:])], check_dtype=False)
+        rows = prediction_rows(stored)
+        self.assertEqual(rows[0].forecast_date, forecast['ds'][0].date())
+        self.assertEqual(rows[0].predicted_price, round(forecast['yhat'][0], 2))
+
+    def test_prune_drops_stale_references_and_orphaned_runs_and_compacts(self):
+        self.save(self.user, key='old')
+        self.save(self.user, key='shared')
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!')
+        ForecastRun.objects.update(created_at=timezone.now() - timedelta(days=100))
+        UserForecast.objects.update(created_at=timezone.now() - timedelta(days=100))
+        self.save(other, key='shared')
+
+        out = io.StringIO()
+        call_command('prune_forecasts', '--dry-run', stdout=out)
+        self.assertIn('Would delete 2 references and 1 runs, compact 2 runs', out.getvalue())
+        self.assertEqual(prune_forecasts(90), (2, 1))
+        self.assertEqual(list(ForecastRun.objects.values_list('key', flat=True)), ['shared'])
+
+        full = run_frame(ForecastRun.objects.get())
+        self.assertEqual(compact_forecasts(30), 1)
+        run = ForecastRun.objects.get()
+        self.assertTrue(run.compacted)
+        compacted = run_frame(run)
+        self.assertEqual(list(compacted.columns), ['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
+        np.testing.assert_allclose(compacted['yhat'], full['yhat'], rtol=1e-6)
+        self.assertEqual(compact_forecasts(30), 0)
+
+    def test_legacy_predictions_migrate_to_runs(self):
+        migration = importlib.import_module('app.migrations.0007_migrate_legacy_predictions')
+        created_at = timezone.now() - timedelta(days=10)
+        for day in range(3):
+            Prediction.objects.create(
+                company=self.company, user=self.user, forecast_date=date(2024, 1, 1) + timedelta(days=7 * day),
+                predicted_price=Decimal('100.25') + day, lower_bound=Decimal('99.00'), upper_bound=Decimal('101.50'),
+            )
+        Prediction.objects.update(created_at=created_at)
+
+        migration.migrate_predictions(django_apps, mock.Mock(connection=connections['default']))
+        reference = UserForecast.objects.select_related('run').get(user=self.user)
+        self.assertEqual(reference.created_at, created_at)
+        self.assertEqual(reference.run.created_at, created_at)
+        self.assertEqual((reference.run.first_date, reference.run.last_date), (date(2024, 1, 1), date(2024, 1, 15)))
+        self.assertEqual((reference.run.period, reference.run.frequency), (3, 'W'))
+        rows = prediction_rows(run_frame(reference.run))
+        self.assertEqual([row.predicted_price for row in rows], [100.25, 101.25, 102.25])
+        self.assertEqual(rows[2].upper_bound, 101.5)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.aapl = Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        self.msft = Company.objects.create(symbol='MSFT', name='Microsoft')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!')
+        for company, user, start in [
+            (self.aapl, self.user, '2024-01-01'), (self.aapl, self.user, '2024-03-01'),
+            (self.msft, self.user, '2024-01-15'), (self.aapl, other, '2024-06-01'),
+        ]:
+            forecast = synthetic_forecast(30, start=start)
+            result = {'key': f'{company.symbol}-{user.username}-{start}', 'forecast': forecast}
+            save_forecast(company, user, result, forecast['ds'][0], 30, engine='test')
+        self.client.force_login(self.user)
+
+    def rows(self, query=''):
+        response = self.client.get(f'/forecast/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+
+    def test_csv_streams_only_the_users_forecasts(self):
+        response = self.client.get('/forecast/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="forecasts.csv"')
+        header, *rows = self.rows()
+        self.assertEqual(header, exports.COLUMNS)
+        self.assertEqual(len(rows), 90)
+        self.assertEqual({row[0] for row in rows}, {'AAPL', 'MSFT'})
+        self.assertNotIn('2024-06-01', {row[4] for row in rows})
+        self.assertTrue(all(len(row[5].partition('.')[2]) <= 2 for row in rows))
+
+    def test_company_and_date_range_filters(self):
+        _, *rows = self.rows('?company=AAPL&start=2024-01-20&end=2024-03-05')
+        dates = sorted(row[4] for row in rows)
+        self.assertEqual(len(dates), 11 + 5)
+        self.assertEqual((dates[0], dates[-1]), ('2024-01-20', '2024-03-05'))
+        self.assertEqual({row[0] for row in rows}, {'AAPL'})
+
+    def test_csv_is_encoded_in_bounded_chunks(self):
+        references = exports.export_references(self.user)
+        chunks = list(exports.csv_chunks(exports.export_batches(references), chunk_bytes=1024))
+        # A chunk is sent as soon as a run fills it: each of these runs is over 1 KB.
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(all(len(chunk) < 1024 + 30 * 120 for chunk in chunks))
+        self.assertEqual(sum(chunk.count('\n') for chunk in chunks), 91)
+
+    async def test_asgi_requests_stream_asynchronously(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/forecast/export/?company=MSFT')
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(b''.join(chunks).decode('utf-8').count('\n'), 31)
+
+    @unittest.skipUnless(exports.parquet_available(), 'pyarrow is not installed')
+    def test_parquet_export(self):
+        import pyarrow.parquet as pq
+
+        response = self.client.get('/forecast/export/?format=parquet&company=AAPL')
+        # No pre-buffering: its IO threads can outlive the test run and abort the interpreter at exit.
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)), pre_buffer=False)
+        self.assertEqual(table.column_names, exports.COLUMNS)
+        self.assertEqual(table.num_rows, 60)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/forecast/export/?format=xml').status_code, 400)
+        self.assertEqual(self.client.get('/forecast/export/?start=soon').status_code, 400)
+        self.assertEqual(self.client.get('/forecast/export/?company=NOPE').status_code, 404)
+        with mock.patch.object(exports, 'parquet_available', return_value=False):
+            self.assertEqual(self.client.get('/forecast/export/?format=parquet').status_code, 501)
+        self.client.logout()
+        self.assertEqual(self.client.get('/forecast/export/').status_code, 302)
+
+
+class ForecastViewTests(TempSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+        self.client.force_login(self.user)
+
+    def post_forecast(self, headers=None, **extra):
+        data = {'company': 'AAPL', 'start_date': '2018-03-01', 'period': '14', 'frequency': 'D'}
+        data.update(extra)
+        return self.client.post('/forecast/', data, headers=headers)
+
+    def test_forecast_links_plot_instead_of_inlining_it(self):
+        data = self.post_forecast().json()
+        self.assertEqual(len(data['forecast']['x']), 14)
+        self.assertTrue(data['prophet_default'].startswith('/forecast/plot/?'))
+        self.assertEqual(UserForecast.objects.get(user=self.user).run.period, 14)
+
+        response = self.client.get(data['prophet_default'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+
+        loops = []
+
+        def forecast_hash(*args):
+            # The ETag hashes the artifact, which must not block the event loop.
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return real_hash(*args)
+
+        real_hash = forecasting.forecast_hash
+        with mock.patch.object(forecasting, 'render_plot') as render_plot, \
+                mock.patch.object(forecasting, 'forecast_hash', forecast_hash):
+            cached = self.client.get(data['prophet_default'], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        render_plot.assert_not_called()
+        self.assertEqual(loops, [None])
+
+    def test_plot_can_be_skipped(self):
+        data = self.post_forecast(plot='none').json()
+        self.assertIsNone(data['prophet_default'])
+        self.assertEqual(len(data['trend']['y']), 14)
+
+    def test_columnar_encoding_shares_one_date_axis(self):
+        legacy = self.post_forecast(plot='none').json()
+        response = self.post_forecast(plot='none', precision='2', headers={'Accept': encoding.COLUMNAR_JSON})
+        self.assertEqual(response['Content-Type'], encoding.COLUMNAR_JSON)
+        self.assertIn('Accept', response['Vary'])
+        data = json.loads(response.content)
+        self.assertEqual(data['version'], encoding.COLUMNAR_VERSION)
+        self.assertEqual(data['dates'], legacy['forecast']['x'])
+        self.assertEqual(set(data['series']), set(encoding.SERIES))
+        self.assertEqual(data['series']['yhat'], [round(v, 2) for v in legacy['forecast']['y']])
+        self.assertLess(len(response.content), len(json.dumps(legacy)) / 2)
+
+    def test_packed_f32_round_trips(self):
+        legacy = self.post_forecast(plot='none').json()
+        response = self.post_forecast(plot='none', format='f32')
+        self.assertEqual(response['Content-Type'], encoding.PACKED_F32)
+        header, dates, series = encoding.decode_f32(response.content)
+        self.assertEqual(header['company_symbol'], 'AAPL')
+        self.assertEqual([str(d)[:10] for d in dates], legacy['forecast']['x'])
+        np.testing.assert_allclose(series['trend'], legacy['trend']['y'], rtol=1e-6)
+
+
+class ForecastApiTests(TempSettingsMixin, TestCase):
+    url = '/api/forecast/?symbol=AAPL&start_date=2018-03-01&period=14&freq=D'
+
+    def setUp(self):
+        super().setUp()
+        Company.objects.create(symbol='AAPL', name='Apple Inc.')
+
+    def test_get_is_public_and_revalidates_without_loading_the_model(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['forecast']['x']), 14)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertIn('Accept', response['Vary'])
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with mock.patch.object(forecasting, 'stock_forecast') as stock_forecast, \
+                mock.patch.object(engines, 'get_model') as get_model, \
+                mock.patch.object(forecasting.model_registry, 'get_model') as get_prophet:
+            not_modified = self.client.get(self.url, headers={'If-None-Match': etag})
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified['ETag'], etag)
+            since = self.client.get(self.url, headers={'If-Modified-Since': last_modified})
+            self.assertEqual(since.status_code, 304)
+        stock_forecast.assert_not_called()
+        get_model.assert_not_called()
+        get_prophet.assert_not_called()
+
+        # Each representation has its own validator.
+        columnar = self.client.get(self.url, headers={'If-None-Match': etag, 'Accept': encoding.COLUMNAR_JSON})
+        self.assertEqual(columnar.status_code, 200)
+        self.assertNotEqual(columnar['ETag'], etag)
+        self.assertEqual(self.client.get(self.url.replace('period=14', 'period=15'), headers={'If-None-Match': etag}).status_code, 200)
+
+        self.assertEqual(self.client.get('/api/forecast/?symbol=AAPL').status_code, 400)
+        self.assertEqual(self.client.get(self.url + '&engine=nope').status_code, 400)
+        self.assertEqual(self.client.get(self.url + '&freq=nope').status_code, 400)
+        self.assertEqual(self.client.get(self.url.replace('period=14', 'period=731')).status_code, 400)
+        self.assertEqual(self.client.get(self.url.replace('period=14&freq=D', 'period=105&freq=W')).status_code, 400)
+        with override_settings(FORECAST_API={'MAX_HORIZON_DAYS': 10}):
+            self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url.replace('AAPL', 'MISSING')).status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+
+@override_settings(FORECAST_CACHE={'ENABLED': False}, FORECAST_POOL={'INFERENCE_THREADS': 2})
+class AsyncForecastViewTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        Company.objects.create(symbol='AMD', name='Advanced Micro Devices')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+
+    async def test_forecasts_run_concurrently_on_the_inference_pool(self):
+        # Each forecast waits for the other one: this only completes if both
+        # are in flight at once rather than serialised on the request path.
+        barrier = threading.Barrier(2)
+        real_forecast = forecasting.stock_forecast
+
+        def rendezvous(*args):
+            barrier.wait(timeout=10)
+            return real_forecast(*args)
+
+        await self.async_client.aforce_login(self.user)
+        with mock.patch.object(forecasting, 'stock_forecast', side_effect=rendezvous):
+            responses = await asyncio.gather(*(
+                self.async_client.post('/forecast/', {
+                    'company': symbol, 'start_date': '2018-03-01', 'period': '7', 'plot': 'none',
+                })
+                for symbol in ('AAPL', 'AMD')
+            ))
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(json.loads(response.content)['forecast']['y']), 7)
+            self.assertIn('db_write;dur=', response['Server-Timing'])
+        self.assertEqual(await UserForecast.objects.filter(user=self.user).acount(), 2)
+
+        response = await self.async_client.post('/predict/MISSING/', {'days': 7})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(FORECAST_CACHE={'ENABLED': False})
+class BatchForecastTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        Company.objects.create(symbol='AMD', name='Advanced Micro Devices')
+        Company.objects.create(symbol='NOMODEL', name='No Model Inc.')
+        self.client.force_login(User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!'))
+
+    def test_errors_are_reported_per_symbol(self):
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            with mock.patch.object(forecasting, 'get_forecast_pool', return_value=pool):
+                response = self.client.post(
+                    '/forecast/batch/',
+                    data={'symbols': ['AAPL', 'AMD', 'NOMODEL', 'MISSING'], 'start_date': '2018-03-01', 'period': 7},
+                    content_type='application/json',
+                )
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['errors'], 2)
+        self.assertEqual(len(data['results']['AAPL']['forecast']['y']), 7)
+        self.assertEqual(data['results']['AMD']['status'], 'ok')
+        self.assertEqual(data['results']['NOMODEL']['status'], 'error')
+        self.assertEqual(data['results']['MISSING']['status'], 'error')
+
+    def test_pool_spawns_its_workers(self):
+        self.addCleanup(setattr, forecasting, '_pool', None)
+        with override_settings(FORECAST_POOL={'MAX_WORKERS': 1}):
+            pool = forecasting.get_forecast_pool()
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
+        self.assertNotEqual(pool.submit(os.getpid).result(timeout=60), os.getpid())
+        # Unpickling a model instance needs the app registry the worker sets up.
+        company = Company.objects.get(symbol='AAPL')
+        self.assertEqual(pool.submit(str, company).result(timeout=60), str(company))
+
+
+class FastEngineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = joblib.load(os.path.join(os.path.dirname(__file__), 'models', 'prophet_model_AAPL.pkl'))
+
+    def assert_matches_prophet(self, future, intervals):
+        # Prophet draws its interval samples from NumPy's global generator.
+        np.random.seed(0)
+        expected = self.model.predict(future)
+        actual = FastProphet.from_model(self.model, intervals=intervals).predict(future)
+        for column in ('trend', 'weekly', 'yearly', 'yhat'):
+            np.testing.assert_allclose(actual[column], expected[column], rtol=1e-9, atol=1e-8)
+        # Prophet's intervals are themselves Monte Carlo estimates.
+        halfwidth = (expected['yhat_upper'] - expected['yhat_lower']) / 2
+        for bound in ('yhat_lower', 'yhat_upper'):
+            self.assertLess(np.median(np.abs(actual[bound] - expected[bound]) / halfwidth), 0.2)
+
+    def test_daily_horizon_matches_prophet(self):
+        future = self.model.make_future_dataframe(periods=365, include_history=False)
+        self.assert_matches_prophet(future, 'samples')
+        self.assert_matches_prophet(future, 'analytical')
+
+    def test_sub_daily_and_history_dates_match_prophet(self):
+        future = self.model.make_future_dataframe(periods=48, freq='H', include_history=False)
+        self.assert_matches_prophet(future, 'samples')
+        self.assert_matches_prophet(self.model.history[['ds']].tail(60), 'analytical')
+
+    def test_make_future_dataframe_matches_prophet(self):
+        fast = FastProphet.from_model(self.model)
+        for freq in ('D', 'W', 'M'):
+            pd.testing.assert_frame_equal(
+                fast.make_future_dataframe(periods=12, freq=freq),
+                self.model.make_future_dataframe(periods=12, freq=freq, include_history=False),
+            )
+
+    def test_predictor_respects_settings(self):
+        self.assertTrue(supports(self.model))
+        self.assertIs(predictor_for(self.model), predictor_for(self.model))
+        with override_settings(FAST_FORECAST={'ENABLED': False}):
+            self.assertIsNone(predictor_for(self.model))
+
+    def test_stock_forecast_without_intervals(self):
+        company = Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        # Predictors are built once per loaded model, so start from a fresh load.
+        forecasting.model_registry.registry.clear()
+        self.addCleanup(forecasting.model_registry.registry.clear)
+        with tempfile.TemporaryDirectory() as tables, override_settings(
+                FAST_FORECAST={'INTERVALS': None}, FORECAST_CACHE={'ENABLED': False}, FORECAST_TABLE_DIR=tables):
+            result = forecasting.stock_forecast(company, pd.Timestamp('2018-03-01'), 30)
+        forecast = result['forecast']
+        self.assertEqual(len(forecast), 30)
+        np.testing.assert_array_equal(forecast['yhat_lower'], forecast['yhat'])
+        np.testing.assert_array_equal(forecast['yhat_upper'], forecast['yhat'])
+
+
+@override_settings(FORECAST_CACHE={'ENABLED': False})
+class ForecastJobTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        Company.objects.create(symbol='NOMODEL', name='No Model Inc.')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+        self.client.force_login(self.user)
+
+    def submit(self, symbols=('AAPL', 'NOMODEL'), url='/forecast/jobs/', **params):
+        return self.client.post(
+            url, data=dict({'symbols': list(symbols), 'start_date': '2018-03-01', 'period': 7}, **params),
+            content_type='application/json',
+        )
+
+    def test_horizon_is_bounded(self):
+        for url in ('/forecast/jobs/', '/forecast/batch/'):
+            self.assertEqual(self.submit(url=url, period=731).status_code, 400)
+            self.assertEqual(self.submit(url=url, period=0).status_code, 400)
+            self.assertEqual(self.submit(url=url, period=105, frequency='W').status_code, 400)
+            self.assertEqual(self.submit(url=url, frequency='H').status_code, 400)
+        with override_settings(FORECAST_API={'MAX_HORIZON_DAYS': 5}):
+            self.assertEqual(self.submit().status_code, 400)
+            with self.assertRaises(ValueError):
+                jobs.submit(self.user, ['AAPL'], '2018-03-01', 7)
+        self.assertFalse(ForecastJob.objects.exists())
+
+    def test_submit_poll_and_fetch_result(self):
+        first = self.submit()
+        self.assertEqual(first.status_code, 202)
+        self.assertFalse(first.json()['deduplicated'])
+        second = self.submit(symbols=('NOMODEL', 'AAPL'))
+        self.assertTrue(second.json()['deduplicated'])
+        self.assertEqual(second.json()['id'], first.json()['id'])
+
+        result_url = f"/forecast/jobs/{first.json()['id']}/result/"
+        self.assertEqual(self.client.get(result_url).status_code, 202)
+
+        job = jobs.run(jobs.claim('test-worker'))
+        self.assertEqual(job.status, ForecastJob.SUCCEEDED)
+        self.assertEqual(job.attempts, 1)
+        status = self.client.get(first['Location']).json()
+        self.assertEqual(status['result_url'], result_url)
+
+        data = self.client.get(result_url).json()
+        self.assertEqual(len(data['results']['AAPL']['forecast']['y']), 7)
+        self.assertEqual(data['results']['NOMODEL']['status'], 'error')
+        self.assertEqual(UserForecast.objects.get(user=self.user).run.company.symbol, 'AAPL')
+        # A finished job no longer absorbs identical submissions.
+        self.assertFalse(self.submit().json()['deduplicated'])
+
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(result_url).status_code, 404)
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        job_id = self.submit().json()['id']
+        with mock.patch.object(jobs, 'execute', side_effect=RuntimeError('boom')):
+            job = jobs.run(jobs.claim('test-worker'))
+            self.assertEqual((job.status, job.attempts, job.error), (ForecastJob.PENDING, 1, 'boom'))
+            self.assertIsNone(jobs.claim('test-worker'))
+
+            later = job.run_after + pd.Timedelta(seconds=1)
+            jobs.run(jobs.claim('test-worker', now=later))
+            job = jobs.run(jobs.claim('test-worker', now=later + pd.Timedelta(hours=1)))
+        self.assertEqual((job.pk, job.status, job.attempts), (job_id, ForecastJob.FAILED, 3))
+        self.assertEqual(self.client.get(f'/forecast/jobs/{job_id}/result/').status_code, 409)
+
+    def test_expired_lease_is_reclaimed(self):
+        self.submit()
+        claimed = jobs.claim('dead-worker')
+        self.assertIsNone(jobs.claim('other-worker'))
+        reclaimed = jobs.claim('other-worker', now=claimed.locked_until + pd.Timedelta(seconds=1))
+        self.assertEqual((reclaimed.pk, reclaimed.locked_by, reclaimed.attempts), (claimed.pk, 'other-worker', 2))
+
+
+@override_settings(FORECAST_CACHE={'ENABLED': False}, FORECAST_JOBS={'RETRY_BACKOFF': 0, 'POLL_INTERVAL': 0.05})
+class ForecastWorkerCommandTests(TransactionTestCase):
+    def test_worker_threads_drain_the_queue(self):
+        Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        Company.objects.create(symbol='AMD', name='Advanced Micro Devices')
+        user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+        for period in (5, 6, 7):
+            jobs.submit(user, ['AAPL', 'AMD'], '2018-03-01', period)
+
+        out = io.StringIO()
+        call_command('run_forecast_worker', concurrency=2, drain=True, stdout=out)
+        self.assertIn('Starting 2 forecast worker thread(s)', out.getvalue())
+        self.assertEqual(
+            list(ForecastJob.objects.values_list('status', flat=True)),
+            [ForecastJob.SUCCEEDED] * 3,
+        )
+
+
+class TrainModelsTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.data_dir = os.path.join(self.tmp.name, 'prices')
+        self.models_dir = os.path.join(self.tmp.name, 'models')
+        os.makedirs(self.data_dir)
+        for seed, symbol in enumerate(('SYN0', 'SYN1')):
+            Company.objects.create(symbol=symbol, name=f'Synthetic {symbol}')
+            prices = synthetic_series(400, end='2024-06-28', seed=seed)
+            prices.rename(columns={'ds': 'Date', 'y': 'Close'}).to_csv(training.price_path(symbol, self.data_dir), index=False)
+        Company.objects.create(symbol='NODATA', name='No Data Inc.')
+
+    def train(self, **options):
+        options.setdefault('engines', ['prophet'])
+        options.setdefault('holdout', 0)
+        report_path = os.path.join(self.tmp.name, 'report.json')
+        with override_settings(MODEL_DIR=self.models_dir):
+            call_command(
+                'train_models', data_dir=self.data_dir, workers=2, output=report_path, stdout=io.StringIO(), **options,
+            )
+        with open(report_path) as fh:
+            return {row['symbol']: row for row in json.load(fh)}
+
+    def test_trains_in_parallel_then_warm_starts(self):
+        report = self.train()
+        self.assertEqual(sorted(report), ['SYN0', 'SYN1'])
+        self.assertFalse(report['SYN0']['warm_start'])
+        self.assertEqual(report['SYN0']['rows'], 400)
+        model = joblib.load(report['SYN0']['path'])
+        self.assertEqual(model.history['ds'].max(), pd.Timestamp('2024-06-28'))
+
+        report = self.train()
+        self.assertTrue(report['SYN1']['warm_start'])
+        self.assertGreater(report['SYN1']['fit_seconds'], 0)
+        self.assertEqual(
+            sorted(os.listdir(self.models_dir)), ['prophet_model_SYN0.pkl', 'prophet_model_SYN1.pkl'],
+        )
+
+    def test_scores_engines_on_a_holdout_for_fast_selection(self):
+        report = self.train(symbols=['SYN0'], engines=['ets', 'arima'], holdout=30)
+        self.assertEqual(report['SYN0']['status'], 'ok')
+        with override_settings(MODEL_DIR=self.models_dir):
+            scores = engines.read_scores('SYN0')
+            self.assertEqual(sorted(scores), ['arima', 'ets'])
+            for score in scores.values():
+                self.assertLess(score['mape'], 0.2)
+                self.assertGreater(score['predict_ms'], 0)
+            model = engines.get_model('SYN0', 'arima')
+            self.assertEqual(model.history['ds'].max(), pd.Timestamp('2024-06-28'))
+            company = Company.objects.get(symbol='SYN0')
+            company.engine = Company.FAST
+            self.assertIn(engines.resolve_engine(company), ('ets', 'arima'))
+
+    def test_holdout_mape_leaves_out_zero_actuals(self):
+        self.assertEqual(training.ape_sum([0.0, 100.0, 200.0], [5.0, 110.0, 180.0]), (0.2, 2))
+        prices = pd.DataFrame({'ds': pd.date_range('2024-01-01', periods=6), 'y': [1.0, 2.0, 3.0, 0.0, 100.0, 0.0]})
+
+        def predict(model, future):
+            return pd.DataFrame({'yhat': [1.0, 90.0, 1.0], 'yhat_lower': [0.0, 80.0, 0.0], 'yhat_upper': [2.0, 95.0, 2.0]})
+
+        score = training.score_engine(lambda train: None, predict, prices, holdout=3)
+        self.assertAlmostEqual(score['mape'], 0.1)
+        self.assertAlmostEqual(score['coverage'], 2 / 3)
+        zeros = prices.assign(y=0.0)
+        self.assertIsNone(training.score_engine(lambda train: None, predict, zeros, holdout=3)['mape'])
+
+
+@override_settings(FORECAST_ENGINES={'FAST_MAX_MAPE': 0.05})
+class EngineTests(TempSettingsMixin, TestCase):
+    def tmp_settings(self, tmp):
+        return dict(super().tmp_settings(tmp), MODEL_DIR=tmp)
+
+    def setUp(self):
+        super().setUp()
+        self.company = Company.objects.create(symbol='SYN', name='Synthetic', engine=Company.ETS)
+        prices = synthetic_series(400, end='2024-06-28')
+        for engine, forecaster in engines.FORECASTERS.items():
+            training.save_model(forecaster.fit(prices), engines.engine_path('SYN', engine))
+
+    def test_company_engine_drives_forecasts_and_plots(self):
+        start = pd.Timestamp('2024-07-01')
+        result = forecasting.stock_forecast(self.company, start, 14)
+        self.assertEqual(result['engine'], 'ets')
+        forecast = result['forecast']
+        self.assertEqual(list(forecast.columns), forecasting.FORECAST_COLUMNS)
+        self.assertEqual(forecast['ds'].iloc[0], start)
+        self.assertEqual(len(forecast), 14)
+        self.assertTrue((forecast['yhat_lower'] <= forecast['yhat']).all())
+        self.assertTrue((forecast['yhat'] <= forecast['yhat_upper']).all())
+        arima = forecasting.stock_forecast(self.company, start, 14, engine='arima')
+        self.assertNotEqual(arima['key'], result['key'])
+        self.assertIsNone(forecasting.stock_forecast(self.company, start, 14, engine='prophet'))
+        self.assertTrue(forecasting.plot_png(self.company, start, 14)[1].startswith(b'\x89PNG'))
+
+        user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+        self.client.force_login(user)
+        data = self.client.post('/forecast/', {'company': 'SYN', 'start_date': '2024-07-01', 'period': '7'}).json()
+        self.assertEqual(data['engine'], 'ets')
+        self.assertIn('engine=ets', data['prophet_default'])
+        self.assertEqual(ForecastRun.objects.get().engine, 'ets')
+        self.assertEqual(self.client.get(data['prophet_default'].replace('engine=ets', 'engine=../x')).status_code, 400)
+
+    def test_fast_picks_the_quickest_engine_within_the_threshold(self):
+        self.company.engine = Company.FAST
+        self.assertEqual(engines.resolve_engine(self.company), 'prophet')
+        engines.record_scores('SYN', {
+            'prophet': {'mape': 0.02, 'predict_ms': 40.0},
+            'ets': {'mape': 0.04, 'predict_ms': 5.0},
+            'arima': {'mape': 0.2, 'predict_ms': 1.0},
+        })
+        self.assertEqual(engines.resolve_engine(self.company), 'ets')
+        with override_settings(FORECAST_ENGINES={'FAST_MAX_MAPE': 0.5}):
+            self.assertEqual(engines.resolve_engine(self.company), 'arima')
+        os.remove(engines.engine_path('SYN', 'ets'))
+        # Prophet qualifies but has no artifact here, so nothing does.
+        self.assertEqual(engines.resolve_engine(self.company), 'prophet')
+
+
+class BacktestTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        Company.objects.create(symbol='SYN', name='Synthetic')
+        synthetic_series(400, end='2024-06-28').to_csv(training.price_path('SYN', self.tmp.name), index=False)
+
+    def backtest(self):
+        output = os.path.join(self.tmp.name, 'backtest.json')
+        with override_settings(MODEL_DIR=self.tmp.name):
+            call_command(
+                'backtest', engines=['ets'], data_dir=self.tmp.name, initial=300, period=30, horizon=14,
+                workers=2, cache_dir=os.path.join(self.tmp.name, 'fits'), output=output, stdout=io.StringIO(),
+            )
+        with open(output) as fh:
+            return json.load(fh)
+
+    def test_rolling_origins_are_scored_and_fits_cached_per_cutoff(self):
+        first = self.backtest()
+        self.assertEqual([row['cutoff'] for row in first['cutoffs']], ['2024-04-15', '2024-05-15', '2024-06-14'])
+        summary = first['summary'][0]
+        self.assertEqual((summary['symbol'], summary['engine'], summary['cutoffs'], summary['cached']), ('SYN', 'ets', 3, 0))
+        self.assertEqual(summary['points'], 42)
+        self.assertLess(summary['mape'], 0.1)
+        self.assertTrue(0 <= summary['coverage'] <= 1)
+
+        second = self.backtest()['summary'][0]
+        self.assertEqual(second['cached'], 3)
+        self.assertEqual(second['mape'], summary['mape'])
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, 'fits', 'SYN'))), 3)
+
+    def test_zero_actuals_are_left_out_of_mape(self):
+        row = {'symbol': 'SYN', 'engine': 'ets', 'points': 2, 'covered': 1, 'fit_seconds': 1.0, 'predict_seconds': 0.001, 'cached': False}
+        summary = summarize([dict(row, ape_points=0, ape_sum=0.0)])[0]
+        self.assertIsNone(summary['mape'])
+        self.assertEqual(summary['coverage'], 0.5)
+        summary = summarize([dict(row, ape_points=0, ape_sum=0.0), dict(row, ape_points=2, ape_sum=0.1)])[0]
+        self.assertAlmostEqual(summary['mape'], 0.05)
+
+        stdout = io.StringIO()
+        report = [dict(summary, mape=None, coverage=None)]
+        with override_settings(MODEL_DIR=self.tmp.name), mock.patch('app.management.commands.backtest.summarize', return_value=report):
+            call_command(
+                'backtest', engines=['ets'], data_dir=self.tmp.name, initial=300, period=30, horizon=14,
+                workers=1, cache_dir=os.path.join(self.tmp.name, 'fits'), stdout=stdout,
+            )
+        self.assertIn('n/a', stdout.getvalue().splitlines()[1])
+
+
+class IngestPricesTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.company = Company.objects.create(symbol='SYN0', name='Synthetic SYN0')
+        self.path = os.path.join(self.tmp.name, 'SYN0.csv')
+
+    def write_csv(self, start, periods, offset=0.0):
+        dates = pd.date_range(start, periods=periods, freq='D')
+        close = np.arange(periods) + 100.0 + offset
+        pd.DataFrame({
+            'Date': dates.strftime('%Y-%m-%d'), 'Open': close - 1, 'High': close + 1, 'Low': close - 2,
+            'Close': close, 'Volume': np.arange(periods) * 10,
+        }).to_csv(self.path, index=False)
+
+    def ingest(self, **options):
+        out = io.StringIO()
+        call_command('ingest_prices', self.path, chunk_size=40, stdout=out, **options)
+        return out.getvalue()
+
+    def test_chunked_ingest_is_idempotent_and_upserts_overlaps(self):
+        self.write_csv('2024-01-01', 100)
+        self.assertIn('100 created', self.ingest())
+        with self.assertNumQueries(4):  # companies, then one read per chunk and nothing to write
+            self.assertIn('100 unchanged', self.ingest())
+
+        # Overlapping range: 50 restated days and 50 new ones.
+        self.write_csv('2024-02-20', 100, offset=0.5)
+        self.assertIn('50 created, 50 updated', self.ingest())
+        self.assertEqual(PriceBar.objects.filter(company=self.company).count(), 150)
+        bar = PriceBar.objects.get(company=self.company, date='2024-02-20')
+        self.assertEqual((bar.close, bar.volume), (Decimal('100.5'), 0))
+
+        self.write_csv('2024-02-20', 100, offset=1.0)
+        self.assertIn('0 created, 0 updated, 100 unchanged', self.ingest(no_update=True))
+        self.assertEqual(PriceBar.objects.get(company=self.company, date='2024-02-20').close, Decimal('100.5'))
+
+
+@override_settings(FORECAST_CACHE={'ENABLED': False})
+class ForecastTableTests(TempSettingsMixin, TestCase):
+    def tmp_settings(self, tmp):
+        return {'FORECAST_TABLE_DIR': tmp}
+
+    def setUp(self):
+        super().setUp()
+        self.company = Company.objects.create(symbol='AAPL', name='Apple Inc.')
+
+    def test_requests_inside_the_table_are_sliced(self):
+        start = pd.Timestamp('2018-06-01')
+        live = forecasting.stock_forecast(self.company, start, 30)
+        materialize('AAPL', 200, forecasting.engine_tag(), forecasting.predict)
+        metrics.reset()
+        with mock.patch.object(forecasting.model_registry, 'get_model') as get_model, \
+                mock.patch.object(forecasting.compact_models, 'get_predictor') as get_predictor:
+            sliced = forecasting.stock_forecast(self.company, start, 30)
+            adjusted = forecasting.stock_forecast(self.company, pd.Timestamp('2017-01-01'), 10)
+        get_model.assert_not_called()
+        get_predictor.assert_not_called()
+        self.assertEqual(metrics.counters.get('forecast_table_hits_total'), 2)
+        pd.testing.assert_frame_equal(sliced['forecast'], live['forecast'])
+        self.assertTrue(adjusted['adjusted'])
+        self.assertEqual(adjusted['forecast']['ds'][0], pd.Timestamp('2018-02-08'))
+
+    def test_a_table_rewritten_at_the_same_version_is_reloaded(self):
+        start = pd.Timestamp('2018-03-01')
+        version = forecasting.model_registry.artifact_version('AAPL')
+        materialize('AAPL', 100, 'prophet', forecasting.predict)
+        self.assertIsNotNone(slice_forecast('AAPL', version, start, 10, 'D', 'prophet'))
+        materialize('AAPL', 100, 'fast:None', forecasting.predict)
+        self.assertIsNone(slice_forecast('AAPL', version, start, 10, 'D', 'prophet'))
+        self.assertIsNotNone(slice_forecast('AAPL', version, start, 10, 'D', 'fast:None'))
+
+    def test_requests_outside_the_table_predict_live(self):
+        materialize('AAPL', 30, forecasting.engine_tag(), forecasting.predict)
+        result = forecasting.stock_forecast(self.company, pd.Timestamp('2018-03-01'), 60)
+        self.assertEqual(len(result['forecast']), 60)
+        weekly = forecasting.stock_forecast(self.company, pd.Timestamp('2018-03-01'), 4, 'W')
+        self.assertEqual(len(weekly['forecast']), 4)
+
+
+class CompactModelTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model = joblib.load(os.path.join(os.path.dirname(__file__), 'models', 'prophet_model_AAPL.pkl'))
+
+    def test_memory_mapped_roundtrip_predicts_like_the_pickle(self):
+        path = save_compact(extract_params(self.model), os.path.join(self.tmp.name, 'AAPL.params'), 'v1')
+        header, params = load_compact(path)
+        self.assertEqual(header['source_version'], 'v1')
+        self.assertIsInstance(params['delta'].base, np.memmap)
+        future = self.model.make_future_dataframe(periods=90, include_history=False)
+        expected = FastProphet.from_model(self.model).predict(future)
+        actual = FastProphet(params).predict(future)
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_stale_compact_artifact_is_ignored(self):
+        with override_settings(FORECAST_CACHE={'ENABLED': False}):
+            company = Company.objects.create(symbol='AAPL', name='Apple Inc.')
+            save_compact(extract_params(self.model), compact_path('AAPL'), 'not-the-current-hash')
+            self.addCleanup(os.remove, compact_path('AAPL'))
+            with mock.patch.object(forecasting.model_registry, 'get_model', wraps=forecasting.model_registry.get_model) as get_model:
+                forecasting.stock_forecast(company, pd.Timestamp('2018-03-01'), 5)
+            get_model.assert_called_once_with('AAPL')
+
+
+class LoadTestTests(TempSettingsMixin, LiveServerTestCase):
+    def setUp(self):
+        super().setUp()
+        Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        self.users = [User.objects.create_user('load', 'load@example.com', 'Load-pass1!')]
+
+    def test_logged_in_users_get_every_endpoint_and_stats_per_endpoint(self):
+        samples, elapsed = loadtest.drive(
+            self.live_server_url, loadtest.login_sessions(self.users), ['AAPL'], [14], requests=6, seed=3)
+        self.assertEqual(len(samples), 6)
+        report = loadtest.summarize(samples, elapsed)
+        self.assertEqual(report['total']['statuses'], {'200': 6})
+        self.assertEqual(report['total']['error_rate'], 0)
+        self.assertEqual(sum(row['requests'] for row in report['endpoints'].values()), 6)
+        self.assertLessEqual(set(report['endpoints']), set(loadtest.ENDPOINTS))
+        self.assertTrue(UserForecast.objects.filter(user=self.users[0]).exists())
+
+    def test_redirects_count_as_errors(self):
+        samples, elapsed = loadtest.drive(self.live_server_url, [{}], ['AAPL'], [14], {'dashboard': 1}, requests=2)
+        total = loadtest.summarize(samples, elapsed)['total']
+        self.assertEqual((total['errors'], total['error_rate'], total['statuses']), (2, 1.0, {'302': 2}))
+
+    def test_mix_is_validated(self):
+        self.assertEqual(loadtest.parse_mix(['dashboard=2', 'predict_stock']), {'dashboard': 2.0, 'predict_stock': 1.0})
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix(['admin=1'])
+
+
+class BenchmarkBaselineTests(TestCase):
+    def test_regressions_are_flagged_per_stage_and_labels(self):
+        baseline = {'results': [
+            {'stage': 'predict.prophet', 'horizon': 30, 'median_ms': 50.0},
+            {'stage': 'predict.prophet', 'horizon': 365, 'median_ms': 100.0},
+        ]}
+        results = [
+            {'stage': 'predict.prophet', 'horizon': 30, 'median_ms': 80.0},
+            {'stage': 'predict.prophet', 'horizon': 365, 'median_ms': 110.0},
+            {'stage': 'predict.fast', 'horizon': 30, 'median_ms': 1.0},
+        ]
+        comparison = compare_to_baseline(results, baseline, tolerance=0.25)
+        self.assertEqual([(row['horizon'], row['regression']) for row in comparison], [(30, True), (365, False)])
+
+
+# A plain unittest case: Django's test cases only allow the aliases declared
+# at class setup, and these tests register scratch databases as they go.
+class SQLiteTuningTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'scratch.sqlite3')
+
+    def pragmas(self, alias):
+        with connections[alias].cursor() as cursor:
+            return {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'busy_timeout')
+            }
+
+    def test_pragmas_are_opt_in(self):
+        with scratch_database(self.path) as alias:
+            self.assertEqual(self.pragmas(alias)['journal_mode'], 'delete')
+            self.assertIsNone(connections[alias].transaction_mode)
+
+    @override_settings(SQLITE_TUNING={'ENABLED': True, 'BUSY_TIMEOUT': 2500})
+    def test_tuned_connections_use_wal_and_immediate_transactions(self):
+        with scratch_database(self.path) as alias:
+            self.assertEqual(self.pragmas(alias), {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 2500})
+            self.assertEqual(connections[alias].transaction_mode, 'IMMEDIATE')
+
+    def test_batch_writer_commits_queued_writes_together_and_isolates_failures(self):
+        release = threading.Event()
+
+        def create(symbol, using):
+            if symbol == 'BAD':
+                Company.objects.using(using).create(symbol='LATE', name='Rolled back')
+                raise ValueError(symbol)
+            return Company.objects.using(using).create(symbol=symbol, name=symbol).symbol
+
+        with scratch_database(self.path) as alias:
+            writer = BatchWriter(using=alias)
+            first = writer.submit(lambda: release.wait(5))
+            queued = [writer.submit(create, symbol, using=alias) for symbol in ('A', 'BAD', 'B')]
+            release.set()
+            self.assertTrue(first.result(5))
+            self.assertEqual(queued[0].result(5), 'A')
+            with self.assertRaises(ValueError):
+                queued[1].result(5)
+            self.assertEqual(queued[2].result(5), 'B')
+            writer.close()
+            self.assertEqual(writer.batches, 2)
+            self.assertEqual(sorted(Company.objects.using(alias).values_list('symbol', flat=True)), ['A', 'B'])
+
+    def test_concurrent_writers_hit_no_lock_errors(self):
+        out = io.StringIO()
+        call_command('stress_sqlite', writers=8, writes=6, horizon=30, modes=['tuned', 'batched'],
+                     check=True, json=True, stdout=out)
+        for row in json.loads(out.getvalue()):
+            self.assertEqual((row['locked'], row['errors'], row['references']), (0, 0, 48), row['mode'])
+        self.assertGreaterEqual(row['batches'], 1)
+
+
+@override_settings(FORECAST_CACHE={'ENABLED': False})
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+
+    def test_server_timing_formatting(self):
+        header = server_timing([('predict', 0.0125), ('db_write', 0.002), ('predict', 0.0025)], total=0.02)
+        self.assertEqual(header, 'predict;dur=15.0, db_write;dur=2.0, total;dur=20.0')
+
+    def test_forecast_reports_stages_and_metrics_are_staff_only(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/forecast/', {'company': 'AAPL', 'start_date': '2018-03-01', 'period': '7'})
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        for name in ('model_load', 'predict', 'db_write', 'serialize', 'total'):
+            self.assertIn(name, stages)
+        self.assertEqual(self.client.get('/metrics/').status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        body = self.client.get('/metrics/').content.decode()
+        self.assertIn('forecast_stage_seconds_count{stage="predict"} 1', body)
+        self.assertIn('forecast_stage_seconds_bucket{stage="predict",le="+Inf"} 1', body)
+        self.assertIn('model_loads_total', body)
+
+
+class ImportTimeTests(TestCase):
+    def test_startup_does_not_import_the_forecasting_stack(self):
+        out = io.StringIO()
+        call_command('import_report', '--json', '--module', 'app.forecasting', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['startup']['heavy'], [])
+        self.assertGreater(report['startup']['modules'], 0)
+        self.assertIn('pandas', report['modules']['heavy'])
+        self.assertNotIn('matplotlib', report['modules']['heavy'])
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        Company.objects.create(symbol='AMD', name='Advanced Micro Devices')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+        self.client.force_login(self.user)
+
+    def test_dashboard_does_not_seed_and_caches_company_cards(self):
+        for day in range(1, 6):
+            run = ForecastRun.objects.create(
+                company=self.company, key=f'run-{day}', model_version='v1', engine='test',
+                start_date=f'2018-03-0{day}', period=7, frequency='D', series=b'',
+            )
+            UserForecast.objects.create(user=self.user, run=run)
+        # session, user, companies, recent predictions (with their company)
+        with self.assertNumQueries(4):
+            response = self.client.get('/dashboard/')
+        self.assertContains(response, 'Advanced Micro Devices')
+        self.assertEqual(Company.objects.count(), 2)
+        # session, user, recent predictions
+        with self.assertNumQueries(3):
+            self.client.get('/dashboard/')
+        # The cards are shared across users; only the CSRF token is per user.
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!')
+        client = Client()
+        client.force_login(other)
+        with self.assertNumQueries(3):
+            response = client.get('/dashboard/')
+        self.assertContains(response, 'Advanced Micro Devices')
+        self.assertContains(response, f"input.value = '{response.context['csrf_token']}'")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(symbol='INTC', name='Intel Corporation')
+        with self.assertNumQueries(4):
+            self.assertContains(self.client.get('/dashboard/'), 'Intel Corporation')
+
+    def test_review_summary_is_cached_until_a_review_changes(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!')
+        Review.objects.create(company=self.company, user=other, rating=4, comment='Solid')
+        record_rating(self.company.pk, added=4)
+        url = f'/company/{self.company.symbol}/reviews/'
+        # session, user, company, reviews, the user's own review, rating totals
+        with self.assertNumQueries(6):
+            self.assertContains(self.client.get(url), '4.0/5')
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/company/{self.company.symbol}/add-review/', {'rating': 2, 'comment': 'Meh'})
+        # The user's review is on the page, so it is not looked up separately.
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertContains(response, '3.0/5')
+        self.assertContains(response, '(2 reviews)')
+        self.assertEqual(response.context['user_review'].comment, 'Meh')
+
+    def test_fragment_versions_change_only_after_commit(self):
+        companies, reviews = fragments.version('companies'), fragments.version('reviews', self.company.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Company.objects.create(symbol='INTC', name='Intel Corporation')
+            self.client.post(f'/company/{self.company.symbol}/add-review/', {'rating': 5, 'comment': 'Great'})
+            self.assertEqual(fragments.version('companies'), companies)
+            self.assertEqual(fragments.version('reviews', self.company.pk), reviews)
+        self.assertEqual(len(callbacks), 2)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(fragments.version('companies'), companies)
+        self.assertNotEqual(fragments.version('reviews', self.company.pk), reviews)
+
+
+class ReviewTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(symbol='AAPL', name='Apple Inc.')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!')
+        self.client.force_login(self.user)
+
+    def totals(self):
+        rating = CompanyRating.objects.get(company=self.company)
+        return rating.count, rating.total, [count for _, count, _ in rating.histogram]
+
+    def test_rating_totals_follow_added_changed_and_deleted_reviews(self):
+        url = f'/company/{self.company.symbol}/add-review/'
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!')
+        Review.objects.create(company=self.company, user=other, rating=5, comment='Great')
+        self.client.post(url, {'rating': 3, 'comment': 'Fine'})
+        # The first recorded review builds the totals from every review.
+        self.assertEqual(self.totals(), (2, 8, [1, 0, 1, 0, 0]))
+
+        self.client.post(url, {'rating': 1, 'comment': 'Changed my mind'})
+        self.assertEqual(self.totals(), (2, 6, [1, 0, 0, 0, 1]))
+        self.assertEqual(CompanyRating.objects.get(company=self.company).average_rating, 3)
+
+        review = Review.objects.get(user=self.user)
+        self.client.post(f'/review/{review.pk}/delete/')
+        self.assertEqual(self.totals(), (1, 5, [1, 0, 0, 0, 0]))
+
+        rebuild_rating(self.company.pk)
+        self.assertEqual(self.totals(), (1, 5, [1, 0, 0, 0, 0]))
+
+    def test_reviews_are_paginated_by_keyset(self):
+        created = timezone.now()
+        for i in range(5):
+            user = User.objects.create_user(f'user{i}', f'user{i}@example.com', 'Passw0rd!')
+            review = Review.objects.create(company=self.company, user=user, rating=4, comment=f'Review {i}')
+            # Two reviews share a timestamp, so the id breaks the tie.
+            Review.objects.filter(pk=review.pk).update(created_at=created - timedelta(minutes=min(i, 3)))
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = review_page(self.company, cursor, size=2)
+            seen.extend(review.comment for review in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, ['Review 0', 'Review 1', 'Review 2', 'Review 4', 'Review 3'])
+
+        response = self.client.get(f'/company/{self.company.symbol}/reviews/')
+        self.assertEqual(len(response.context['reviews']), 5)
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertEqual(review_page(self.company, 'not-a-cursor', size=2)[0][0].comment, 'Review 0')
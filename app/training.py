@@ -0,0 +1,190 @@
+#app/training.py
+import os
+import time
+import logging
+import pandas as pd
+from django.conf import settings
+
+PRICE_FILENAME = '{symbol}.csv'
+DATE_COLUMNS = ('ds', 'date', 'Date', 'timestamp')
+PRICE_COLUMNS = ('y', 'adj_close', 'Adj Close', 'close', 'Close')
+
+# Constructor arguments carried over from the previous artifact so a refit
+# keeps the model's configuration; new symbols get these defaults.
+MODEL_ARGS = (
+    'growth', 'n_changepoints', 'changepoint_range', 'yearly_seasonality', 'weekly_seasonality',
+    'daily_seasonality', 'seasonality_mode', 'seasonality_prior_scale', 'holidays_prior_scale',
+    'changepoint_prior_scale', 'interval_width', 'uncertainty_samples',
+)
+DEFAULT_MODEL_ARGS = {'yearly_seasonality': True}
+
+
+def price_dir():
+    return str(getattr(settings, 'PRICE_DATA_DIR', os.path.join(settings.BASE_DIR, 'data', 'prices')))
+
+
+def price_path(company_symbol, directory=None):
+    return os.path.join(directory or price_dir(), PRICE_FILENAME.format(symbol=company_symbol))
+
+
+def read_prices(path):
+    """Read a daily price CSV into Prophet's ds/y frame, accepting the usual date and close column names"""
+    df = pd.read_csv(path)
+    date_column = next((c for c in DATE_COLUMNS if c in df.columns), None)
+    price_column = next((c for c in PRICE_COLUMNS if c in df.columns), None)
+    if date_column is None or price_column is None:
+        raise ValueError(f"{path} needs a date column {DATE_COLUMNS} and a price column {PRICE_COLUMNS}")
+    prices = pd.DataFrame({
+        'ds': pd.to_datetime(df[date_column]).dt.tz_localize(None),
+        'y': pd.to_numeric(df[price_column], errors='coerce'),
+    })
+    return prices.dropna().drop_duplicates('ds', keep='last').sort_values('ds').reset_index(drop=True)
+
+
+def warm_start_params(model):
+    """Initial values for Stan taken from a fitted model (Prophet's documented warm-start recipe)"""
+    params = {}
+    for name in ('k', 'm', 'sigma_obs'):
+        params[name] = float(model.params[name].mean())
+    for name in ('delta', 'beta'):
+        params[name] = model.params[name].mean(axis=0)
+    return params
+
+
+def quiet_cmdstanpy():
+    """Keep Stan's per-fit INFO lines out of command output"""
+    logger = logging.getLogger('cmdstanpy')
+    # cmdstanpy installs its INFO handler (and resets the level) lazily, on
+    # first use, unless the logger already has a handler.
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    logger.setLevel(logging.WARNING)
+
+
+def model_args(previous=None):
+    """Prophet constructor arguments: the previous model's configuration, or the defaults"""
+    if previous is None:
+        return dict(DEFAULT_MODEL_ARGS)
+    return {name: getattr(previous, name) for name in MODEL_ARGS}
+
+
+def new_model(previous=None):
+    from prophet import Prophet
+
+    return Prophet(**model_args(previous))
+
+
+def save_model(model, path):
+    """Write the artifact under a temporary name and rename it into place, so readers never see a partial file"""
+    import joblib
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    try:
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def ape_sum(y, yhat):
+    """
+    (sum of absolute percentage errors, days scored) of forecast `yhat`
+    against actuals `y`. Percentage errors are undefined on zero actuals,
+    so those days are left out; MAPE is the sum over the days scored.
+    """
+    import numpy as np
+
+    y, yhat = np.asarray(y, dtype=float), np.asarray(yhat, dtype=float)
+    scored = y != 0
+    return float(np.sum(np.abs((y[scored] - yhat[scored]) / y[scored]))), int(scored.sum())
+
+
+def score_engine(fit, predict, prices, holdout):
+    """
+    Fit on all but the last `holdout` rows and forecast them. Returns the
+    holdout MAPE (None if every actual is zero), interval coverage and the
+    median time of that predict.
+    """
+    import numpy as np
+
+    train, test = prices.iloc[:-holdout], prices.iloc[-holdout:].reset_index(drop=True)
+    model = fit(train)
+    future = test[['ds']]
+    predict(model, future)  # the first call may build caches (e.g. the NumPy engine's)
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        forecast = predict(model, future)
+        timings.append(time.perf_counter() - start)
+    y = test['y'].to_numpy()
+    errors, scored = ape_sum(y, forecast['yhat'].to_numpy())
+    return {
+        'mape': errors / scored if scored else None,
+        'coverage': float(np.mean((forecast['yhat_lower'].to_numpy() <= y) & (y <= forecast['yhat_upper'].to_numpy()))),
+        'predict_ms': sorted(timings)[1] * 1000,
+        'holdout': holdout,
+    }
+
+
+def fit_symbol(symbol, csv_path, artifact_path, warm_start=True, engine='prophet', holdout=0):
+    """
+    Fit one symbol's `engine` model from its price CSV and save it to
+    artifact_path.
+
+    Runs in a pool process. With warm_start, a Prophet fit starts from the
+    previous artifact's parameters; if they do not fit the new model (for
+    example fewer changepoints on a shorter history) it falls back to a cold
+    fit. With a `holdout`, the engine is first scored on the last `holdout`
+    days (see score_engine). Returns a report row.
+    """
+    import joblib
+    from .engines import FORECASTERS
+
+    report = {'symbol': symbol, 'engine': engine, 'path': artifact_path, 'warm_start': False}
+    try:
+        prices = read_prices(csv_path)
+        report['rows'] = len(prices)
+        report['last_date'] = prices['ds'].max().strftime('%Y-%m-%d') if len(prices) else None
+
+        if engine == 'prophet':
+            from .forecasting import predict
+
+            quiet_cmdstanpy()
+
+            def fit(frame):
+                return new_model(previous).fit(frame)
+        else:
+            fit = FORECASTERS[engine].fit
+
+            def predict(model, future):
+                return model.predict(future)
+
+        previous = None
+        if engine == 'prophet' and warm_start and os.path.exists(artifact_path):
+            try:
+                previous = joblib.load(artifact_path)
+            except Exception as e:
+                print(f"Error loading previous model for {symbol}: {str(e)}")
+
+        if holdout and len(prices) > 2 * holdout:
+            report['score'] = score_engine(fit, predict, prices, holdout)
+
+        start = time.perf_counter()
+        model = None
+        if previous is not None:
+            try:
+                model = new_model(previous).fit(prices, init=warm_start_params(previous))
+                report['warm_start'] = True
+            except Exception as e:
+                print(f"Warm start failed for {symbol}, fitting from scratch: {str(e)}")
+        if model is None:
+            model = fit(prices)
+        report['fit_seconds'] = time.perf_counter() - start
+
+        save_model(model, artifact_path)
+        report['status'] = 'ok'
+    except Exception as e:
+        report.update(status='error', error=str(e))
+    return report
@@ -10,6 +10,14 @@ urlpatterns = [
     path('predict/<str:symbol>/', views.predict_stock, name='predict_stock'),
     path('logout/', views.logout_view, name='logout'),
     path('forecast/', views.forecast_stock, name='forecast_stock'),
+    path('forecast/plot/', views.forecast_plot, name='forecast_plot'),
+    path('api/forecast/', views.forecast_api, name='forecast_api'),
+    path('forecast/export/', views.export_forecasts, name='export_forecasts'),
+    path('forecast/batch/', views.forecast_batch, name='forecast_batch'),
+    path('forecast/jobs/', views.forecast_job_submit, name='forecast_job_submit'),
+    path('forecast/jobs/<int:job_id>/', views.forecast_job, name='forecast_job'),
+    path('forecast/jobs/<int:job_id>/result/', views.forecast_job_result, name='forecast_job_result'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('company/<str:symbol>/reviews/', views.company_reviews, name='company_reviews'),
     path('company/<str:symbol>/add-review/', views.add_review, name='add_review'),
     path('review/<int:review_id>/delete/', views.delete_review, name='delete_review'),
@@ -1,17 +1,14 @@
 #app/utils.py
-import joblib
 import pandas as pd
 from datetime import datetime
-import os
-from django.conf import settings
-from django.core.cache import cache
-from .models import Company, Prediction
+from .models import Company
+from . import model_registry
+from .forecast_cache import forecast_key
+from .persistence import prediction_rows, record_forecast
 
 COMPANY_MODELS = {
-    'AAPL': os.path.join(settings.BASE_DIR, 'models', 'prophet_model_AAPL.pkl'),
-    'FB': os.path.join(settings.BASE_DIR, 'models', 'prophet_model_FB.pkl'),
-    'AMD': os.path.join(settings.BASE_DIR, 'models', 'prophet_model_AMD.pkl'),
-    'INTC': os.path.join(settings.BASE_DIR, 'models', 'prophet_model_INTC.pkl')
+    symbol: model_registry.model_path(symbol)
+    for symbol in ('AAPL', 'FB', 'AMD', 'INTC')
 }
 
 def validate_model(model):
@@ -22,24 +19,17 @@ def validate_model(model):
     return model
 
 def load_model(company_symbol):
-    """Load the pre-trained model for a company with caching"""
+    """Load the pre-trained model for a company from the shared model registry"""
     if company_symbol not in COMPANY_MODELS:
         raise ValueError(f"No model available for {company_symbol}")
     
-    cache_key = f'prophet_model_{company_symbol}'
-    model = cache.get(cache_key)
-    
-    if model is None:
-        try:
-            model_path = COMPANY_MODELS[company_symbol]
-            if not os.path.exists(model_path):
-                raise FileNotFoundError(f"Model file not found at {model_path}")
-            
-            model = joblib.load(model_path)
-            model = validate_model(model)
-            cache.set(cache_key, model, timeout=3600)  # Cache for 1 hour
-        except Exception as e:
-            raise RuntimeError(f"Error loading model for {company_symbol}: {str(e)}")
+    try:
+        model = model_registry.get_model(company_symbol)
+        if model is None:
+            raise FileNotFoundError(f"Model file not found at {model_registry.model_path(company_symbol)}")
+        model = validate_model(model)
+    except Exception as e:
+        raise RuntimeError(f"Error loading model for {company_symbol}: {str(e)}")
     
     return model
 
@@ -57,7 +47,7 @@ def make_prediction(company_symbol, days=30, user=None):
             'company': Company instance,
             'forecast': Prophet forecast DataFrame,
             'future_dates': Generated future dates,
-            'predictions': List of Prediction objects (not saved)
+            'predictions': Per-day PredictionRow tuples of the saved forecast run
         }
     """
     try:
@@ -75,24 +65,12 @@ def make_prediction(company_symbol, days=30, user=None):
         future = pd.DataFrame({'ds': future_dates})
         forecast = model.predict(future)
         
-        # Prepare predictions for batch create
-        predictions = [
-            Prediction(
-                company=company,
-                user=user,
-                forecast_date=date.date(),
-                predicted_price=row['yhat'],
-                lower_bound=row['yhat_lower'],
-                upper_bound=row['yhat_upper']
-            )
-            for date, (_, row) in zip(future_dates, forecast.iterrows())
-        ]
-        
-        # Delete old predictions for this user/company
-        Prediction.objects.filter(company=company, user=user).delete()
-        
-        # Bulk create new predictions
-        Prediction.objects.bulk_create(predictions)
+        # Record the run (shared with other users asking for the same forecast)
+        start_date = future_dates[0]
+        key = forecast_key(company_symbol, model_registry.artifact_version(company_symbol),
+                           start_date.strftime('%Y-%m-%d'), days, 'D', 'prophet')
+        record_forecast(company, user, {'key': key, 'forecast': forecast}, start_date, days, engine='prophet')
+        predictions = prediction_rows(forecast)
         
         return {
             'company': company,
@@ -1,29 +1,42 @@
 #app/views.py
-import os
 import json
-import joblib
-import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.cache import never_cache
-from django.contrib.auth.decorators import login_required
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.functional import SimpleLazyObject
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.conf import settings
 from django.contrib.auth import login, authenticate, logout
 import re
 from django.contrib.auth.hashers import make_password
-from .models import Company, Prediction, Review, User
-from django.db import models
+from .models import Company, ForecastJob, Review, User, UserForecast
+from django.db import transaction
 from .forms import ReviewForm
-import io
-import base64
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from . import fragments, model_registry
+from .reviews import company_rating, record_rating, review_page
+from .instrumentation import metrics, stage
+
+# The forecasting stack (pandas, NumPy, matplotlib, and Prophet once a model
+# is unpickled) is imported inside the views that use it, so that importing
+# the URLconf -- which every worker boot and manage.py command does -- stays
+# cheap.
 
 # Helper Functions
+
+def parse_date(value):
+    import pandas as pd
+
+    return pd.to_datetime(value).tz_localize(None)
+
+
 def validate_password(password):
     errors = []
     if len(password) < 8:
@@ -103,14 +116,15 @@ def user_login(request):
 
 def load_prophet_model(company_symbol):
     try:
-        model_dir = os.path.join(settings.BASE_DIR, 'app', 'models')
-        model_path = os.path.join(model_dir, f'prophet_model_{company_symbol}.pkl')
-        os.makedirs(model_dir, exist_ok=True)
-        return joblib.load(model_path) if os.path.exists(model_path) else None
+        return model_registry.get_model(company_symbol)
     except Exception as e:
         print(f"Error loading model for {company_symbol}: {str(e)}")
         return None
 
+def skip_plot(request):
+    """Clients that draw the component arrays themselves can opt out of the server-side plot"""
+    return request.POST.get('plot', request.GET.get('plot', '')).lower() in ('none', 'false', '0')
+
 def make_prediction(symbol, days, user):
     model = load_prophet_model(symbol)
     if not model:
@@ -129,35 +143,82 @@ def logout_view(request):
 # Main Application Views
 @login_required
 def dashboard(request):
-    default_companies = [
-        ('AAPL', 'Apple Inc.', 'Technology company'),
-        ('AMD', 'Advanced Micro Devices', 'Semiconductor company'),
-        ('FB', 'Facebook (Meta)', 'Social media company'),
-        ('INTC', 'Intel Corporation', 'Semiconductor company'),
-    ]
-    
-    for symbol, name, description in default_companies:
-        Company.objects.get_or_create(symbol=symbol, defaults={'name': name, 'description': description})
-
+    # Default companies are seeded by `manage.py populate_companies`, not here.
+    # The company cards are a cached fragment; the queryset is lazy, so it only
+    # runs when the fragment has to be re-rendered.
     companies = Company.objects.all()
-    recent_predictions = Prediction.objects.filter(user=request.user).order_by('-created_at')[:5]
-    
+    # Served from the userforecast_recent index; the runs' series are not loaded.
+    recent_predictions = (
+        UserForecast.objects.filter(user=request.user)
+        .select_related('run__company')
+        .defer('run__series')
+        .order_by('-created_at')[:5]
+    )
+
     return render(request, 'dashboard.html', {
         'companies': companies,
+        'companies_version': fragments.version('companies'),
         'recent_predictions': recent_predictions
     })
 
+async def acompany_or_404(symbol):
+    try:
+        return await Company.objects.aget(symbol=symbol)
+    except Company.DoesNotExist:
+        raise Http404(f"No company with symbol {symbol}")
+
+def encode_forecast(request, forecast, meta, encoding, precision=None):
+    """A forecast frame as a response in the negotiated encoding ('f32', 'columnar' or the legacy JSON)"""
+    from .encoding import COLUMNAR_JSON, PACKED_F32, columnar_json, packed_f32, parse_precision
+
+    if encoding == 'f32':
+        return HttpResponse(packed_f32(forecast, meta), content_type=PACKED_F32)
+    if encoding == 'columnar':
+        return HttpResponse(columnar_json(forecast, meta, parse_precision(precision)), content_type=COLUMNAR_JSON)
+    # Legacy shape consumed by forecast.html.
+    forecast_dates = forecast['ds'].dt.strftime('%Y-%m-%d').tolist()
+    return JsonResponse({
+        "forecast": {
+            "x": forecast_dates,
+            "y": forecast["yhat"].tolist(),
+            "upper": forecast["yhat_upper"].tolist(),
+            "lower": forecast["yhat_lower"].tolist(),
+            "weekly": forecast["weekly"].tolist(),
+            "yearly": forecast["yearly"].tolist()
+        },
+        "trend": {
+            "x": forecast_dates,
+            "y": forecast["trend"].tolist()
+        },
+        "weekly": {
+            "x": forecast_dates,
+            "y": forecast["weekly"].tolist()
+        },
+        "yearly": {
+            "x": forecast_dates,
+            "y": forecast["yearly"].tolist()
+        },
+        **meta,
+    })
+
 @never_cache
 @login_required(login_url='login')
-def forecast_stock(request):
+async def forecast_stock(request):
+    # Async so an ASGI worker can keep many forecasts in flight: inference
+    # runs on the bounded pool behind run_inference and the event loop stays
+    # free for other requests.
     if request.method == "GET":
-        companies = Company.objects.all()
-        return render(request, "forecast.html", {
+        companies = [company async for company in Company.objects.all()]
+        return await sync_to_async(render)(request, "forecast.html", {
             'companies': companies,
             'current_date': datetime.now().date()
         })
 
     if request.method == "POST":
+        from .encoding import negotiate
+        from .forecasting import plot_url, run_inference, stock_forecast
+        from .persistence import asave_forecast
+
         try:
             company_symbol = request.POST.get("company")
             start_date_str = request.POST.get("start_date")
@@ -167,196 +228,342 @@ def forecast_stock(request):
             if not company_symbol or not start_date_str:
                 return JsonResponse({"error": "Company and start date are required."}, status=400)
 
-            model = load_prophet_model(company_symbol)
-            if not model:
-                return JsonResponse({"error": f"Model for {company_symbol} not found."}, status=400)
-
             # Convert and validate start date
             try:
-                start_date = pd.to_datetime(start_date_str).tz_localize(None)
+                start_date = parse_date(start_date_str)
             except ValueError:
                 return JsonResponse({"error": "Invalid start date format. Use YYYY-MM-DD."}, status=400)
 
-            # Get the last training date from the model
-            last_training_date = pd.to_datetime(model.history['ds'].max()).tz_localize(None)
-            
-            # Calculate days needed to reach start_date from last training date
-            days_needed = (start_date - last_training_date).days
-            
-            # If start_date is before last training date, use last training date as start
-            if days_needed < 0:
-                start_date = last_training_date
-                days_needed = 0
+            company = await acompany_or_404(company_symbol)
+
+            result = await run_inference(stock_forecast, company, start_date, period, freq)
+            if result is None:
+                return JsonResponse({"error": f"Model for {company_symbol} not found."}, status=400)
+
+            forecast = result['forecast']
+            last_training_date = result['last_training_date']
+            if result['adjusted']:
                 messages.info(request, 
                     f"Start date adjusted to model's last training date: {last_training_date.strftime('%Y-%m-%d')}"
                 )
-
-            # Generate future dataframe
-            future = model.make_future_dataframe(
-                periods=days_needed + period,  # Enough to cover from last training to end of period
-                freq=freq,
-                include_history=False
-            )
-            
-            # Filter to only include dates from start_date onward
-            future = future[future['ds'] >= start_date]
-            
-            # Make sure we have enough data
-            if len(future) < period:
-                # If not enough, generate more periods
-                additional_periods = period - len(future)
-                more_future = model.make_future_dataframe(
-                    periods=additional_periods,
-                    freq=freq,
-                    include_history=False
-                )
-                future = pd.concat([future, more_future])
-            
-            # Limit to the requested period
-            future = future.head(period)
-            forecast = model.predict(future)
-            
-            # Prepare dates for JSON
-            forecast_dates = forecast['ds'].dt.strftime('%Y-%m-%d').tolist()
             
-            company = get_object_or_404(Company, symbol=company_symbol)
+            # Record the (shared) forecast run for this user
+            with stage('db_write'):
+                await asave_forecast(company, await request.auser(), result, start_date, period, freq)
 
-            # Save predictions
-            Prediction.objects.filter(company=company, user=request.user).delete()
-            for _, row in forecast.iterrows():
-                Prediction.objects.create(
-                    company=company,
-                    user=request.user,
-                    forecast_date=row['ds'].date(),
-                    predicted_price=row['yhat'],
-                    lower_bound=row['yhat_lower'],
-                    upper_bound=row['yhat_upper']
-                )
+            image_url = None if skip_plot(request) else plot_url(company.symbol, start_date, period, freq, result['engine'])
 
-            # Generate Prophet plot
-            fig, ax = plt.subplots(figsize=(10, 5))
-            model.plot(forecast, ax=ax)
-            ax.set_title(f"{company.name} Forecast")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Price ($)")
-
-            buf = io.BytesIO()
-            canvas = FigureCanvas(fig)
-            canvas.print_png(buf)
-            plt.close(fig)
-            image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-            image_url = f"data:image/png;base64,{image_base64}"
-
-            response_data = {
-                "forecast": {
-                    "x": forecast_dates,
-                    "y": forecast["yhat"].tolist(),
-                    "upper": forecast["yhat_upper"].tolist(),
-                    "lower": forecast["yhat_lower"].tolist(),
-                    "weekly": forecast["weekly"].tolist(),
-                    "yearly": forecast["yearly"].tolist()
-                },
-                "trend": {
-                    "x": forecast_dates,
-                    "y": forecast["trend"].tolist()
-                },
-                "weekly": {
-                    "x": forecast_dates,
-                    "y": forecast["weekly"].tolist()
-                },
-                "yearly": {
-                    "x": forecast_dates,
-                    "y": forecast["yearly"].tolist()
-                },
+            meta = {
                 "company_name": company.name,
                 "company_symbol": company.symbol,
                 "prophet_default": image_url,
-                "last_training_date": last_training_date.strftime('%Y-%m-%d')
+                "engine": result['engine'],
+                "last_training_date": last_training_date.strftime('%Y-%m-%d'),
             }
-
-            return JsonResponse(response_data)
+            with stage('serialize'):
+                response = encode_forecast(request, forecast, meta, negotiate(request), request.POST.get('precision'))
+            patch_vary_headers(response, ['Accept'])
+            return response
 
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
 
+def _batch_params(request):
+    """
+    Parse symbols, start date, period and frequency from a JSON or form POST.
+
+    Returns (symbols, start_date, period, freq), or a JsonResponse describing
+    the problem.
+    """
+    from .forecasting import horizon_allowed
+
+    try:
+        if request.content_type == 'application/json':
+            params = json.loads(request.body or b'{}')
+            symbols = params.get('symbols') or []
+        else:
+            params = request.POST
+            symbols = [s for value in params.getlist('symbols') for s in value.split(',') if s]
+        start_date_str = params.get('start_date')
+        period = int(params.get('period', 30))
+        freq = params.get('frequency', 'D')
+    except (ValueError, TypeError):
+        return JsonResponse({"error": "Invalid batch request."}, status=400)
+
+    if not start_date_str:
+        return JsonResponse({"error": "Start date is required."}, status=400)
+    try:
+        start_date = parse_date(start_date_str)
+    except ValueError:
+        return JsonResponse({"error": "Invalid start date format. Use YYYY-MM-DD."}, status=400)
+    # One request forecasts every symbol it names: bound the horizon as the public API does.
+    if not horizon_allowed(period, freq):
+        return JsonResponse({"error": "Period must be positive and within the longest allowed horizon, with frequency D, W or M."}, status=400)
+    return symbols, start_date, period, freq
+
+@login_required(login_url='login')
+@require_POST
+def forecast_batch(request):
+    from .forecasting import batch_forecast
+
+    params = _batch_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    symbols, start_date, period, freq = params
+
+    # No symbols means every company
+    companies = Company.objects.all()
+    if symbols:
+        companies = companies.filter(symbol__in=symbols)
+    companies = list(companies)
+
+    results = batch_forecast(companies, start_date, period, freq)
+    for symbol in set(symbols) - {company.symbol for company in companies}:
+        results[symbol] = {'status': 'error', 'error': f"Company {symbol} not found."}
+
+    return JsonResponse({
+        "start_date": start_date.strftime('%Y-%m-%d'),
+        "period": period,
+        "frequency": freq,
+        "results": results,
+        "errors": sum(1 for r in results.values() if r['status'] == 'error'),
+    })
+
+def _job_status(job):
+    data = {
+        "id": job.pk,
+        "status": job.status,
+        "symbols": job.symbols,
+        "start_date": job.start_date.strftime('%Y-%m-%d'),
+        "period": job.period,
+        "frequency": job.frequency,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.error or None,
+        "status_url": reverse('forecast_job', args=[job.pk]),
+    }
+    if job.status == ForecastJob.SUCCEEDED:
+        data["result_url"] = reverse('forecast_job_result', args=[job.pk])
+    return data
+
+@login_required(login_url='login')
+@require_POST
+def forecast_job_submit(request):
+    """Queue a (multi-symbol) forecast for run_forecast_worker; identical active jobs are reused"""
+    from .jobs import submit as submit_job
+
+    params = _batch_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    job, created = submit_job(request.user, *params)
+    data = _job_status(job)
+    data["deduplicated"] = not created
+    response = JsonResponse(data, status=202)
+    response['Location'] = data["status_url"]
+    return response
+
+@login_required(login_url='login')
+@require_GET
+def forecast_job(request, job_id):
+    job = get_object_or_404(ForecastJob, pk=job_id, user=request.user)
+    response = JsonResponse(_job_status(job))
+    if job.status in ForecastJob.ACTIVE:
+        response['Retry-After'] = '2'
+    return response
+
+@login_required(login_url='login')
+@require_GET
+def forecast_job_result(request, job_id):
+    job = get_object_or_404(ForecastJob, pk=job_id, user=request.user)
+    if job.status == ForecastJob.SUCCEEDED:
+        return JsonResponse({
+            "id": job.pk,
+            "start_date": job.start_date.strftime('%Y-%m-%d'),
+            "period": job.period,
+            "frequency": job.frequency,
+            **job.result,
+        })
+    if job.status == ForecastJob.FAILED:
+        return JsonResponse(_job_status(job), status=409)
+    response = JsonResponse(_job_status(job), status=202)
+    response['Retry-After'] = '2'
+    return response
+
+def _plot_params(request):
+    if request.GET.get('engine', Company.PROPHET) not in Company.ENGINES:
+        return None
+    try:
+        return (
+            request.GET['symbol'],
+            parse_date(request.GET['start_date']),
+            int(request.GET.get('period', '30')),
+            request.GET.get('freq', 'D'),
+            request.GET.get('engine', Company.PROPHET),
+        )
+    except (KeyError, ValueError):
+        return None
+
+@login_required(login_url='login')
+@require_GET
+async def forecast_plot(request):
+    from .forecasting import forecast_hash, plot_png, run_inference
+
+    params = _plot_params(request)
+    if params is None:
+        return JsonResponse({"error": "symbol, start_date, period, freq and a known engine are required."}, status=400)
+
+    symbol, start_date, period, freq, engine = params
+    company = await acompany_or_404(symbol)
+    # The ETag is the forecast hash, which stats the artifact: off the event loop, as in forecast_api.
+    key = await run_inference(forecast_hash, symbol, start_date, period, freq, engine)
+    if key is None:
+        return JsonResponse({"error": f"Model for {symbol} not found."}, status=404)
+
+    response = get_conditional_response(request, etag=quote_etag(key))
+    if response is None:
+        plot = await run_inference(plot_png, company, start_date, period, freq, engine)
+        if plot is None:
+            return JsonResponse({"error": f"Model for {symbol} not found."}, status=404)
+        # The artifact may have been replaced in between: describe what was served.
+        key, png = plot
+        response = HttpResponse(png, content_type='image/png')
+    response['ETag'] = quote_etag(key)
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+def _forecast_query(request):
+    """(symbol, start_date, period, freq, engine) of a GET forecast; engine is None unless given. None if invalid"""
+    from .forecasting import horizon_allowed
+
+    engine = request.GET.get('engine') or None
+    if engine is not None and engine not in Company.ENGINES:
+        return None
+    freq = request.GET.get('freq', 'D')
+    # The API is anonymous: bound the work one request can ask for.
+    try:
+        period = int(request.GET.get('period', '30'))
+        if not horizon_allowed(period, freq):
+            return None
+        return request.GET['symbol'], parse_date(request.GET['start_date']), period, freq, engine
+    except (KeyError, ValueError):
+        return None
+
+def _forecast_validators(company, start_date, period, freq, engine):
+    # Stats the artifact (and hashes it once per change), so it runs off the event loop.
+    from .engines import artifact_mtime, resolve_engine
+    from .forecasting import forecast_hash
+
+    engine = engine or resolve_engine(company)
+    return engine, forecast_hash(company.symbol, start_date, period, freq, engine), artifact_mtime(company.symbol, engine)
+
+@require_GET
+async def forecast_api(request):
+    """
+    Read-only forecast for symbol, start_date, period and freq (plus an
+    optional engine, format and precision) in the query string.
+
+    Responses may be cached by browsers and proxies: the ETag is the
+    forecast hash (model artifact version plus request) and the encoding,
+    Last-Modified is the artifact's mtime, and a conditional request that
+    still matches gets a 304 before any model is loaded.
+    """
+    from .encoding import negotiate, parse_precision
+    from .forecasting import run_inference, stock_forecast
+
+    params = _forecast_query(request)
+    if params is None:
+        return JsonResponse({"error": "symbol, start_date, a positive period, freq and a known engine are required."}, status=400)
+    symbol, start_date, period, freq, engine = params
+    company = await acompany_or_404(symbol)
+    engine, key, last_modified = await run_inference(_forecast_validators, company, start_date, period, freq, engine)
+    if key is None:
+        return JsonResponse({"error": f"Model for {symbol} not found."}, status=404)
+
+    encoding = negotiate(request)
+    precision = request.GET.get('precision')
+    # One validator per representation, since the body varies with Accept.
+    variant = f"{encoding}-{parse_precision(precision)}" if encoding == 'columnar' else encoding
+    etag = quote_etag(f"{key}-{variant}")
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        result = await run_inference(stock_forecast, company, start_date, period, freq, engine)
+        if result is None:
+            return JsonResponse({"error": f"Model for {symbol} not found."}, status=404)
+        if result['key'] != key:
+            # The artifact was replaced in between: describe what was served.
+            etag = quote_etag(f"{result['key']}-{variant}")
+            last_modified = (await run_inference(_forecast_validators, company, start_date, period, freq, engine))[2]
+        meta = {
+            "company_name": company.name,
+            "company_symbol": company.symbol,
+            "engine": result['engine'],
+            "model_version": result['model_version'],
+            "last_training_date": result['last_training_date'].strftime('%Y-%m-%d'),
+            "start_date_adjusted": result['adjusted'],
+        }
+        with stage('serialize'):
+            response = encode_forecast(request, result['forecast'], meta, encoding, precision)
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'FORECAST_API', {}).get('MAX_AGE', 3600))
+    patch_vary_headers(response, ['Accept'])
+    return response
+
 @login_required
-def predict_stock(request, symbol):
-    company = get_object_or_404(Company, symbol=symbol)
+async def predict_stock(request, symbol):
+    company = await acompany_or_404(symbol)
     
     if request.method == 'POST':
+        from .forecasting import plot_url, run_inference, stock_forecast
+        from .persistence import asave_forecast, prediction_rows
+
         days = int(request.POST.get('days', 30))
         try:
-            model = load_prophet_model(symbol)
-            if not model:
+            # Forecast from the current date (today)
+            current_date = parse_date(datetime.now().date())
+            result = await run_inference(stock_forecast, company, current_date, days)
+            if result is None:
                 raise ValueError(f"No model found for {symbol}")
             
-            # Get current date (today) and last training date
-            current_date = pd.to_datetime(datetime.now().date())
-            last_training_date = pd.to_datetime(model.history['ds'].max())
-            
-            # Calculate how many days we need to forecast from last training date
-            days_needed = (current_date - last_training_date).days + days
-            
-            # Make sure we're not predicting the past
-            if days_needed < days:
-                days_needed = days  # Minimum forecast period
+            forecast = result['forecast']
+            if result['adjusted']:
                 messages.info(request, 
-                    f"Forecast starts from model's last training date: {last_training_date.strftime('%Y-%m-%d')}"
+                    f"Forecast starts from model's last training date: {result['last_training_date'].strftime('%Y-%m-%d')}"
                 )
             
-            # Generate future dataframe
-            future = model.make_future_dataframe(periods=days_needed, include_history=False)
-            
-            # Filter to only include dates from current_date onward
-            future = future[future['ds'] >= current_date].head(days)
-            
-            if future.empty:
+            if forecast.empty:
                 raise ValueError("No valid forecast dates available")
             
-            forecast = model.predict(future)
-            
             # Convert dates to strings
             dates = forecast['ds'].dt.strftime('%Y-%m-%d').tolist()
             
-            # Generate Prophet plot
-            fig, ax = plt.subplots(figsize=(10, 5))
-            model.plot(forecast, ax=ax)
-            ax.set_title(f"{company.name} Forecast")
-            
-            buf = io.BytesIO()
-            canvas = FigureCanvas(fig)
-            canvas.print_png(buf)
-            plt.close(fig)
-            image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-            image_url = f"data:image/png;base64,{image_base64}"
-
-            # Save predictions
-            Prediction.objects.filter(company=company, user=request.user).delete()
-            predictions = []
-            for _, row in forecast.iterrows():
-                pred = Prediction.objects.create(
-                    company=company,
-                    user=request.user,
-                    forecast_date=row['ds'].date(),
-                    predicted_price=row['yhat'],
-                    lower_bound=row['yhat_lower'],
-                    upper_bound=row['yhat_upper']
-                )
-                predictions.append(pred)
+            # The Prophet plot is rendered on demand by forecast_plot
+            image_url = None if skip_plot(request) else plot_url(symbol, current_date, days, engine=result['engine'])
+
+            # Record the (shared) forecast run for this user
+            with stage('db_write'):
+                await asave_forecast(company, await request.auser(), result, current_date, days)
             
-            return render(request, 'prediction_results.html', {
-                'chart_data': json.dumps({
-                    'dates': dates,
-                    'predicted': forecast['yhat'].tolist(),
-                    'upper': forecast['yhat_upper'].tolist(),
-                    'lower': forecast['yhat_lower'].tolist()
-                }),
-                'predictions': predictions,
-                'company': company,
-                'days': days,
-                'prophet_image': image_url,
-                'forecast_start_date': current_date.strftime('%Y-%m-%d')
-            })
+            # Templates read request.user, which is a sync database lookup.
+            with stage('render'):
+                return await sync_to_async(render)(request, 'prediction_results.html', {
+                    'chart_data': json.dumps({
+                        'dates': dates,
+                        'predicted': forecast['yhat'].tolist(),
+                        'upper': forecast['yhat_upper'].tolist(),
+                        'lower': forecast['yhat_lower'].tolist()
+                    }),
+                    'predictions': prediction_rows(forecast),
+                    'company': company,
+                    'days': days,
+                    'prophet_image': image_url,
+                    'forecast_start_date': current_date.strftime('%Y-%m-%d')
+                })
             
         except Exception as e:
             messages.error(request, f"Error: {str(e)}")
@@ -364,17 +571,65 @@ def predict_stock(request, symbol):
     
     return redirect('dashboard')
 
+@login_required(login_url='login')
+@require_GET
+def export_forecasts(request):
+    """The user's forecast history as CSV or Parquet, optionally for one company and a range of forecast dates"""
+    from .exports import FORMATS, aiterate, csv_chunks, export_batches, export_references, parquet_available, parquet_chunks
+
+    fmt = request.GET.get('format', 'csv').lower()
+    if fmt not in FORMATS:
+        return JsonResponse({"error": f"Unknown format {fmt}. Use csv or parquet."}, status=400)
+    if fmt == 'parquet' and not parquet_available():
+        return JsonResponse({"error": "Parquet export is not available on this server; use format=csv."}, status=501)
+    try:
+        start = parse_date(request.GET['start']).date() if request.GET.get('start') else None
+        end = parse_date(request.GET['end']).date() if request.GET.get('end') else None
+    except ValueError:
+        return JsonResponse({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
+    company = None
+    if request.GET.get('company'):
+        company = get_object_or_404(Company, symbol=request.GET['company'])
+
+    batches = export_batches(export_references(request.user, company, start, end), start, end)
+    chunks = csv_chunks(batches) if fmt == 'csv' else parquet_chunks(batches)
+    # Under ASGI a sync iterator would be read to the end before sending.
+    response = StreamingHttpResponse(
+        aiterate(chunks) if isinstance(request, ASGIRequest) else chunks, content_type=FORMATS[fmt])
+    name = '-'.join(filter(None, ['forecasts', company and company.symbol, start and str(start), end and str(end)]))
+    response['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+@user_passes_test(lambda u: u.is_active and u.is_staff, login_url='login')
+def metrics_view(request):
+    registry_stats = model_registry.registry.stats()
+    body = metrics.render({
+        'model_registry_hits_total': registry_stats['hits'],
+        'model_registry_misses_total': registry_stats['misses'],
+        'model_loads_total': registry_stats['loads'],
+        'model_load_seconds_total': round(registry_stats['load_time'], 6),
+        'model_registry_evictions_total': registry_stats['evictions'],
+    })
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Review Views
 @login_required
 def company_reviews(request, symbol):
     company = get_object_or_404(Company, symbol=symbol)
-    reviews = company.reviews.select_related('user').all()
-    
+    reviews, next_cursor = review_page(company, request.GET.get('after'))
+
+    user_review = next((r for r in reviews if r.user_id == request.user.pk), None)
+    if user_review is None and request.user.is_authenticated:
+        user_review = Review.objects.filter(company=company, user=request.user).first()
+
     return render(request, 'company_reviews.html', {
         'company': company,
         'reviews': reviews,
-        'user_review': reviews.filter(user=request.user).first(),
-        'average_rating': company.reviews.aggregate(models.Avg('rating'))['rating__avg'] or 0,
+        'next_cursor': next_cursor,
+        'user_review': user_review,
+        # Only read when the cached summary fragment is re-rendered.
+        'summary': SimpleLazyObject(lambda: company_rating(company)),
+        'summary_version': fragments.version('reviews', company.pk),
     })
 
 @login_required
@@ -384,11 +639,15 @@ def add_review(request, symbol):
     if request.method == 'POST':
         form = ReviewForm(request.POST)
         if form.is_valid():
-            review, created = Review.objects.update_or_create(
-                company=company,
-                user=request.user,
-                defaults=form.cleaned_data
-            )
+            with transaction.atomic():
+                previous = Review.objects.filter(company=company, user=request.user).values_list('rating', flat=True).first()
+                review, created = Review.objects.update_or_create(
+                    company=company,
+                    user=request.user,
+                    defaults=form.cleaned_data
+                )
+                if previous != review.rating:
+                    record_rating(company.pk, added=review.rating, removed=previous)
             messages.success(request, "Review submitted!")
             return redirect('company_reviews', symbol=company.symbol)
     else:
@@ -403,6 +662,8 @@ def add_review(request, symbol):
 @require_POST
 def delete_review(request, review_id):
     review = get_object_or_404(Review, id=review_id, user=request.user)
-    review.delete()
+    with transaction.atomic():
+        review.delete()
+        record_rating(review.company_id, removed=review.rating)
     messages.success(request, "Review deleted.")
     return redirect('company_reviews', symbol=review.company.symbol)
\ No newline at end of file